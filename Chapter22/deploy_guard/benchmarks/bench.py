@@ -0,0 +1,226 @@
+"""
+deploy_guard benchmarks: deploy, rollback, get_with_retry and
+run_pipeline at several scales, against the scriptable fake kubectl
+(fake_kubectl.py) and a local stub HTTP service (stub_server.py).
+
+    PYTHONPATH=src python -m benchmarks.bench --output bench.json \\
+        --baseline benchmarks/baseline.json
+
+Each scenario runs --repeat times; the median wall time is compared
+with the baseline and the run exits 1 when one is more than
+--tolerance slower (and at least --min-delta seconds), or its rc changed.
+--update-baseline rewrites the baseline from this run.
+"""
+import argparse, json, logging, os, platform, re, shutil, statistics, sys, tempfile, time
+from contextlib import contextmanager
+from deploy_guard.core import deploy_k8s
+from deploy_guard.core.deploy_k8s import deploy, rollback_release
+from deploy_guard.core.api_checks import get_with_retry
+from deploy_guard.core.pipeline import run_pipeline
+from deploy_guard.core.rollback_plan import RollbackPlan
+from benchmarks.fake_kubectl import install_kubectl
+from benchmarks.stub_server import StubService
+
+log = logging.getLogger("deploy_guard.bench")
+
+KUBECTL_LATENCY = "0.02"  # per call, on top of process start-up
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_MIN_DELTA = 0.05
+
+
+@contextmanager
+def _env(clear_prefix=None, **values):
+    """
+    Set `values` in os.environ for the block, first unsetting every
+    variable starting with `clear_prefix` (the caller's DG_* settings,
+    e.g. DG_APPLY_CACHE or DG_PIPELINE_DEADLINE, would skew the timings).
+    """
+    cleared = [k for k in os.environ if clear_prefix and k.startswith(clear_prefix) and k not in values]
+    old = {k: os.environ.get(k) for k in [*values, *cleared]}
+    for k in cleared:
+        del os.environ[k]
+    os.environ.update({k: str(v) for k, v in values.items()})
+    try:
+        yield
+    finally:
+        for k, v in old.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+def write_manifests(directory, count, namespaces, deployments=0):
+    """`count` objects spread over `namespaces`; the first `deployments` are Deployments."""
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    for i in range(count):
+        ns = f"ns{i % namespaces}"
+        if i < deployments:
+            doc = (f"apiVersion: apps/v1\nkind: Deployment\nmetadata:\n  name: d{i}\n  namespace: {ns}\n"
+                   f"spec:\n  template:\n    spec:\n      containers: [{{name: app, image: 'app:{i}'}}]\n")
+        else:
+            doc = f"apiVersion: v1\nkind: ConfigMap\nmetadata:\n  name: c{i}\n  namespace: {ns}\ndata:\n  k: v{i}\n"
+        with open(os.path.join(directory, f"m{i:04d}.yaml"), "w") as f:
+            f.write(doc)
+    return directory
+
+
+def _fresh():
+    deploy_k8s.reset_backend()
+    deploy_k8s._last_plan = RollbackPlan()
+
+
+def scenarios(workdir, quick=False):
+    """[(name, setup() -> run() -> rc)]; setup is untimed."""
+    manifests = os.path.join(workdir, "manifests")
+    out = []
+
+    for count, namespaces in ([(10, 1), (10, 5)] if quick else [(10, 1), (50, 1), (50, 10), (200, 10)]):
+        def setup(count=count, namespaces=namespaces):
+            write_manifests(manifests, count, namespaces)
+            _fresh()
+            return lambda: deploy(manifests)
+        out.append((f"deploy/manifests={count},namespaces={namespaces}", setup))
+
+    for count in ([2] if quick else [1, 5, 20]):
+        def setup(count=count):
+            write_manifests(manifests, count, min(count, 5), deployments=count)
+            _fresh()
+            with _env(DG_ROLLOUT_TIMEOUT="30"):
+                deploy(manifests)
+            return lambda: rollback_release("d0", "ns0")
+        out.append((f"rollback/deployments={count}", setup))
+
+    for label, stub in ([("healthy", dict())] if quick else [
+        ("healthy", dict()), ("slow-200ms", dict(latency=0.2)), ("flaky-1-retry", dict(fail_first=1)),
+    ]):
+        def setup(stub=stub):
+            service = StubService(**stub).__enter__()
+            _cleanups.append(service)
+            return lambda: get_with_retry(service.url)
+        out.append((f"get_with_retry/{label}", setup))
+
+    for count in ([5] if quick else [10, 50]):
+        def setup(count=count):
+            write_manifests(manifests, count, min(count, 5), deployments=1)
+            _fresh()
+            service = StubService().__enter__()
+            _cleanups.append(service)
+            os.environ.update(SERVICE_URL=service.url)
+            return lambda: run_pipeline(manifests, service.url)
+        out.append((f"run_pipeline/manifests={count}", setup))
+    return out
+
+
+_cleanups = []
+
+
+def run(quick=False, repeat=3, only=None):
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="dg-bench-") as workdir:
+        bindir = os.path.join(workdir, "bin")
+        os.makedirs(bindir)
+        install_kubectl(bindir)
+        env = dict(
+            PATH=f"{bindir}{os.pathsep}{os.environ['PATH']}",
+            FAKE_KUBECTL_LATENCY=os.environ.get("FAKE_KUBECTL_LATENCY", KUBECTL_LATENCY),
+            FAKE_KUBECTL_LIVE="*",
+            DG_K8S_BACKEND="kubectl",
+            ENV="dev", KUBECONFIG=os.path.join(workdir, "kubeconfig"), VERSION="bench",
+            SERVICE_URL="http://127.0.0.1/", DEPLOYMENT_NAME="d0", DEPLOYMENT_NAMESPACE="ns0",
+        )
+        with _env(clear_prefix="DG_", **env):
+            for name, setup in scenarios(workdir, quick):
+                if only and not re.search(only, name):
+                    continue
+                times, rcs = [], set()
+                for _ in range(repeat):
+                    fn = setup()
+                    start = time.perf_counter()
+                    rcs.add(fn())
+                    times.append(time.perf_counter() - start)
+                    while _cleanups:
+                        _cleanups.pop().__exit__(None, None, None)
+                results[name] = {
+                    "median_s": round(statistics.median(times), 4),
+                    "min_s": round(min(times), 4),
+                    "max_s": round(max(times), 4),
+                    "runs": repeat,
+                    "rc": max(rcs),
+                }
+                print(f"{name:<44} median {results[name]['median_s']:8.3f}s  rc={results[name]['rc']}", flush=True)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "kubectl_latency": os.environ.get("FAKE_KUBECTL_LATENCY", KUBECTL_LATENCY),
+            "quick": quick,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE, min_delta=DEFAULT_MIN_DELTA):
+    """
+    Regressions of `current` against `baseline` (both run() output):
+    [(name, baseline_s, current_s, reason)]. Scenarios missing from
+    either side are not compared.
+    """
+    regressions = []
+    base = baseline.get("results", {})
+    for name, now in current["results"].items():
+        then = base.get(name)
+        if then is None:
+            continue
+        if now["rc"] != then["rc"]:
+            regressions.append((name, then["median_s"], now["median_s"], f"rc {then['rc']} -> {now['rc']}"))
+        elif (now["median_s"] > then["median_s"] * (1 + tolerance)
+              and now["median_s"] - then["median_s"] >= min_delta):
+            pct = (now["median_s"] / then["median_s"] - 1) * 100 if then["median_s"] else float("inf")
+            regressions.append((name, then["median_s"], now["median_s"], f"{pct:+.0f}% slower"))
+    return regressions
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m benchmarks.bench", description=__doc__,
+                                formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--quick", action="store_true", help="Small scales only (smoke test)")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--only", default=None, help="Regex of scenario names to run")
+    p.add_argument("--output", default=None, help="Write results JSON here")
+    p.add_argument("--baseline", default=None, help="Baseline JSON to compare against")
+    p.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                   help="Allowed slowdown as a fraction of the baseline (default 0.25)")
+    p.add_argument("--min-delta", type=float, default=DEFAULT_MIN_DELTA,
+                   help="Ignore slowdowns smaller than this many seconds (default 0.05)")
+    p.add_argument("--update-baseline", action="store_true", help="Write this run to --baseline")
+    args = p.parse_args(argv)
+
+    logging.basicConfig(level=logging.CRITICAL)
+    current = run(args.quick, args.repeat, args.only)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+
+    if not args.baseline:
+        return 0
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, args.tolerance, args.min_delta)
+    for name, then, now, reason in regressions:
+        print(f"REGRESSION {name}: {then:.3f}s -> {now:.3f}s ({reason})")
+    if not regressions:
+        print(f"No regressions against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
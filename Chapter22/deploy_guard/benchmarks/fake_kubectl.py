@@ -0,0 +1,148 @@
+"""
+Scriptable stand-in for kubectl, shared by the test suite (conftest's
+`kubectl` fixture) and the benchmarks. install_kubectl() puts it on PATH
+as `kubectl`; behaviour comes from the environment:
+
+    FAKE_KUBECTL_LOG          append each argv as a JSON line
+    FAKE_KUBECTL_LATENCY      seconds per call, or JSON {"apply": 0.05, ...}
+                              keyed by verb ("default" for the rest)
+    FAKE_KUBECTL_FAIL_RATE    probability (0-1) that a call exits 1
+    FAKE_KUBECTL_FAIL_VERBS   comma-separated verbs failure applies to
+                              (default: all)
+    FAKE_KUBECTL_SEED         seed for the failure draw
+    FAKE_KUBECTL_FAIL         fail the server dry-run of files whose path
+                              contains this (the real apply instead with
+                              FAKE_KUBECTL_FAIL_APPLY set)
+    FAKE_KUBECTL_FAIL_CONTEXTS  comma-separated --context values whose
+                              `rollout status` fails
+    FAKE_KUBECTL_HANG         verb that hangs (60s) with a child process;
+                              both pids go to FAKE_KUBECTL_LOG + ".pids"
+    FAKE_KUBECTL_LIVE         JSON {name: object} answered by
+                              `get deployment/<name>` (others: not found),
+                              or "*" to synthesize every Deployment
+    FAKE_KUBECTL_GENERATIONS  JSON {name: generation} for `get -f` (default 1)
+    FAKE_KUBECTL_PULL_SECONDS node image cache: `rollout status` pays this
+                              per image not pulled yet (state in
+                              FAKE_KUBECTL_LOG + ".state")
+"""
+import json, os, random, sys, time
+
+
+def install_kubectl(bindir):
+    """Put this script on PATH as `kubectl` (in `bindir`); returns its path."""
+    exe = os.path.join(bindir, "kubectl")
+    with open(exe, "w") as f:
+        f.write(f"#!/bin/sh\nexec {sys.executable} {os.path.abspath(__file__)} \"$@\"\n")
+    os.chmod(exe, 0o755)
+    return exe
+
+
+def _deployment(name, namespace):
+    return {
+        "apiVersion": "apps/v1", "kind": "Deployment",
+        "metadata": {"name": name, "namespace": namespace, "generation": 1,
+                     "annotations": {"deployment.kubernetes.io/revision": "1"}},
+        "spec": {"template": {"metadata": {"labels": {"app": name}},
+                              "spec": {"containers": [{"name": name, "image": f"{name}:1"}]}}},
+    }
+
+
+def _docs(path):
+    import yaml
+    with open(path) as f:
+        return [d for d in yaml.safe_load_all(f) if d]
+
+
+def _hang():
+    import subprocess
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+    with open(os.environ["FAKE_KUBECTL_LOG"] + ".pids", "a") as f:
+        f.write(f"{os.getpid()}\n{child.pid}\n")
+    time.sleep(60)
+
+
+def _pull(argv, files, dry):
+    """Applied workloads remember their images; `rollout status` pulls the missing ones."""
+    state_file = os.environ["FAKE_KUBECTL_LOG"] + ".state"
+    state = {"workloads": {}, "cached": []}
+    if os.path.exists(state_file):
+        with open(state_file) as f:
+            state = json.load(f)
+    if argv[0] == "apply" and not dry:
+        for path in files:
+            for doc in _docs(path):
+                pod = ((doc.get("spec") or {}).get("template") or {}).get("spec") or {}
+                images = [c["image"] for c in pod.get("initContainers", []) + pod.get("containers", [])]
+                state["workloads"][doc["kind"].lower() + "/" + doc["metadata"]["name"]] = images
+    elif argv[:2] == ["rollout", "status"]:
+        missing = [i for i in state["workloads"].get(argv[2], []) if i not in state["cached"]]
+        delay = float(os.environ["FAKE_KUBECTL_PULL_SECONDS"]) * len(missing)
+        timeout = float(next(a for a in argv if a.startswith("--timeout="))[10:-1])
+        time.sleep(min(delay, timeout))
+        if delay > timeout:
+            sys.exit(1)
+        state["cached"] += missing
+    with open(state_file, "w") as f:
+        json.dump(state, f)
+
+
+def main(args):
+    if os.environ.get("FAKE_KUBECTL_LOG"):
+        with open(os.environ["FAKE_KUBECTL_LOG"], "a") as f:
+            f.write(json.dumps(args) + "\n")
+    argv, context = args, ""
+    if argv and argv[0] == "--context":
+        context, argv = argv[1], argv[2:]
+    verb = argv[0] if argv else ""
+
+    latency = os.environ.get("FAKE_KUBECTL_LATENCY", "0")
+    if latency.lstrip().startswith("{"):
+        table = json.loads(latency)
+        latency = table.get(verb, table.get("default", 0))
+    time.sleep(float(latency))
+
+    if verb == os.environ.get("FAKE_KUBECTL_HANG"):
+        _hang()
+    if context and context in os.environ.get("FAKE_KUBECTL_FAIL_CONTEXTS", "").split(","):
+        if argv[:2] == ["rollout", "status"]:
+            sys.exit(1)
+
+    rate = float(os.environ.get("FAKE_KUBECTL_FAIL_RATE", "0"))
+    verbs = [v for v in os.environ.get("FAKE_KUBECTL_FAIL_VERBS", "").split(",") if v]
+    if rate and (not verbs or verb in verbs):
+        seed = os.environ.get("FAKE_KUBECTL_SEED")
+        rng = random.Random(f"{seed}:{os.getpid()}") if seed else random.Random()
+        if rng.random() < rate:
+            print(f"fake kubectl: injected failure in {verb}", file=sys.stderr)
+            sys.exit(1)
+
+    namespace = argv[argv.index("-n") + 1] if "-n" in argv else "default"
+    files = [a for i, a in enumerate(argv) if i and argv[i - 1] == "-f"]
+    dry = "--dry-run=server" in argv
+    bad = os.environ.get("FAKE_KUBECTL_FAIL", "")
+    if bad and any(bad in f for f in files) and dry != bool(os.environ.get("FAKE_KUBECTL_FAIL_APPLY")):
+        sys.exit(1)
+
+    if verb == "config":
+        print(f"https://{context or 'fake-cluster'}:6443")
+    elif verb == "get" and len(argv) > 1 and argv[1].startswith("deployment/"):
+        name = argv[1].split("/", 1)[1]
+        live = os.environ.get("FAKE_KUBECTL_LIVE", "{}")
+        obj = _deployment(name, namespace) if live == "*" else json.loads(live).get(name)
+        if obj is None:
+            sys.exit(1)
+        print(json.dumps(obj))
+    elif verb == "get":
+        generations = json.loads(os.environ.get("FAKE_KUBECTL_GENERATIONS", "{}"))
+        items = []
+        for path in files:
+            for doc in _docs(path):
+                doc.setdefault("metadata", {})["generation"] = generations.get(doc["metadata"].get("name"), 1)
+                items.append(doc)
+        print(json.dumps({"kind": "List", "items": items}))
+    elif os.environ.get("FAKE_KUBECTL_PULL_SECONDS"):
+        _pull(argv, files, dry)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
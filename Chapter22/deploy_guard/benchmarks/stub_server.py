@@ -0,0 +1,70 @@
+"""
+Local HTTP service for the benchmarks: every GET answers 200 after
+`latency` seconds, or 503 with probability `error_rate`, or 503 for the
+first `fail_first` requests. Run standalone with
+`python benchmarks/stub_server.py --port 8080 --latency 0.05`.
+"""
+import argparse, random, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubService:
+    def __init__(self, latency=0.0, error_rate=0.0, fail_first=0, port=0, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.fail_first = fail_first
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                    fail = stub.requests <= stub.fail_first or stub._rng.random() < stub.error_rate
+                if stub.latency:
+                    time.sleep(stub.latency)
+                body = b"unavailable" if fail else b"ok"
+                self.send_response(503 if fail else 200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/health"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--port", type=int, default=8080)
+    p.add_argument("--latency", type=float, default=0.0)
+    p.add_argument("--error-rate", type=float, default=0.0)
+    p.add_argument("--fail-first", type=int, default=0)
+    args = p.parse_args()
+    with StubService(args.latency, args.error_rate, args.fail_first, args.port) as stub:
+        print(f"Serving {stub.url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
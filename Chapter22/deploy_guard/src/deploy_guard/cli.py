@@ -1,16 +1,17 @@
 import sys, argparse, logging
+import requests
 from deploy_guard.logging import setup_logging
 from deploy_guard.core.env_gate import validate_env
 from deploy_guard.core.health_checks import check_disk, check_memory
-from deploy_guard.core.deploy_k8s import deploy, rollback
-from deploy_guard.core.api_checks import get_with_retry
+from deploy_guard.core.deploy_k8s import deploy, rollback, wait_for_rollout
+from deploy_guard.core.api_checks import get_with_retry, check_slo
 from deploy_guard.core.pipeline import run_pipeline
-from deploy_guard.core.notes.release_notes import generate_notes
+from deploy_guard.notes.release_notes import generate_notes
 from deploy_guard.core.release_guard import create_tag
+from deploy_guard.core.plan import load_plan, run_plan, write_summary
 
 
-def main():
-    setup_logging()
+def build_parser():
     parser = argparse.ArgumentParser(prog="deploy-guard")
     sub = parser.add_subparsers(dest="cmd", required=True)
 
@@ -19,18 +20,50 @@ def main():
     sub.add_parser("memory")
 
     apply = sub.add_parser("apply")
-    apply.add_argument("--manifest", required=True)
+    apply.add_argument("--manifest", required=True, action="append",
+                       help="File, directory or glob; repeatable")
+    apply.add_argument("--workers", type=int, default=None,
+                       help="Namespace groups applied in parallel (default DG_APPLY_WORKERS or 4)")
+    apply.add_argument("--force", action="store_true",
+                       help="Apply even manifests the DG_APPLY_CACHE says are unchanged")
 
     rb = sub.add_parser("rollback")
     rb.add_argument("--deployment", required=True)
     rb.add_argument("--namespace", default="default")
 
+    ro = sub.add_parser("rollout")
+    ro.add_argument("--deployment", required=True)
+    ro.add_argument("--namespace", default="default")
+    ro.add_argument("--timeout", type=float, default=None,
+                    help="Seconds to wait for readiness (default DG_ROLLOUT_TIMEOUT or 600)")
+
     api = sub.add_parser("api")
     api.add_argument("--url", required=True)
+    api.add_argument("--slo", action="store_true",
+                     help="Probe latency/error-rate SLOs instead of a single request")
+    api.add_argument("--requests", type=int, default=None,
+                     help="Probe requests (default DG_SLO_REQUESTS or 50)")
+    api.add_argument("--rate", type=float, default=None,
+                     help="Probe requests per second (default DG_SLO_RATE or 10)")
 
     pipe = sub.add_parser("pipeline")
     pipe.add_argument("--manifest", required=True)
     pipe.add_argument("--url", required=True)
+    pipe.add_argument("--force", action="store_true",
+                      help="Apply even manifests the DG_APPLY_CACHE says are unchanged")
+    pipe.add_argument("--resume", action="store_true",
+                      help="Skip stages DG_CHECKPOINT_FILE records as done with the same inputs")
+    pipe.add_argument("--deadline", type=float, default=None,
+                      help="Seconds the whole pipeline may take (default DG_PIPELINE_DEADLINE, none)")
+
+    waves = sub.add_parser("waves", help="Roll out to many clusters in waves")
+    waves.add_argument("--manifest", required=True, action="append",
+                       help="File, directory or glob; repeatable")
+    waves.add_argument("--clusters", required=True, help="YAML cluster list")
+    waves.add_argument("--waves", default=None,
+                       help="Cumulative percentages after the canary, e.g. 10,50,100")
+    waves.add_argument("--max-parallel", type=int, default=None,
+                       help="Clusters deployed at once (default DG_WAVE_MAX_PARALLEL or 5)")
 
     notes = sub.add_parser("notes")
     notes.add_argument("-n", type=int, default=10)
@@ -38,26 +71,79 @@ def main():
     tag = sub.add_parser("tag")
     tag.add_argument("--version", required=True)
 
-    args = parser.parse_args()
+    plan = sub.add_parser("run-plan", help="Run a YAML list of subcommands in one process")
+    plan.add_argument("plan")
+    plan.add_argument("--summary", default=None,
+                      help="Write the JSON summary here instead of stdout")
+    return parser
+
+
+def dispatch(args, session=None):
+    """Run one parsed subcommand; `session` is shared by HTTP steps of a plan."""
+    if args.cmd == "env":
+        return validate_env()
+    elif args.cmd == "disk":
+        return check_disk()
+    elif args.cmd == "memory":
+        return check_memory()
+    elif args.cmd == "apply":
+        return deploy(args.manifest, args.workers, args.force)
+    elif args.cmd == "rollback":
+        return rollback(args.deployment, args.namespace)
+    elif args.cmd == "rollout":
+        return wait_for_rollout(args.deployment, args.namespace, args.timeout)
+    elif args.cmd == "api":
+        if args.slo:
+            return check_slo(args.url, count=args.requests, rate=args.rate, session=session)
+        return get_with_retry(args.url, session=session)
+    elif args.cmd == "pipeline":
+        return run_pipeline(args.manifest, args.url, force=args.force, resume=args.resume,
+                            deadline=args.deadline)
+    elif args.cmd == "waves":
+        return run_waves(args.manifest, args.clusters, args.waves, args.max_parallel)
+    elif args.cmd == "notes":
+        return generate_notes(args.n)
+    elif args.cmd == "tag":
+        return create_tag(args.version)
+    elif args.cmd == "run-plan":
+        return run_plan_file(args.plan, args.summary)
+    raise ValueError(f"Unknown command: {args.cmd}")
+
+
+def run_waves(manifest, clusters_file, waves=None, max_parallel=None):
+    from deploy_guard.core.waves import load_clusters, roll_out
+    clusters, file_waves, file_parallel = load_clusters(clusters_file)
+    percents = [float(p) for p in waves.split(",")] if waves else file_waves
+    return roll_out(manifest, clusters, percents, max_parallel or file_parallel)
+
+
+def run_plan_file(path, summary_path=None):
+    """
+    Parse every step up front (a typo fails the plan before anything
+    runs), then execute them in this process with one HTTP session.
+    """
+    parser = build_parser()
+    steps = load_plan(path)
+    for step in steps:
+        if step.argv[0] == "run-plan":
+            raise ValueError(f"Step {step.name}: plans cannot nest run-plan")
+        try:
+            step.args = parser.parse_args(step.argv)
+        except SystemExit:
+            raise ValueError(f"Step {step.name}: invalid arguments {step.argv}")
+
+    with requests.Session() as session:
+        rc, summary = run_plan(steps, lambda step: dispatch(step.args, session))
+    summary["plan"] = path
+    write_summary(summary, summary_path)
+    return rc
+
+
+def main():
+    setup_logging()
+    args = build_parser().parse_args()
     try:
-        if args.cmd == "env":
-            sys.exit(validate_env())
-        elif args.cmd == "disk":
-            sys.exit(check_disk())
-        elif args.cmd == "memory":
-            sys.exit(check_memory())
-        elif args.cmd == "apply":
-            sys.exit(deploy(args.manifest))
-        elif args.cmd == "rollback":
-            sys.exit(rollback(args.deployment, args.namespace))
-        elif args.cmd == "api":
-            sys.exit(get_with_retry(args.url))
-        elif args.cmd == "pipeline":
-            sys.exit(run_pipeline(args.manifest, args.url))
-        elif args.cmd == "notes":
-            sys.exit(generate_notes(args.n))
-        elif args.cmd == "tag":
-            sys.exit(create_tag(args.version))
+        sys.exit(dispatch(args))
     except Exception as e:
         logging.getLogger("deploy_guard").error("ERROR: %s", e)
         sys.exit(2)
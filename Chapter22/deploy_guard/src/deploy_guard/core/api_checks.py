@@ -1,11 +1,22 @@
-import logging, time, requests
+import bisect, logging, statistics, threading, time, requests
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from requests.adapters import HTTPAdapter
+from deploy_guard.config import get_env
+from deploy_guard.core.deadline import current as current_deadline
+
 log = logging.getLogger("deploy_guard.api")
 
-def get_with_retry(url, max_attempts=3, timeout=5):
+def get_with_retry(url, max_attempts=3, timeout=5, session=None):
+    """Each attempt's timeout and backoff are cut to the current deadline; no retry past it."""
+    deadline = current_deadline()
     backoff = 1
     for attempt in range(1, max_attempts + 1):
+        if deadline.expired():
+            log.error("Deadline exceeded after %d attempt(s): %s", attempt - 1, url)
+            return 2
         try:
-            r = requests.get(url, timeout=timeout)
+            r = (session or requests).get(url, timeout=deadline.fit(timeout))
             if r.status_code >= 500:
                 raise requests.exceptions.RequestException(f"5xx {r.status_code}")
             log.info("API check succeeded on attempt %d: %s", attempt, r.status_code)
@@ -15,5 +26,139 @@ def get_with_retry(url, max_attempts=3, timeout=5):
                 log.error("Final failure after %d attempts: %s", attempt, e)
                 return 2
             log.warning("Attempt %d failed: %s. Retrying in %d seconds...", attempt, e, backoff)
-            time.sleep(backoff)
-            backoff *= 2
\ No newline at end of file
+            deadline.sleep(backoff)
+            backoff *= 2
+
+
+DEFAULT_BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+@dataclass
+class ProbeResult:
+    latencies_ms: list = field(default_factory=list)  # successful requests only
+    errors: int = 0
+    duration: float = 0.0
+
+    @property
+    def total(self):
+        return len(self.latencies_ms) + self.errors
+
+    @property
+    def error_rate(self):
+        return self.errors / self.total if self.total else 1.0
+
+    def percentiles(self):
+        """
+        p50/p95/p99 in ms, linearly interpolated: the same values as
+        numpy.percentile's default method. Computed with the standard
+        library; a probe holds tens to hundreds of samples, far fewer than
+        it takes to earn back numpy's import time on the CLI's startup.
+        """
+        lat = self.latencies_ms
+        if not lat:
+            return {}
+        if len(lat) == 1:
+            return {"p50": lat[0], "p95": lat[0], "p99": lat[0]}
+        q = statistics.quantiles(lat, n=100, method="inclusive")
+        return {"p50": q[49], "p95": q[94], "p99": q[98]}
+
+    def histogram(self, buckets=DEFAULT_BUCKETS_MS):
+        counts = [0] * (len(buckets) + 1)
+        for v in self.latencies_ms:
+            counts[bisect.bisect_left(buckets, v)] += 1
+        labels = [str(b) for b in buckets] + ["+Inf"]
+        return dict(zip(labels, counts))
+
+
+def probe_latency(url, count=50, rate=10.0, concurrency=4, timeout=5, session=None):
+    """
+    Send `count` GETs at `rate` requests/s over one pooled session. Each
+    latency is measured from the request's scheduled start, not from when
+    a worker got to it, so a slow server can't hide queueing delay by
+    slowing the probe down. 5xx responses and exceptions count as errors.
+    """
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+    result = ProbeResult()
+    lock = threading.Lock()
+    deadline = current_deadline()
+    t0 = time.monotonic()
+
+    def _one(i):
+        scheduled = t0 + i / rate
+        delay = scheduled - time.monotonic()
+        if delay > 0:
+            deadline.sleep(delay)
+        try:
+            if deadline.expired():
+                raise requests.exceptions.Timeout("deadline exceeded")  # unsent requests count as errors
+            r = session.get(url, timeout=deadline.fit(timeout))
+            ok = r.status_code < 500
+        except requests.exceptions.RequestException as e:
+            log.debug("Probe request failed: %s", e)
+            ok = False
+        elapsed_ms = (time.monotonic() - scheduled) * 1000
+        with lock:
+            if ok:
+                result.latencies_ms.append(elapsed_ms)
+            else:
+                result.errors += 1
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="dg-probe") as pool:
+        list(pool.map(_one, range(count)))
+    result.duration = time.monotonic() - t0
+    return result
+
+
+def _slo_from_env():
+    slo = {"max_error_rate": float(get_env("DG_SLO_MAX_ERROR_RATE", default="0.01"))}
+    for p in ("p50", "p95", "p99"):
+        value = get_env(f"DG_SLO_{p.upper()}_MS")
+        if value:
+            slo[f"{p}_ms"] = float(value)
+    if len(slo) == 1:
+        slo["p95_ms"] = 1000.0
+    return slo
+
+
+def check_slo(url, count=None, rate=None, slo=None, report=None, session=None):
+    """
+    Latency/error-rate gate. Thresholds default to DG_SLO_* env vars
+    (p95 1000ms and 1% errors when none are set). The probe summary
+    and histogram go into `report` under "api_latency". Returns 0 or 2.
+    """
+    count = count or int(get_env("DG_SLO_REQUESTS", default="50"))
+    rate = rate or float(get_env("DG_SLO_RATE", default="10"))
+    slo = slo or _slo_from_env()
+    concurrency = int(get_env("DG_SLO_CONCURRENCY", default="8"))
+
+    result = probe_latency(url, count=count, rate=rate, concurrency=concurrency, session=session)
+    pct = result.percentiles()
+    breaches = []
+    if result.error_rate > slo.get("max_error_rate", 0):
+        breaches.append(f"error rate {result.error_rate:.1%} > {slo['max_error_rate']:.1%}")
+    for p, value in pct.items():
+        limit = slo.get(f"{p}_ms")
+        if limit is not None and value > limit:
+            breaches.append(f"{p} {value:.0f}ms > {limit:.0f}ms")
+
+    log.info("Probe %s: %d requests, %d errors, %s", url, result.total, result.errors,
+             " ".join(f"{p}={v:.0f}ms" for p, v in pct.items()) or "no successful responses")
+    if report is not None:
+        report.add("api_latency", {
+            "url": url,
+            "requests": result.total,
+            "errors": result.errors,
+            "error_rate": round(result.error_rate, 4),
+            **{f"{p}_ms": round(v, 2) for p, v in pct.items()},
+            "histogram_ms": result.histogram(),
+            "slo": slo,
+            "breaches": breaches,
+        })
+    if breaches:
+        log.error("Latency SLO breached: %s", "; ".join(breaches))
+        return 2
+    return 0
@@ -0,0 +1,98 @@
+import hashlib, json, logging, os, tempfile, threading, time
+import yaml
+
+log = logging.getLogger("deploy_guard.apply_cache")
+
+# Server-populated fields that must not affect the content hash
+VOLATILE_METADATA = ("resourceVersion", "uid", "generation", "creationTimestamp", "managedFields", "selfLink")
+
+
+def load_docs(path):
+    with open(path) as f:
+        return [d for d in yaml.safe_load_all(f) if isinstance(d, dict)]
+
+
+def normalize(doc):
+    """Canonical JSON of a manifest object, minus status and server-set metadata."""
+    doc = {k: v for k, v in doc.items() if k != "status"}
+    meta = {k: v for k, v in (doc.get("metadata") or {}).items() if k not in VOLATILE_METADATA}
+    annotations = {k: v for k, v in (meta.get("annotations") or {}).items()
+                   if k != "kubectl.kubernetes.io/last-applied-configuration"}
+    if annotations:
+        meta["annotations"] = annotations
+    else:
+        meta.pop("annotations", None)
+    doc["metadata"] = meta
+    return json.dumps(doc, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def content_hash(doc):
+    return hashlib.sha256(normalize(doc).encode()).hexdigest()
+
+
+def object_key(cluster, doc, namespace=None):
+    meta = doc.get("metadata") or {}
+    ns = meta.get("namespace") or namespace or ""
+    return f"{cluster}|{ns}|{doc.get('apiVersion')}|{doc.get('kind')}|{meta.get('name')}"
+
+
+def live_version(obj):
+    """What we compare to detect out-of-band edits: generation, else resourceVersion."""
+    meta = obj.get("metadata") or {}
+    if meta.get("generation") is not None:
+        return f"g{meta['generation']}"
+    if meta.get("resourceVersion"):
+        return f"rv{meta['resourceVersion']}"
+    return None
+
+
+class ApplyCache:
+    """
+    Content-addressed record of what deploy-guard last applied, per
+    cluster/namespace/object: the hash of the normalized manifest and the
+    live object's version right after the apply. An object is unchanged
+    only if both still match; a different live version means someone
+    else modified (or recreated) it, so it is applied again. One
+    instance may be shared by concurrent deploys (e.g. the clusters of a
+    wave): writes and save() are serialized, so nobody's records are lost.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        try:
+            with open(path) as f:
+                self.entries = json.load(f).get("objects", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            log.warning("Ignoring unreadable apply cache %s: %s", path, e)
+
+    def matches(self, key, digest):
+        entry = self.entries.get(key)
+        return entry is not None and entry["hash"] == digest
+
+    def fresh(self, key, version):
+        entry = self.entries.get(key)
+        return entry is not None and version is not None and entry.get("version") == version
+
+    def record(self, key, digest, version):
+        with self._lock:
+            self.entries[key] = {"hash": digest, "version": version, "applied_at": int(time.time())}
+
+    def forget(self, key):
+        with self._lock:
+            self.entries.pop(key, None)
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with self._lock:
+            try:
+                os.makedirs(directory, exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=directory, prefix=".apply-cache-")
+                with os.fdopen(fd, "w") as f:
+                    json.dump({"version": 1, "objects": self.entries}, f, indent=1, sort_keys=True)
+                os.replace(tmp, self.path)
+            except OSError as e:
+                log.error("Failed to write apply cache %s: %s", self.path, e)
@@ -0,0 +1,109 @@
+import logging, math
+from concurrent.futures import ThreadPoolExecutor
+from deploy_guard.core.api_checks import probe_latency
+from deploy_guard.config import get_env
+
+log = logging.getLogger("deploy_guard.canary")
+
+PROMOTE, ROLLBACK = "promote", "rollback"
+
+
+def _ranks(values):
+    """1-based ranks, ties get the average of the ranks they span."""
+    order = sorted(range(len(values)), key=values.__getitem__)
+    ranks = [0.0] * len(values)
+    ties = []
+    i = 0
+    while i < len(order):
+        j = i
+        while j + 1 < len(order) and values[order[j + 1]] == values[order[i]]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[order[k]] = (i + j) / 2 + 1
+        if j > i:
+            ties.append(j - i + 1)
+        i = j + 1
+    return ranks, ties
+
+
+def mann_whitney_u(baseline, canary):
+    """
+    One-sided Mann-Whitney U test that `canary` tends to be larger
+    (slower) than `baseline`. Normal approximation with tie and
+    continuity correction, fine for the tens of samples a probe takes.
+    Same statistic as scipy.stats.mannwhitneyu(canary, baseline,
+    alternative="greater", method="asymptotic"), in plain Python: one
+    sort over a few hundred values does not need numpy or scipy.
+    Returns (U for canary, p-value).
+    """
+    n1, n2 = len(canary), len(baseline)
+    if not n1 or not n2:
+        raise ValueError("both samples need at least one value")
+    ranks, ties = _ranks(list(canary) + list(baseline))
+    u = sum(ranks[:n1]) - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    tie_term = sum(t ** 3 - t for t in ties) / (n * (n - 1)) if n > 1 else 0
+    var = n1 * n2 / 12 * ((n + 1) - tie_term)
+    if var <= 0:
+        return u, 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(var)
+    return u, 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def compare(baseline, canary, alpha=0.05, max_slowdown=0.1, max_error_delta=0.01):
+    """
+    Promote unless the canary has a clearly higher error rate, or is
+    significantly slower (p < alpha) by more than `max_slowdown` at the
+    median. Requiring both significance and effect size keeps large
+    samples from failing on a harmless 1ms shift.
+    """
+    b_pct, c_pct = baseline.percentiles(), canary.percentiles()
+    decision = {
+        "samples": {"baseline": baseline.total, "canary": canary.total},
+        "error_rate": {"baseline": round(baseline.error_rate, 4), "canary": round(canary.error_rate, 4)},
+        "p50_ms": {"baseline": round(b_pct.get("p50", 0), 2), "canary": round(c_pct.get("p50", 0), 2)},
+        "p95_ms": {"baseline": round(b_pct.get("p95", 0), 2), "canary": round(c_pct.get("p95", 0), 2)},
+    }
+    reasons = []
+    if canary.error_rate > baseline.error_rate + max_error_delta:
+        reasons.append(f"error rate {canary.error_rate:.1%} vs baseline {baseline.error_rate:.1%}")
+    if baseline.latencies_ms and canary.latencies_ms:
+        u, p = mann_whitney_u(baseline.latencies_ms, canary.latencies_ms)
+        decision.update(u=u, p_value=round(p, 6))
+        if p < alpha and c_pct["p50"] > b_pct["p50"] * (1 + max_slowdown):
+            reasons.append(f"latency p50 {c_pct['p50']:.0f}ms vs {b_pct['p50']:.0f}ms (p={p:.4f})")
+    elif not canary.latencies_ms:
+        reasons.append("canary returned no successful responses")
+
+    decision["decision"] = ROLLBACK if reasons else PROMOTE
+    decision["reasons"] = reasons
+    return decision
+
+
+def run_canary(baseline_url, canary_url, count=None, rate=None, report=None):
+    """
+    Probe baseline and canary side by side on the same request schedule
+    so both see the same load and time window, then decide. Returns 0
+    to promote, 2 to roll back; the decision goes into `report`.
+    """
+    count = count or int(get_env("DG_CANARY_REQUESTS", default="50"))
+    rate = rate or float(get_env("DG_CANARY_RATE", default="10"))
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="dg-canary") as pool:
+        fb = pool.submit(probe_latency, baseline_url, count, rate)
+        fc = pool.submit(probe_latency, canary_url, count, rate)
+        baseline, canary = fb.result(), fc.result()
+
+    decision = compare(
+        baseline, canary,
+        alpha=float(get_env("DG_CANARY_ALPHA", default="0.05")),
+        max_slowdown=float(get_env("DG_CANARY_MAX_SLOWDOWN", default="0.1")),
+        max_error_delta=float(get_env("DG_CANARY_MAX_ERROR_DELTA", default="0.01")),
+    )
+    if report is not None:
+        report.add("canary", decision)
+    if decision["decision"] == ROLLBACK:
+        log.error("Canary rejected: %s", "; ".join(decision["reasons"]))
+        return 2
+    log.info("Canary promoted (p50 %.0fms vs baseline %.0fms)",
+             decision["p50_ms"]["canary"], decision["p50_ms"]["baseline"])
+    return 0
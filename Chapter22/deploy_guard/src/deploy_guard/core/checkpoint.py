@@ -0,0 +1,83 @@
+import hashlib, json, logging, os, tempfile, threading, time
+
+log = logging.getLogger("deploy_guard.checkpoint")
+
+DEFAULT_TTL = 3600
+
+
+def digest(*parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def files_digest(paths):
+    """Content hash of a set of files; missing files hash as such."""
+    h = hashlib.sha256()
+    for p in sorted(paths):
+        h.update(p.encode() + b"\0")
+        try:
+            with open(p, "rb") as f:
+                h.update(hashlib.sha256(f.read()).digest())
+        except OSError:
+            h.update(b"<missing>")
+    return h.hexdigest()
+
+
+def stage_keys(stages, inputs):
+    """
+    One key per stage over its own inputs plus its dependencies' keys,
+    so a changed input also invalidates everything downstream of it.
+    Stages must be listed after their deps (build_stages order).
+    """
+    keys = {}
+    for s in stages:
+        keys[s.name] = digest(s.name, inputs.get(s.name), [keys[d] for d in s.deps])
+    return keys
+
+
+class Checkpoint:
+    """
+    Per-stage record of successful runs: {stage: {key, completed_at}}.
+    A stage is done only if its key matches and the record is younger
+    than `ttl` seconds; anything else is stale and the stage reruns.
+    Saved atomically after every change so a crash keeps progress.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.stages = {}
+        self._lock = threading.Lock()
+        try:
+            with open(path) as f:
+                self.stages = json.load(f).get("stages", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            log.warning("Ignoring unreadable checkpoint %s: %s", path, e)
+
+    def is_done(self, stage, key):
+        entry = self.stages.get(stage)
+        if not entry or entry.get("key") != key:
+            return False
+        return time.time() - entry.get("completed_at", 0) < self.ttl
+
+    def mark(self, stage, key):
+        with self._lock:
+            self.stages[stage] = {"key": key, "completed_at": time.time()}
+            self._save()
+
+    def clear(self, *stages):
+        with self._lock:
+            if any(self.stages.pop(s, None) for s in stages):
+                self._save()
+
+    def _save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix=".checkpoint-")
+            with os.fdopen(fd, "w") as f:
+                json.dump({"version": 1, "stages": self.stages}, f, indent=1)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            log.error("Failed to write checkpoint %s: %s", self.path, e)
@@ -0,0 +1,149 @@
+import logging, time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import Callable
+
+log = logging.getLogger("deploy_guard.dag")
+
+OK, FAILED, CANCELLED, SKIPPED = "ok", "failed", "cancelled", "skipped"
+
+
+@dataclass
+class Stage:
+    name: str
+    func: Callable[[], int]
+    deps: tuple = ()
+
+
+@dataclass
+class StageResult:
+    name: str
+    status: str
+    rc: int | None = None
+    start: float = 0.0
+    end: float = 0.0
+
+    @property
+    def duration(self):
+        return max(0.0, self.end - self.start)
+
+
+def _validate(stages):
+    names = {s.name for s in stages}
+    if len(names) != len(stages):
+        raise ValueError("Duplicate stage names")
+    for s in stages:
+        missing = set(s.deps) - names
+        if missing:
+            raise ValueError(f"Stage {s.name} depends on unknown stage(s): {sorted(missing)}")
+    # Kahn's algorithm: every stage must become ready at some point
+    indeg = {s.name: len(s.deps) for s in stages}
+    ready = [n for n, d in indeg.items() if d == 0]
+    seen = 0
+    while ready:
+        n = ready.pop()
+        seen += 1
+        for s in stages:
+            if n in s.deps:
+                indeg[s.name] -= 1
+                if indeg[s.name] == 0:
+                    ready.append(s.name)
+    if seen != len(stages):
+        raise ValueError("Stage graph has a cycle")
+
+
+def run_dag(stages, workers=4, fail_fast=True, on_halt=None):
+    """
+    Run stages as soon as their dependencies succeed, independent ones
+    concurrently. A non-zero rc (or exception) fails the stage; with
+    fail_fast every stage not yet started is cancelled, otherwise only
+    its dependents are skipped. Threads cannot be interrupted, so stages
+    already running are stopped through `on_halt` (e.g. Deadline.cancel,
+    which kills their commands and cuts their waits short); a stage that
+    then returns non-zero is recorded as cancelled, not failed. Without
+    it they run to completion. Returns {name: StageResult} in
+    declaration order.
+    """
+    _validate(stages)
+    by_name = {s.name: s for s in stages}
+    results = {}
+    running = {}
+    t0 = time.monotonic()
+    halted = False
+
+    def _call(stage):
+        start = time.monotonic() - t0
+        try:
+            rc = stage.func()
+        except Exception as e:
+            log.error("Stage %s raised: %s", stage.name, e)
+            rc = 2
+        return start, time.monotonic() - t0, rc
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dg-stage") as pool:
+        while True:
+            if not halted:
+                for s in stages:
+                    if s.name in results or s.name in running.values():
+                        continue
+                    dep_status = [results[d].status if d in results else None for d in s.deps]
+                    if any(st in (FAILED, CANCELLED, SKIPPED) for st in dep_status):
+                        results[s.name] = StageResult(s.name, SKIPPED)
+                    elif all(st == OK for st in dep_status):
+                        running[pool.submit(_call, s)] = s.name
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = running.pop(fut)
+                start, end, rc = fut.result()
+                status = OK if rc == 0 else CANCELLED if halted and on_halt else FAILED
+                results[name] = StageResult(name, status, rc, start, end)
+                log.info("Stage %s %s in %.2fs", name, status, end - start)
+                if status == FAILED and fail_fast and not halted:
+                    halted = True
+                    log.error("Stage %s failed; cancelling pending stages", name)
+                    if on_halt and running:
+                        on_halt()
+
+        for s in stages:
+            results.setdefault(s.name, StageResult(s.name, CANCELLED if halted else SKIPPED))
+
+    return {s.name: results[s.name] for s in by_name.values()}
+
+
+def critical_path(stages, results):
+    """
+    The chain of completed stages that bounded wall time: start from the
+    stage that finished last and keep following its latest-finishing
+    dependency.
+    """
+    deps = {s.name: s.deps for s in stages}
+    finished = {n: r for n, r in results.items() if r.status in (OK, FAILED)}
+    if not finished:
+        return []
+    node = max(finished.values(), key=lambda r: r.end).name
+    path = [node]
+    while True:
+        prior = [finished[d] for d in deps[node] if d in finished]
+        if not prior:
+            break
+        node = max(prior, key=lambda r: r.end).name
+        path.append(node)
+    return list(reversed(path))
+
+
+def timing_report(stages, results):
+    """Loggable lines: per-stage timings, then the critical path."""
+    lines = ["Stage timings:"]
+    for r in results.values():
+        if r.status in (OK, FAILED):
+            lines.append(f"  {r.name:<12} {r.status:<9} {r.start:7.2f}s -> {r.end:7.2f}s ({r.duration:.2f}s)")
+        else:
+            lines.append(f"  {r.name:<12} {r.status}")
+    path = critical_path(stages, results)
+    if path:
+        chain = " -> ".join(f"{n} ({results[n].duration:.2f}s)" for n in path)
+        lines.append(f"Critical path: {chain} = {results[path[-1]].end:.2f}s wall")
+    return lines
@@ -0,0 +1,150 @@
+import logging, os, signal, subprocess, threading, time
+from contextlib import contextmanager
+
+log = logging.getLogger("deploy_guard.deadline")
+
+KILL_GRACE = 5.0
+TIMED_OUT = 124  # rc of a command refused or killed for the deadline, as timeout(1)
+MIN_TIMEOUT = 0.01
+
+
+class Deadline:
+    """
+    A wall-clock budget shared by everything in one run. Work asks it how
+    long it may block (`fit`), sleeps through it (`sleep` wakes early on
+    expiry) and starts subprocesses through `run`. When the budget runs
+    out a timer kills every tracked process group, so a hung kubectl and
+    anything it spawned die with it. `cancel` does the same early, when
+    the run is halted for another reason. Seconds of None means unlimited.
+    """
+
+    def __init__(self, seconds=None):
+        self.budget = seconds
+        self.expires = time.monotonic() + seconds if seconds else None
+        self._expired = threading.Event()
+        self._procs = set()
+        self._lock = threading.Lock()
+        self._timer = None
+        self.cancelled = False
+
+    def remaining(self):
+        if self.expires is None:
+            return None
+        return max(0.0, self.expires - time.monotonic())
+
+    def expired(self):
+        return self._expired.is_set() or (self.expires is not None and time.monotonic() >= self.expires)
+
+    def fit(self, timeout):
+        """`timeout` capped to what is left of the budget (never 0, which means "no timeout" to many APIs)."""
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        return max(MIN_TIMEOUT, remaining if timeout is None else min(float(timeout), remaining))
+
+    def sleep(self, seconds):
+        """Sleep up to `seconds`; False if the budget ran out first."""
+        self._expired.wait(self.fit(seconds))
+        return not self.expired()
+
+    def start(self):
+        if self.expires is not None:
+            self._timer = threading.Timer(self.remaining(), self.expire)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def stop(self):
+        if self._timer:
+            self._timer.cancel()
+
+    def timed_out(self):
+        """Expired because the budget ran out, not because of cancel()."""
+        return self.expired() and not self.cancelled
+
+    def cancel(self):
+        """Expire now: later work is refused and running commands are killed."""
+        self.cancelled = True
+        self.expire()
+
+    def expire(self):
+        self._expired.set()
+        with self._lock:
+            procs = list(self._procs)
+        if procs and self.cancelled:
+            log.error("Run cancelled; killing %d running command(s)", len(procs))
+        elif procs:
+            log.error("Deadline of %.0fs exceeded; killing %d running command(s)", self.budget, len(procs))
+        for proc in procs:
+            _kill_group(proc)
+
+    def run(self, cmd, capture=False):
+        """
+        subprocess.run() in its own session (process group) that is
+        killed with the budget. Returns a CompletedProcess; rc TIMED_OUT
+        when the command was refused or killed for the deadline.
+        """
+        if self.expired():
+            log.error("%s; not running %s", "Run cancelled" if self.cancelled else "Deadline exceeded", cmd)
+            return subprocess.CompletedProcess(cmd, TIMED_OUT, "", "")
+        pipe = subprocess.PIPE if capture else None
+        proc = subprocess.Popen(cmd, stdout=pipe, stderr=pipe, text=True, start_new_session=True)
+        with self._lock:
+            self._procs.add(proc)
+        try:
+            if self.expired():  # expired between the check and the registration
+                _kill_group(proc)
+            try:
+                out, err = proc.communicate(timeout=self.fit(None))
+            except subprocess.TimeoutExpired:
+                _kill_group(proc)
+                out, err = proc.communicate()
+        finally:
+            with self._lock:
+                self._procs.discard(proc)
+        rc = proc.returncode
+        if self.expired() and rc != 0:
+            log.error("Killed at %s: %s", "cancellation" if self.cancelled else "deadline", cmd)
+            rc = TIMED_OUT
+        return subprocess.CompletedProcess(cmd, rc, out, err)
+
+
+def _kill_group(proc):
+    """SIGTERM the process group, SIGKILL it if still alive after KILL_GRACE."""
+    for sig, wait in ((signal.SIGTERM, KILL_GRACE), (signal.SIGKILL, None)):
+        try:
+            os.killpg(proc.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            return
+        if wait is None:
+            return
+        try:
+            proc.wait(wait)
+            return
+        except subprocess.TimeoutExpired:
+            pass
+
+
+_current = Deadline()
+
+
+def current():
+    """The deadline of the run in progress (unlimited outside `budget`)."""
+    return _current
+
+
+@contextmanager
+def budget(seconds):
+    """
+    Make a Deadline of `seconds` current for the block. Process-wide,
+    not per thread, so that stage and worker threads all see it; nest
+    budgets only from a single thread (e.g. cleanup after the run).
+    """
+    global _current
+    deadline, previous = Deadline(seconds), _current
+    _current = deadline
+    deadline.start()
+    try:
+        yield deadline
+    finally:
+        deadline.stop()
+        _current = previous
@@ -1,34 +1,453 @@
-import subprocess, logging, sys
+import json, logging, os, glob, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import yaml
+from deploy_guard.config import get_env
+from deploy_guard import metrics
+from deploy_guard.core.apply_cache import ApplyCache, load_docs, content_hash, object_key, live_version
+from deploy_guard.core.rollback_plan import RollbackPlan, Snapshot
+from deploy_guard.core.schema import get_schemas, validate_manifests
+from deploy_guard.core.deadline import current as current_deadline
+
 log = logging.getLogger("deploy_guard.k8s")
 
+MANIFEST_EXTS = (".yaml", ".yml", ".json")
+DEFAULT_APPLY_WORKERS = 4
+DEFAULT_ROLLOUT_TIMEOUT = 600
+BACKENDS = ("kubectl", "api")
+
+@dataclass
+class ApplyOutcome:
+    manifest: str
+    namespace: str | None
+    rc: int
+    duration: float
+    stage: str  # "dry-run", "apply", or "cached" when skipped as unchanged
+    batch: int = 1  # files sharing one backend call; `duration` is that call's
+
 def run_cmd(cmd):
-    try:
-        subprocess.check_call(cmd)
-        return 0
-    except subprocess.CalledProcessError as e:
+    """Run under the current deadline: killed (process group and all) when it expires."""
+    if current_deadline().run(cmd).returncode != 0:
         log.error("Command failed: %s", cmd)
         return 2
+    return 0
 
-def deploy(manifest):
-    # Dry-run first
-    rc = run_cmd(["kubectl", "apply", "--dry-run=server", "-f", manifest])
-    if rc != 0:
-        log.error("Dry-run failed")
+def _capture(cmd):
+    """stdout of a successful command, else None."""
+    r = current_deadline().run(cmd, capture=True)
+    if r.returncode != 0:
+        log.debug("Command failed: %s: %s", cmd, r.stderr.strip())
+        return None
+    return r.stdout
+
+def expand_manifests(spec):
+    """
+    Resolve files, directories (their *.yaml/*.yml/*.json, sorted) and
+    glob patterns into a de-duplicated list of manifest paths.
+    """
+    specs = [spec] if isinstance(spec, str) else list(spec)
+    paths = []
+    for s in specs:
+        if os.path.isdir(s):
+            found = sorted(
+                os.path.join(s, f) for f in os.listdir(s)
+                if f.endswith(MANIFEST_EXTS) and os.path.isfile(os.path.join(s, f))
+            )
+        elif glob.has_magic(s):
+            found = sorted(glob.glob(s, recursive=True))
+        else:
+            found = [s]
+        for p in found:
+            if p not in paths:
+                paths.append(p)
+    return paths
+
+def manifest_namespace(path):
+    """
+    The namespace every object in the file declares, or None when some
+    object omits it or they disagree (kubectl then decides per object).
+    """
+    try:
+        with open(path) as f:
+            docs = [d for d in yaml.safe_load_all(f) if d]
+    except (OSError, yaml.YAMLError):
+        return None
+    namespaces = {(d.get("metadata") or {}).get("namespace") for d in docs if isinstance(d, dict)}
+    if len(namespaces) == 1:
+        return namespaces.pop()
+    return None
+
+def group_by_namespace(paths):
+    groups = {}
+    for p in paths:
+        groups.setdefault(manifest_namespace(p), []).append(p)
+    return groups
+
+class KubectlBackend:
+    """Shells out to kubectl; works with any kubeconfig auth plugin."""
+
+    name = "kubectl"
+
+    def __init__(self, context=None):
+        self.context = context
+
+    def _kubectl(self, *args):
+        return ["kubectl", *(["--context", self.context] if self.context else []), *args]
+
+    def apply(self, files, namespace, dry_run):
+        cmd = self._kubectl("apply")
+        if dry_run:
+            cmd.append("--dry-run=server")
+        if namespace:
+            cmd += ["-n", namespace]
+        for f in files:
+            cmd += ["-f", f]
+        return run_cmd(cmd)
+
+    def cluster_id(self):
+        out = _capture(self._kubectl("config", "view", "--minify",
+                                     "-o", "jsonpath={.clusters[0].cluster.server}"))
+        return (out or "").strip() or "unknown"
+
+    def live_objects(self, files, namespace):
+        """Live objects for every doc in `files`, in order; None if any is missing."""
+        cmd = self._kubectl("get", "-o", "json")
+        if namespace:
+            cmd += ["-n", namespace]
+        for f in files:
+            cmd += ["-f", f]
+        out = _capture(cmd)
+        if out is None:
+            return None
+        data = json.loads(out)
+        return data.get("items", []) if data.get("kind") == "List" else [data]
+
+    def snapshot(self, deployment, namespace):
+        out = _capture(self._kubectl("get", f"deployment/{deployment}", "-n", namespace, "-o", "json"))
+        return Snapshot.from_deployment(json.loads(out), namespace) if out else None
+
+    def restore(self, snap):
+        patch = json.dumps([{"op": "replace", "path": "/spec/template", "value": snap.template}])
+        return run_cmd(self._kubectl("patch", f"deployment/{snap.name}", "-n", snap.namespace,
+                                     "--type=json", "-p", patch))
+
+    def wait_ready(self, deployment, namespace, timeout):
+        # rollout status is itself watch-based; it just costs a process
+        return run_cmd(self._kubectl("rollout", "status", f"deployment/{deployment}",
+                                     "-n", namespace, f"--timeout={max(1, int(timeout))}s"))
+
+    def rollback(self, deployment, namespace):
+        return run_cmd(self._kubectl("rollout", "undo", f"deployment/{deployment}", "-n", namespace))
+
+    def wait_daemonset(self, name, namespace, timeout):
+        return run_cmd(self._kubectl("rollout", "status", f"daemonset/{name}",
+                                     "-n", namespace, f"--timeout={max(1, int(timeout))}s"))
+
+    def delete_daemonset(self, name, namespace):
+        return run_cmd(self._kubectl("delete", f"daemonset/{name}", "-n", namespace,
+                                     "--ignore-not-found", "--wait=false"))
+
+_backends = {}
+_backend_lock = threading.Lock()
+
+def _make_backend(context):
+    name = get_env("DG_K8S_BACKEND", default="kubectl")
+    if name not in BACKENDS:
+        raise RuntimeError(f"DG_K8S_BACKEND must be one of {BACKENDS}, got {name!r}")
+    if name == "api":
+        try:
+            from deploy_guard.core.k8s_api import ApiBackend
+            return ApiBackend(context=context)
+        except (OSError, RuntimeError, KeyError) as e:
+            log.warning("API backend unavailable (%s); using kubectl", e)
+    return KubectlBackend(context)
+
+def get_backend(context=None):
+    """
+    Process-wide backend per kubeconfig context (None = current one),
+    chosen by DG_K8S_BACKEND (kubectl|api, default kubectl). The api
+    backend keeps one pooled connection for the whole run; if it cannot
+    be configured we fall back to kubectl.
+    """
+    with _backend_lock:
+        if context not in _backends:
+            _backends[context] = _make_backend(context)
+            log.debug("Kubernetes backend for %s: %s", context or "current context", _backends[context].name)
+        return _backends[context]
+
+def reset_backend():
+    with _backend_lock:
+        for backend in _backends.values():
+            if hasattr(backend, "close"):
+                backend.close()
+        _backends.clear()
+
+def _apply_group(backend, namespace, files, dry_run):
+    """
+    One backend call for the whole group; every outcome carries the
+    group's time and size. A failed dry run is retried file by file so
+    the report names the broken manifest(s). A failed real apply is not:
+    retrying would re-apply whatever already went through, so the whole
+    group is reported failed (and left out of the apply cache).
+    """
+    start = time.monotonic()
+    rc = backend.apply(files, namespace, dry_run)
+    elapsed = time.monotonic() - start
+    stage = "dry-run" if dry_run else "apply"
+    if rc == 0 or len(files) == 1 or not dry_run:
+        return [ApplyOutcome(f, namespace, rc, elapsed, stage, len(files)) for f in files]
+
+    outcomes = []
+    for f in files:
+        t = time.monotonic()
+        outcomes.append(ApplyOutcome(
+            f, namespace, backend.apply([f], namespace, dry_run), time.monotonic() - t, stage
+        ))
+    return outcomes
+
+def _run_groups(backend, groups, dry_run, workers):
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="dg-apply") as pool:
+        futures = [pool.submit(_apply_group, backend, ns, files, dry_run) for ns, files in groups.items()]
+        return [o for fut in futures for o in fut.result()]
+
+def _docs_with_hashes(files):
+    out = {}
+    for f in files:
+        try:
+            out[f] = [(d, content_hash(d)) for d in load_docs(f)]
+        except (OSError, yaml.YAMLError):
+            out[f] = None  # unreadable: let apply report it
+    return out
+
+def _split_unchanged(groups, cache, backend, cluster, workers):
+    """
+    Drop files whose every object hashes the same as the last successful
+    apply and whose live version has not moved since. One live lookup
+    per namespace group; a failed lookup (e.g. an object was deleted)
+    just means the group's candidates are applied.
+    """
+    def _check(namespace, files):
+        docs = _docs_with_hashes(files)
+        candidates = [
+            f for f in files
+            if docs[f] and all(cache.matches(object_key(cluster, d, namespace), h) for d, h in docs[f])
+        ]
+        if not candidates:
+            return namespace, files, []
+        live = backend.live_objects(candidates, namespace)
+        flat = [(f, d) for f in candidates for d, _ in docs[f]]
+        if live is None or len(live) != len(flat):
+            return namespace, files, []
+        stale = {f for (f, d), obj in zip(flat, live)
+                 if not cache.fresh(object_key(cluster, d, namespace), live_version(obj))}
+        skip = [f for f in candidates if f not in stale]
+        return namespace, [f for f in files if f not in skip], skip
+
+    pending, skipped = {}, []
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="dg-cache") as pool:
+        for namespace, todo, skip in pool.map(lambda kv: _check(*kv), groups.items()):
+            if todo:
+                pending[namespace] = todo
+            skipped += [ApplyOutcome(f, namespace, 0, 0.0, "cached") for f in skip]
+    return pending, skipped
+
+def _record_applied(outcomes, cache, backend, cluster):
+    by_ns = {}
+    for o in outcomes:
+        if o.rc == 0 and o.stage == "apply":
+            by_ns.setdefault(o.namespace, []).append(o.manifest)
+    for namespace, files in by_ns.items():
+        docs = _docs_with_hashes(files)
+        flat = [(d, h) for f in files for d, h in (docs[f] or [])]
+        live = backend.live_objects(files, namespace)
+        aligned = live is not None and len(live) == len(flat)
+        for i, (d, h) in enumerate(flat):
+            key = object_key(cluster, d, namespace)
+            if aligned:
+                cache.record(key, h, live_version(live[i]))
+            else:
+                cache.forget(key)
+    cache.save()
+
+_last_plan = RollbackPlan()
+
+def last_rollback_plan():
+    """Rollback targets captured by the most recent apply in this process."""
+    return _last_plan
+
+def _deployments_in(groups):
+    targets = []
+    for namespace, files in groups.items():
+        for f in files:
+            try:
+                docs = load_docs(f)
+            except (OSError, yaml.YAMLError):
+                continue
+            for d in docs:
+                meta = d.get("metadata") or {}
+                if d.get("kind") == "Deployment" and meta.get("name"):
+                    targets.append((meta["name"], meta.get("namespace") or namespace or "default"))
+    return targets
+
+def apply_to(backend, spec, workers=None, force=False, cache=None):
+    """
+    Server dry-run every namespace group, then apply them, both with up
+    to `workers` groups in flight. Nothing is applied unless every dry
+    run passes. Live Deployments are snapshotted between the two. With
+    DG_APPLY_CACHE set, files that are unchanged since their last
+    successful apply (and not modified live since) are skipped unless
+    `force`. Concurrent callers pass one shared ApplyCache as `cache`.
+    Returns (rc, [ApplyOutcome], RollbackPlan).
+    """
+    paths = expand_manifests(spec)
+    if not paths:
+        log.error("No manifests matched: %s", spec)
+        return 2, [], RollbackPlan()
+    workers = workers or int(get_env("DG_APPLY_WORKERS", default=DEFAULT_APPLY_WORKERS))
+    groups = group_by_namespace(paths)
+
+    cache_path = get_env("DG_APPLY_CACHE")
+    cluster = None
+    skipped = []
+    if cache is None and cache_path:
+        cache = ApplyCache(cache_path)
+    if cache is not None:
+        cluster = backend.cluster_id()
+        if not force:
+            groups, skipped = _split_unchanged(groups, cache, backend, cluster, workers)
+        if skipped:
+            log.info("Skipping %d unchanged manifest(s)", len(skipped))
+        if not groups:
+            return 0, skipped, RollbackPlan()
+
+    log.info("Applying %d manifest(s) in %d namespace group(s)",
+             sum(len(f) for f in groups.values()), len(groups))
+
+    outcomes = _run_groups(backend, groups, dry_run=True, workers=workers)
+    if any(o.rc != 0 for o in outcomes):
+        return 2, skipped + outcomes, RollbackPlan()
+
+    plan = RollbackPlan.capture(backend, _deployments_in(groups), workers)
+
+    outcomes = _run_groups(backend, groups, dry_run=False, workers=workers)
+    if cache is not None:
+        _record_applied(outcomes, cache, backend, cluster)
+    return (2 if any(o.rc != 0 for o in outcomes) else 0), skipped + outcomes, plan
+
+def apply_manifests(spec, workers=None, force=False):
+    """
+    apply_to() on the current context. The rollback plan is kept for
+    rollback_release() (and DG_ROLLBACK_FILE). Returns (rc, [ApplyOutcome]).
+    """
+    global _last_plan
+    rc, outcomes, plan = apply_to(get_backend(), spec, workers, force)
+    _last_plan = plan
+    plan.save(get_env("DG_ROLLBACK_FILE"))
+    return rc, outcomes
+
+def log_outcomes(outcomes):
+    for o in outcomes:
+        status = "ok" if o.rc == 0 else "FAILED"
+        group = f" (group of {o.batch})" if o.batch > 1 else ""
+        log.info("  %-40s ns=%-12s %-7s %-6s %.2fs%s", o.manifest, o.namespace or "-", o.stage, status, o.duration, group)
+
+def check_schemas(manifest, workers=None):
+    """
+    Offline OpenAPI validation against DG_SCHEMA_DIR, before any cluster
+    call; a no-op when it is unset. Returns 0 or 2.
+    """
+    schemas = get_schemas()
+    if schemas is None:
+        return 0
+    workers = workers or int(get_env("DG_APPLY_WORKERS", default=DEFAULT_APPLY_WORKERS))
+    return validate_manifests(expand_manifests(manifest), schemas, workers)
+
+def check_manifest(manifest):
+    """
+    Offline pre-flight: every manifest exists and is a non-empty file,
+    and with DG_SCHEMA_DIR set, matches the Kubernetes OpenAPI schemas.
+    """
+    paths = expand_manifests(manifest)
+    if not paths:
+        log.error("No manifests matched: %s", manifest)
         return 2
+    for p in paths:
+        if not os.path.isfile(p):
+            log.error("Manifest not found: %s", p)
+            return 2
+        if os.path.getsize(p) == 0:
+            log.error("Manifest is empty: %s", p)
+            return 2
+    return check_schemas(paths)
 
-    # Real apply
-    rc = run_cmd(["kubectl", "apply", "-f", manifest])
+def deploy(manifest, workers=None, force=False, validate=True):
+    """
+    Apply a file, directory, glob or list of them; returns 0 or 2.
+    `validate=False` skips the offline schema check (the pipeline's
+    manifest stage has already run it).
+    """
+    if validate and check_schemas(manifest, workers) != 0:
+        log.error("Schema validation failed; nothing sent to the cluster")
+        return 2
+    rc, outcomes = apply_manifests(manifest, workers, force)
+    log_outcomes(outcomes)
     if rc != 0:
-        log.error("Apply failed")
+        failed = {o.stage for o in outcomes if o.rc != 0}
+        log.error("Dry-run failed" if "dry-run" in failed else "Apply failed")
         return 2
 
     log.info("Deployment applied successfully: %s", manifest)
     return 0
 
+def _rollback_timeout():
+    return current_deadline().fit(float(get_env("DG_ROLLOUT_TIMEOUT", default=DEFAULT_ROLLOUT_TIMEOUT)))
+
 def rollback(deployment, namespace="default"):
-    rc = run_cmd(["kubectl", "rollout", "undo", f"deployment/{deployment}", "-n", namespace])
+    """
+    Restore one deployment from its pre-apply snapshot (this process, or
+    DG_ROLLBACK_FILE from an earlier `apply`); without one, fall back to
+    `rollout undo`.
+    """
+    plan = _last_plan if _last_plan.get(deployment, namespace) else RollbackPlan.load(get_env("DG_ROLLBACK_FILE"))
+    if plan.get(deployment, namespace):
+        return plan.restore(get_backend(), only={f"{namespace}/{deployment}"}, timeout=_rollback_timeout())
+
+    start = time.monotonic()
+    rc = get_backend().rollback(deployment, namespace)
+    metrics.record("deploy_guard_rollback_seconds", time.monotonic() - start,
+                   deployment=deployment, namespace=namespace, outcome="ok" if rc == 0 else "failed")
+    metrics.flush()
     if rc == 0:
         log.info("Rollback executed for %s", deployment)
     else:
         log.error("Rollback failed for %s", deployment)
-    return rc
\ No newline at end of file
+    return rc
+
+def rollback_release(deployment, namespace="default", workers=None):
+    """
+    Undo the last deploy(): every Deployment it changed is patched back
+    concurrently. If nothing was captured, roll back `deployment` only.
+    """
+    if _last_plan:
+        workers = workers or int(get_env("DG_APPLY_WORKERS", default=DEFAULT_APPLY_WORKERS))
+        return _last_plan.restore(get_backend(), workers=workers, timeout=_rollback_timeout())
+    return rollback(deployment, namespace)
+
+def wait_for_rollout(deployment, namespace="default", timeout=None, prepulled=None):
+    """
+    Block until the deployment's new ReplicaSet is fully available, its
+    progress deadline is exceeded, or `timeout` (DG_ROLLOUT_TIMEOUT,
+    default 600s) passes. Time-to-ready goes to DG_METRICS_FILE, labelled
+    prepull="on"/"off" when the caller says whether images were pre-pulled.
+    """
+    timeout = current_deadline().fit(float(timeout or get_env("DG_ROLLOUT_TIMEOUT", default=DEFAULT_ROLLOUT_TIMEOUT)))
+    start = time.monotonic()
+    rc = get_backend().wait_ready(deployment, namespace, timeout)
+    elapsed = time.monotonic() - start
+    outcome = "ready" if rc == 0 else "failed"
+    log.info("Rollout of %s %s after %.1fs", deployment, outcome, elapsed)
+    labels = {} if prepulled is None else {"prepull": "on" if prepulled else "off"}
+    metrics.record("deploy_guard_rollout_seconds", elapsed,
+                   deployment=deployment, namespace=namespace, outcome=outcome, **labels)
+    metrics.flush()
+    return rc
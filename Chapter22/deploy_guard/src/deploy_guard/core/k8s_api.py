@@ -0,0 +1,395 @@
+import atexit, base64, json, logging, os, shutil, tempfile, threading, time
+from urllib.parse import quote
+import requests
+from requests.adapters import HTTPAdapter
+import yaml
+from deploy_guard.config import get_env
+from deploy_guard.core.rollout import watch_rollout, daemonset_status, RolloutFailed
+from deploy_guard.core.rollback_plan import Snapshot
+from deploy_guard.core.deadline import current as current_deadline
+
+log = logging.getLogger("deploy_guard.k8s_api")
+
+FIELD_MANAGER = "deploy-guard"
+# The one place the revision annotation is read (rollout, rollback plan, rollback)
+REVISION = "deployment.kubernetes.io/revision"
+
+
+def revision_of(obj):
+    """A Deployment's or ReplicaSet's revision annotation as an int; 0 when unset."""
+    try:
+        return int(((obj.get("metadata") or {}).get("annotations") or {}).get(REVISION, 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+class KubeAPIError(RuntimeError):
+    def __init__(self, status, message):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+
+def _data_file(b64, directory):
+    """requests wants cert/key paths; materialize *-data fields once (mode 0600)."""
+    fd, path = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, "wb") as f:
+        f.write(base64.b64decode(b64))
+    return path
+
+
+# Fields holding file paths, which kubectl resolves against the kubeconfig's directory
+_PATH_FIELDS = {
+    "clusters": ("certificate-authority",),
+    "users": ("client-certificate", "client-key", "tokenFile"),
+}
+
+
+def load_kubeconfig(paths):
+    """
+    Merge kubeconfig files the way kubectl does for a KUBECONFIG list:
+    the first file to define a named cluster, context or user (or the
+    current-context) wins, and missing files are skipped. Relative file
+    paths are resolved against the file that names them.
+    """
+    merged = {"clusters": [], "contexts": [], "users": []}
+    found = False
+    for path in paths:
+        try:
+            with open(path) as f:
+                cfg = yaml.safe_load(f) or {}
+        except FileNotFoundError:
+            continue
+        found = True
+        if "current-context" not in merged and cfg.get("current-context"):
+            merged["current-context"] = cfg["current-context"]
+        base = os.path.dirname(os.path.abspath(path))
+        for section in ("clusters", "contexts", "users"):
+            known = {item.get("name") for item in merged[section]}
+            for item in cfg.get(section) or []:
+                if item.get("name") in known:
+                    continue
+                body = dict(item.get(section[:-1]) or {})
+                for field in _PATH_FIELDS.get(section, ()):
+                    if body.get(field) and not os.path.isabs(body[field]):
+                        body[field] = os.path.join(base, body[field])
+                merged[section].append({"name": item.get("name"), section[:-1]: body})
+                known.add(item.get("name"))
+    if not found:
+        raise FileNotFoundError(f"no kubeconfig found at {os.pathsep.join(paths)}")
+    return merged
+
+
+class KubeClient:
+    """
+    Minimal Kubernetes REST client over one pooled requests.Session, so
+    every call after the first reuses the same TLS connections. Resource
+    paths come from API discovery, cached per group/version.
+    """
+
+    def __init__(self, server, token=None, verify=True, cert=None, namespace="default", pool_size=10,
+                 keydir=None):
+        self.server = server.rstrip("/")
+        self.namespace = namespace
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.verify = verify
+        if cert:
+            self.session.cert = cert
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+        self._discovery = {}
+        self._lock = threading.Lock()
+        # 0700 directory holding CA/cert/key material from the kubeconfig
+        self.keydir = keydir
+        if keydir:
+            atexit.register(self.close)
+
+    def close(self):
+        self.session.close()
+        if self.keydir:
+            shutil.rmtree(self.keydir, ignore_errors=True)
+            atexit.unregister(self.close)
+
+    @classmethod
+    def from_config(cls, context=None, pool_size=10):
+        """
+        DG_K8S_API_SERVER (+ optional DG_K8S_TOKEN) wins; otherwise the
+        kubeconfig files listed in KUBECONFIG (merged as kubectl does) or
+        ~/.kube/config, using `context` or the current-context.
+        """
+        server = get_env("DG_K8S_API_SERVER")
+        if server and not context:
+            return cls(server, token=get_env("DG_K8S_TOKEN", secret=True),
+                       verify=get_env("DG_K8S_CA_FILE") or True, pool_size=pool_size)
+
+        paths = get_env("KUBECONFIG", default=os.path.expanduser("~/.kube/config"))
+        cfg = load_kubeconfig([p for p in paths.split(os.pathsep) if p])
+
+        def _named(section, name):
+            for item in cfg.get(section) or []:
+                if item.get("name") == name:
+                    return item.get(section[:-1]) or {}
+            raise RuntimeError(f"kubeconfig ({paths}) has no {section[:-1]} named {name!r}")
+
+        ctx = _named("contexts", context or cfg.get("current-context"))
+        cluster = _named("clusters", ctx.get("cluster"))
+        user = _named("users", ctx.get("user"))
+        keydir = None
+        if cluster.get("certificate-authority-data") or user.get("client-certificate-data"):
+            keydir = tempfile.mkdtemp(prefix="deploy-guard-")  # 0700
+
+        if cluster.get("insecure-skip-tls-verify"):
+            verify = False
+        elif cluster.get("certificate-authority-data"):
+            verify = _data_file(cluster["certificate-authority-data"], keydir)
+        else:
+            verify = cluster.get("certificate-authority") or True
+
+        cert = None
+        if user.get("client-certificate-data"):
+            cert = (_data_file(user["client-certificate-data"], keydir), _data_file(user["client-key-data"], keydir))
+        elif user.get("client-certificate"):
+            cert = (user["client-certificate"], user.get("client-key"))
+
+        token = user.get("token")
+        if not token and user.get("tokenFile"):
+            with open(user["tokenFile"]) as f:
+                token = f.read().strip()
+        if not token and not cert:
+            if keydir:
+                shutil.rmtree(keydir, ignore_errors=True)
+            # exec/auth-provider plugins are kubectl territory
+            raise RuntimeError("kubeconfig user has no token or client certificate")
+
+        return cls(cluster["server"], token=token, verify=verify, cert=cert,
+                   namespace=ctx.get("namespace", "default"), pool_size=pool_size, keydir=keydir)
+
+    # -- transport -----------------------------------------------------
+
+    def request(self, method, path, **kw):
+        r = self.session.request(method, self.server + path, timeout=current_deadline().fit(kw.pop("timeout", 30)), **kw)
+        if r.status_code >= 400:
+            try:
+                msg = r.json().get("message", r.text)
+            except ValueError:
+                msg = r.text
+            raise KubeAPIError(r.status_code, msg)
+        return r.json() if r.content else {}
+
+    # -- discovery -----------------------------------------------------
+
+    def resource_for(self, api_version, kind):
+        """(plural, namespaced) for a kind, from cached API discovery."""
+        with self._lock:
+            if api_version not in self._discovery:
+                base = "/api/v1" if api_version == "v1" else f"/apis/{api_version}"
+                listing = self.request("GET", base)
+                self._discovery[api_version] = {
+                    r["kind"]: (r["name"], r["namespaced"])
+                    for r in listing.get("resources", []) if "/" not in r["name"]
+                }
+            kinds = self._discovery[api_version]
+        if kind not in kinds:
+            raise KubeAPIError(404, f"{api_version} has no kind {kind}")
+        return kinds[kind]
+
+    def path_for(self, api_version, kind, namespace=None, name=None):
+        plural, namespaced = self.resource_for(api_version, kind)
+        base = "/api/v1" if api_version == "v1" else f"/apis/{api_version}"
+        path = base
+        if namespaced:
+            path += f"/namespaces/{quote(namespace or self.namespace)}"
+        path += f"/{plural}"
+        if name:
+            path += f"/{quote(name)}"
+        return path
+
+    # -- verbs ---------------------------------------------------------
+
+    def apply(self, obj, namespace=None, dry_run=False):
+        """
+        Server-side apply of one object (optionally dry-run). Fields owned
+        by another manager (an HPA's replicas, a controller's annotations)
+        make the apply fail with 409 unless DG_K8S_FORCE_CONFLICTS=1 takes
+        them over.
+        """
+        meta = obj.get("metadata") or {}
+        path = self.path_for(obj["apiVersion"], obj["kind"], meta.get("namespace") or namespace, meta["name"])
+        params = {"fieldManager": FIELD_MANAGER}
+        if get_env("DG_K8S_FORCE_CONFLICTS", default="0") == "1":
+            params["force"] = "true"
+        if dry_run:
+            params["dryRun"] = "All"
+        return self.request(
+            "PATCH", path, params=params,
+            data=yaml.safe_dump(obj).encode(),
+            headers={"Content-Type": "application/apply-patch+yaml"},
+        )
+
+    def get(self, api_version, kind, name, namespace=None):
+        return self.request("GET", self.path_for(api_version, kind, namespace, name))
+
+    def list(self, api_version, kind, namespace=None, label_selector=None):
+        params = {"labelSelector": label_selector} if label_selector else None
+        return self.request("GET", self.path_for(api_version, kind, namespace), params=params)
+
+    def watch(self, api_version, kind, namespace=None, field_selector=None, resource_version=None, timeout=60):
+        """Yield watch events until the server closes the stream."""
+        timeout = current_deadline().fit(timeout)
+        params = {"watch": "1", "timeoutSeconds": max(1, int(timeout)), "allowWatchBookmarks": "true"}
+        if field_selector:
+            params["fieldSelector"] = field_selector
+        if resource_version:
+            params["resourceVersion"] = resource_version
+        url = self.server + self.path_for(api_version, kind, namespace)
+        with self.session.get(url, params=params, stream=True, timeout=(10, timeout + 10)) as r:
+            if r.status_code >= 400:
+                raise KubeAPIError(r.status_code, r.text)
+            for line in r.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+    def json_patch(self, api_version, kind, name, ops, namespace=None):
+        return self.request(
+            "PATCH", self.path_for(api_version, kind, namespace, name),
+            data=json.dumps(ops),
+            headers={"Content-Type": "application/json-patch+json"},
+        )
+
+
+class ApiBackend:
+    """deploy_k8s backend that talks to the API server in-process."""
+
+    name = "api"
+
+    def __init__(self, client=None, context=None):
+        self.client = client or KubeClient.from_config(
+            context=context, pool_size=int(get_env("DG_APPLY_WORKERS", default=4)) * 2
+        )
+
+    def apply(self, files, namespace, dry_run):
+        for path in files:
+            try:
+                with open(path) as f:
+                    docs = [d for d in yaml.safe_load_all(f) if d]
+                for doc in docs:
+                    self.client.apply(doc, namespace=namespace, dry_run=dry_run)
+            except (OSError, yaml.YAMLError, KeyError, KubeAPIError, requests.RequestException) as e:
+                log.error("%s %s failed: %s", "Dry-run" if dry_run else "Apply", path, e)
+                return 2
+        return 0
+
+    def cluster_id(self):
+        return self.client.server
+
+    def close(self):
+        self.client.close()
+
+    def live_objects(self, files, namespace):
+        """Live objects for every doc in `files`, in order; None if any is missing."""
+        live = []
+        try:
+            for path in files:
+                with open(path) as f:
+                    for doc in (d for d in yaml.safe_load_all(f) if d):
+                        meta = doc.get("metadata") or {}
+                        live.append(self.client.get(doc["apiVersion"], doc["kind"], meta["name"],
+                                                    meta.get("namespace") or namespace))
+        except (OSError, yaml.YAMLError, KeyError, KubeAPIError, requests.RequestException) as e:
+            log.debug("Live lookup failed: %s", e)
+            return None
+        return live
+
+    def snapshot(self, deployment, namespace):
+        try:
+            return Snapshot.from_deployment(self.client.get("apps/v1", "Deployment", deployment, namespace), namespace)
+        except KubeAPIError as e:
+            if e.status != 404:
+                log.warning("Could not snapshot %s: %s", deployment, e)
+        except (KeyError, requests.RequestException) as e:
+            log.warning("Could not snapshot %s: %s", deployment, e)
+        return None
+
+    def restore(self, snap):
+        try:
+            self.client.json_patch("apps/v1", "Deployment", snap.name, [
+                {"op": "replace", "path": "/spec/template", "value": snap.template},
+            ], snap.namespace)
+        except (KubeAPIError, requests.RequestException) as e:
+            log.error("Restoring %s failed: %s", snap.name, e)
+            return 2
+        return 0
+
+    def wait_ready(self, deployment, namespace, timeout):
+        try:
+            revision = watch_rollout(self.client, deployment, namespace, timeout)
+        except (RolloutFailed, KeyError, KubeAPIError, requests.RequestException) as e:
+            log.error("Rollout of %s failed: %s", deployment, e)
+            return 2
+        log.info("Rollout of %s complete (revision %s)", deployment, revision)
+        return 0
+
+    def rollback(self, deployment, namespace):
+        """
+        Same semantics as `kubectl rollout undo`: copy the pod template of
+        the ReplicaSet with the highest revision below the current one
+        back onto the Deployment.
+        """
+        try:
+            dep = self.client.get("apps/v1", "Deployment", deployment, namespace)
+            current = revision_of(dep)
+            uid = dep["metadata"].get("uid")
+            labels = (dep["spec"].get("selector") or {}).get("matchLabels") or {}
+            selector = ",".join(f"{k}={v}" for k, v in sorted(labels.items()))
+            owned = [
+                rs for rs in self.client.list("apps/v1", "ReplicaSet", namespace, selector).get("items", [])
+                if any(o.get("uid") == uid for o in rs["metadata"].get("ownerReferences", []))
+            ]
+            previous = [rs for rs in owned if 0 < revision_of(rs) < current]
+            if not previous:
+                log.error("No previous revision of %s to roll back to", deployment)
+                return 2
+            target = max(previous, key=revision_of)
+            template = target["spec"]["template"]
+            template.get("metadata", {}).get("labels", {}).pop("pod-template-hash", None)
+            self.client.json_patch("apps/v1", "Deployment", deployment, [
+                {"op": "replace", "path": "/spec/template", "value": template},
+            ], namespace)
+        except (KeyError, KubeAPIError, requests.RequestException) as e:
+            log.error("Rollback of %s failed: %s", deployment, e)
+            return 2
+        log.info("Rolled %s back to revision %d", deployment, revision_of(target))
+        return 0
+
+    def wait_daemonset(self, name, namespace, timeout, interval=2.0):
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                done, msg = daemonset_status(self.client.get("apps/v1", "DaemonSet", name, namespace))
+                if done:
+                    return 0
+                if time.monotonic() >= deadline:
+                    log.error("DaemonSet %s not ready after %.0fs (%s)", name, timeout, msg)
+                    return 2
+                log.info("DaemonSet %s: %s", name, msg)
+                if not current_deadline().sleep(min(interval, max(0.0, deadline - time.monotonic()))):
+                    log.error("Deadline exceeded waiting for DaemonSet %s (%s)", name, msg)
+                    return 2
+        except (KeyError, KubeAPIError, requests.RequestException) as e:
+            log.error("Waiting for DaemonSet %s failed: %s", name, e)
+            return 2
+
+    def delete_daemonset(self, name, namespace):
+        try:
+            self.client.request("DELETE", self.client.path_for("apps/v1", "DaemonSet", namespace, name),
+                                params={"propagationPolicy": "Background"})
+        except KubeAPIError as e:
+            if e.status != 404:
+                log.error("Deleting DaemonSet %s failed: %s", name, e)
+                return 2
+        except requests.RequestException as e:
+            log.error("Deleting DaemonSet %s failed: %s", name, e)
+            return 2
+        return 0
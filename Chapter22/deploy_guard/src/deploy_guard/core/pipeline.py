@@ -1,38 +1,213 @@
-import logging, sys
+import logging, os, socket
 from deploy_guard.core.env_gate import validate_env
 from deploy_guard.core.health_checks import check_disk, check_memory
-from deploy_guard.core.deploy_k8s import deploy, rollback
-from deploy_guard.core.api_checks import get_with_retry
+from deploy_guard.core.deploy_k8s import deploy, rollback_release, check_manifest, wait_for_rollout, expand_manifests, last_rollback_plan, get_backend
+from deploy_guard.core.api_checks import get_with_retry, check_slo
+from deploy_guard.core.canary import run_canary
+from deploy_guard.core.prepull import prepull, remove_prepull
+from deploy_guard.core.dag import Stage, run_dag, timing_report, FAILED, OK
+from deploy_guard.core.deadline import budget
+from deploy_guard.core.report import RunReport
+from deploy_guard.core.checkpoint import Checkpoint, stage_keys, files_digest, digest, DEFAULT_TTL
 from deploy_guard.config import get_env
 
 log = logging.getLogger("deploy_guard.pipeline")
 
-def run_pipeline(manifest, service_url):
-    # 1. Environment validation
-    rc = validate_env()
-    if rc != 0:
-        log.error("Pipeline halted: environment validation failed")
-        return rc
-
-    # 2. Health checks
-    for check in (check_disk, check_memory):
-        rc = check()
-        if rc == 2:
-            log.error("Pipeline halted: system health critical")
+HALT_MESSAGES = {
+    "env": "Pipeline halted: environment validation failed",
+    "disk": "Pipeline halted: system health critical",
+    "memory": "Pipeline halted: system health critical",
+    "manifest": "Pipeline halted: manifest check failed",
+    "prepull": "Pipeline halted: image pre-pull failed",
+    "deploy": "Pipeline halted: deployment failed",
+    "rollout": "Pipeline halted: rollout did not become ready, triggering rollback",
+    "canary": "Pipeline halted: canary worse than baseline, triggering rollback",
+    "api": "Pipeline halted: service unhealthy, triggering rollback",
+}
+
+
+def _target():
+    return get_env("DEPLOYMENT_NAME", default="myapp"), get_env("DEPLOYMENT_NAMESPACE", default="default")
+
+
+# Post-deploy stages verify live state, so they always rerun on --resume
+CHECKPOINTED = ("env", "disk", "memory", "manifest", "prepull", "deploy")
+
+
+def _stage_inputs(manifest):
+    """What each resumable stage's outcome depends on (hashed, never stored raw)."""
+    manifests = files_digest(expand_manifests(manifest))
+    host = socket.gethostname()
+    # the API server the current context points at, not just the KUBECONFIG
+    # path: `kubectl config use-context` must invalidate deploy and prepull
+    cluster = get_backend().cluster_id()
+    return {
+        "env": digest([get_env(n) for n in ("ENV", "KUBECONFIG", "SERVICE_URL", "VERSION")]),
+        "disk": host,
+        "memory": host,
+        "manifest": manifests,
+        "prepull": digest(manifests, _target()[1], get_env("KUBECONFIG"), cluster),
+        "deploy": digest(manifests, _target(), get_env("KUBECONFIG"), cluster,
+                         get_env("DG_K8S_BACKEND", default="kubectl"), get_env("DG_K8S_API_SERVER")),
+    }
+
+
+def _resumable(stages, manifest, checkpoint, resume, resumed):
+    """Wrap checkpointed stages to skip when done, and record success."""
+    keys = stage_keys(stages, _stage_inputs(manifest))
+
+    def wrap(stage):
+        key, func = keys[stage.name], stage.func
+
+        def run():
+            if resume and checkpoint.is_done(stage.name, key):
+                log.info("Stage %s: resumed from checkpoint", stage.name)
+                resumed.append(stage.name)
+                return 0
+            rc = func()
+            if rc == 0:
+                checkpoint.mark(stage.name, key)
+            else:
+                checkpoint.clear(stage.name)
             return rc
+        return Stage(stage.name, run, stage.deps)
+
+    return [wrap(s) if s.name in CHECKPOINTED else s for s in stages]
+
+
+DEFAULT_CLEANUP_BUDGET = 120
+
+
+def _budgeted(stages, deadline, left):
+    """Log each stage's remaining budget as it starts; refuse to start once it is spent."""
+    def wrap(stage):
+        func = stage.func
+
+        def run():
+            remaining = deadline.remaining()
+            if remaining is not None:
+                left[stage.name] = round(remaining, 3)
+                if deadline.expired():
+                    log.error("Stage %s not started: pipeline deadline exceeded", stage.name)
+                    return 2
+                log.info("Stage %s starting with %.1fs of budget left", stage.name, remaining)
+            return func()
+        return Stage(stage.name, run, stage.deps)
+
+    return [wrap(s) for s in stages]
+
+
+def _api_check(service_url, report):
+    # DG_API_MODE=slo swaps the reachability check for the latency SLO probe
+    if get_env("DG_API_MODE", default="retry") == "slo":
+        return check_slo(service_url, report=report)
+    return get_with_retry(service_url)
+
+
+def build_stages(manifest, service_url, report=None, force=False):
+    """
+    Pipeline as a dependency graph. Pre-flight stages are independent
+    and run concurrently; deploy waits for all of them, the rollout watch
+    (only with DEPLOYMENT_NAME set, as for waves) waits for deploy and
+    the API check waits for the rollout. With
+    DG_CANARY_URL and DG_BASELINE_URL set, a canary comparison runs
+    between rollout and the API check. With DG_PREPULL=1 the manifests'
+    images are pulled onto the nodes after the manifest check and before
+    deploy. Add a stage by appending it here with its deps.
+    """
+    preflight = ("env", "disk", "memory", "manifest")
+    canary_url, baseline_url = get_env("DG_CANARY_URL"), get_env("DG_BASELINE_URL")
+    prepulled = get_env("DG_PREPULL", default="0") == "1"
+    watched = get_env("DEPLOYMENT_NAME") is not None
+    stages = [
+        Stage("env", validate_env),
+        Stage("disk", check_disk),
+        Stage("memory", check_memory),
+        Stage("manifest", lambda: check_manifest(manifest)),
+    ]
+    if prepulled:
+        stages.append(Stage("prepull", lambda: prepull(manifest, _target()[1], report=report), deps=("manifest",)))
+        preflight += ("prepull",)
+    stages.append(Stage("deploy", lambda: deploy(manifest, force=force, validate=False), deps=preflight))
+    gate = ("deploy",)
+    if watched:
+        stages.append(Stage("rollout", lambda: wait_for_rollout(*_target(), prepulled=prepulled), deps=gate))
+        gate = ("rollout",)
+    if canary_url and baseline_url:
+        stages.append(Stage("canary", lambda: run_canary(baseline_url, canary_url, report=report), deps=gate))
+        gate = ("canary",)
+    stages.append(Stage("api", lambda: _api_check(service_url, report), deps=gate))
+    return stages
+
+
+def run_pipeline(manifest, service_url, workers=None, fail_fast=True, force=False, resume=False, deadline=None):
+    """
+    With DG_CHECKPOINT_FILE set, successful pre-flight and deploy stages
+    are checkpointed by a hash of their inputs (manifest content, target
+    deployment, cluster config) and, with `resume`, skipped on the next
+    run if unchanged and younger than DG_CHECKPOINT_TTL seconds.
+
+    `deadline` (DG_PIPELINE_DEADLINE) bounds the whole run in seconds:
+    every kubectl call, HTTP request and wait is cut to what is left,
+    and running commands are killed when it is spent. Cleanup (rollback,
+    pre-pull removal) then gets its own DG_CLEANUP_BUDGET seconds. With
+    fail_fast, a failed stage cancels the run's budget the same way, so
+    stages still running alongside it stop instead of running out.
+    """
+    report = RunReport()
+    stages = build_stages(manifest, service_url, report, force)
+    workers = workers or int(get_env("DG_PIPELINE_WORKERS", default="4"))
+
+    checkpoint_path = get_env("DG_CHECKPOINT_FILE")
+    checkpoint, resumed = None, []
+    if checkpoint_path:
+        checkpoint = Checkpoint(checkpoint_path, float(get_env("DG_CHECKPOINT_TTL", default=DEFAULT_TTL)))
+        stages = _resumable(stages, manifest, checkpoint, resume and not force, resumed)
+    elif resume:
+        log.warning("--resume needs DG_CHECKPOINT_FILE; running every stage")
+
+    deadline = deadline or float(get_env("DG_PIPELINE_DEADLINE", default="0")) or None
+    left = {}
+    with budget(deadline) as run_budget:
+        results = run_dag(_budgeted(stages, run_budget, left), workers=workers, fail_fast=fail_fast,
+                          on_halt=run_budget.cancel)
+    expired = run_budget.timed_out()
+
+    lines = timing_report(stages, results)
+    for line in lines:
+        log.info(line)
+    report.add("stages", {
+        n: {"status": r.status, "rc": r.rc, "start": round(r.start, 3), "duration": round(r.duration, 3),
+            **({"budget_left": left[n]} if n in left else {})}
+        for n, r in results.items()
+    })
+
+    rc = 0
+    failed = [r for r in results.values() if r.status == FAILED]
+    if failed:
+        first = min(failed, key=lambda r: r.end)
+        log.error(HALT_MESSAGES.get(first.name, f"Pipeline halted: {first.name} failed"))
+        rc = first.rc
+        # a deploy killed at the deadline may have applied part of the release
+        killed_deploy = expired and first.name == "deploy" and last_rollback_plan()
+        with budget(float(get_env("DG_CLEANUP_BUDGET", default=DEFAULT_CLEANUP_BUDGET)) if deadline else None):
+            if first.name in ("rollout", "canary", "api") or killed_deploy:
+                rollback_release(*_target())
+                if checkpoint:
+                    # the cluster no longer runs what "deploy" applied
+                    checkpoint.clear("deploy")
+            if expired and "prepull" in results and results["prepull"].status != OK:
+                remove_prepull(_target()[1])
+    else:
+        log.info("Pipeline completed successfully")
 
-    # 3. Kubernetes apply
-    rc = deploy(manifest)
-    if rc != 0:
-        log.error("Pipeline halted: deployment failed")
-        return rc
-
-    # 4. API health check
-    rc = get_with_retry(service_url)
-    if rc != 0:
-        log.error("Pipeline halted: service unhealthy, triggering rollback")
-        rollback(get_env("DEPLOYMENT_NAME", default="myapp"))
-        return rc
-
-    log.info("Pipeline completed successfully")
-    return 0
\ No newline at end of file
+    if deadline:
+        if expired:
+            log.error("Pipeline deadline of %.0fs exceeded", deadline)
+        report.add("deadline", {"budget": deadline, "expired": expired,
+                                "remaining": round(run_budget.remaining(), 3)})
+    if resumed:
+        report.add("resumed", sorted(resumed))
+    report.add("rc", rc)
+    report.write(os.getenv("DG_REPORT_FILE"))
+    return rc
@@ -0,0 +1,115 @@
+import json, logging, shlex, time
+from dataclasses import dataclass, field
+import yaml
+
+log = logging.getLogger("deploy_guard.plan")
+
+STOP, CONTINUE = "stop", "continue"
+
+
+@dataclass
+class Step:
+    name: str
+    argv: list
+    ok_codes: tuple = (0,)
+    on_failure: str = STOP
+    args: object = None  # argv parsed by the caller before the run starts
+
+
+@dataclass
+class StepResult:
+    name: str
+    argv: list
+    status: str  # ok | failed | skipped
+    rc: int | None = None
+    duration: float = 0.0
+    error: str | None = field(default=None)
+
+
+def load_plan(path):
+    """
+    Plan file:
+
+        steps:
+          - env                          # bare subcommand
+          - run: apply --manifest k8s/   # string or list argv
+            name: apply-app              # optional, defaults to the subcommand
+            ok_codes: [0]                # rcs that count as success
+            on_failure: continue         # or stop (default)
+    """
+    with open(path) as f:
+        data = yaml.safe_load(f) or {}
+    raw = data.get("steps") if isinstance(data, dict) else data
+    if not raw:
+        raise ValueError(f"{path}: plan has no steps")
+    steps = []
+    for i, item in enumerate(raw, 1):
+        if isinstance(item, str):
+            item = {"run": item}
+        run = item.get("run")
+        argv = shlex.split(run) if isinstance(run, str) else [str(a) for a in run or []]
+        if not argv:
+            raise ValueError(f"{path}: step {i} has nothing to run")
+        on_failure = item.get("on_failure", STOP)
+        if on_failure not in (STOP, CONTINUE):
+            raise ValueError(f"{path}: step {i}: on_failure must be '{STOP}' or '{CONTINUE}'")
+        steps.append(Step(
+            name=str(item.get("name") or argv[0]),
+            argv=argv,
+            ok_codes=tuple(item.get("ok_codes", (0,))),
+            on_failure=on_failure,
+        ))
+    return steps
+
+
+def run_plan(steps, execute):
+    """
+    Run steps in order with `execute(step) -> rc`. A step whose rc is not
+    in its ok_codes fails; with on_failure=stop the remaining steps are
+    skipped. Returns (rc, summary): rc is 0, or the first failing step's
+    rc (2 when that rc was 0 but 0 was not allowed).
+    """
+    results = []
+    rc = 0
+    stopped = False
+    t0 = time.monotonic()
+    for step in steps:
+        if stopped:
+            results.append(StepResult(step.name, step.argv, "skipped"))
+            continue
+        start = time.monotonic()
+        error = None
+        try:
+            step_rc = execute(step)
+        except Exception as e:
+            log.error("Step %s raised: %s", step.name, e)
+            step_rc, error = 2, str(e)
+        elapsed = time.monotonic() - start
+        ok = step_rc in step.ok_codes
+        results.append(StepResult(step.name, step.argv, "ok" if ok else "failed", step_rc, elapsed, error))
+        log.info("Step %s %s (rc=%s) in %.2fs", step.name, "ok" if ok else "FAILED", step_rc, elapsed)
+        if not ok:
+            if rc == 0:
+                rc = step_rc or 2
+            if step.on_failure == STOP:
+                stopped = True
+
+    summary = {
+        "rc": rc,
+        "duration": round(time.monotonic() - t0, 3),
+        "steps": [
+            {"name": r.name, "argv": r.argv, "status": r.status, "rc": r.rc,
+             "duration": round(r.duration, 3), **({"error": r.error} if r.error else {})}
+            for r in results
+        ],
+    }
+    return rc, summary
+
+
+def write_summary(summary, path=None):
+    text = json.dumps(summary, indent=2)
+    if path:
+        with open(path, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
@@ -0,0 +1,156 @@
+import logging, os, shlex, tempfile, time
+import yaml
+from deploy_guard import metrics
+from deploy_guard.config import get_env
+from deploy_guard.core.apply_cache import load_docs
+from deploy_guard.core.deploy_k8s import expand_manifests, get_backend
+from deploy_guard.core.deadline import current as current_deadline
+
+log = logging.getLogger("deploy_guard.prepull")
+
+PREPULL_NAME = "deploy-guard-prepull"
+PAUSE_IMAGE = "registry.k8s.io/pause:3.9"
+DEFAULT_PREPULL_TIMEOUT = 300
+# Statically linked, so its `true` runs inside any image, shell or not
+DEFAULT_PREPULL_HELPER_IMAGE = "busybox:1.36.1-musl"
+NOOP_DIR = "/deploy-guard-prepull"
+
+
+def _pod_spec(doc):
+    kind, spec = doc.get("kind"), doc.get("spec") or {}
+    if kind == "Pod":
+        return spec
+    if kind == "CronJob":
+        spec = ((spec.get("jobTemplate") or {}).get("spec") or {})
+    return (spec.get("template") or {}).get("spec")
+
+
+def pod_specs(paths):
+    specs = []
+    for p in paths:
+        try:
+            docs = load_docs(p)
+        except (OSError, yaml.YAMLError):
+            continue  # the manifest stage reports it
+        specs += [s for s in map(_pod_spec, docs) if s]
+    return specs
+
+
+def images_in(specs):
+    """Image references of every container and init container, in order."""
+    images = []
+    for spec in specs:
+        for c in (spec.get("initContainers") or []) + (spec.get("containers") or []):
+            if c.get("image") and c["image"] not in images:
+                images.append(c["image"])
+    return images
+
+
+def daemonset_for(images, namespace, specs=(), name=PREPULL_NAME):
+    """
+    A DaemonSet whose init containers are the images themselves, each
+    running a no-op. The no-op is a static `true` that a first init
+    container copies from DG_PREPULL_HELPER_IMAGE into a shared emptyDir,
+    so distroless and scratch images work too; DG_PREPULL_COMMAND runs a
+    command of the images' own instead. A pod only becomes ready once
+    every image is on its node, so the DaemonSet's rollout status is
+    "images cached everywhere". It lands on the workloads'
+    nodes: their tolerations, plus their nodeSelector when they all
+    share one (DG_PREPULL_NODE_SELECTOR=k=v,... overrides it). It pulls
+    with their credentials: every imagePullSecret they name, plus their
+    serviceAccountName (whose pull secrets the kubelet adds) when they
+    all share one.
+    """
+    command = shlex.split(get_env("DG_PREPULL_COMMAND", default=""))
+    tolerations, pull_secrets = [], []
+    for spec in specs:
+        tolerations += [t for t in spec.get("tolerations") or [] if t not in tolerations]
+        pull_secrets += [s for s in spec.get("imagePullSecrets") or [] if s not in pull_secrets]
+    accounts = {spec.get("serviceAccountName") or spec.get("serviceAccount") for spec in specs}
+    service_account = accounts.pop() if len(accounts) == 1 else None
+    selectors = [spec.get("nodeSelector") or {} for spec in specs]
+    node_selector = selectors[0] if selectors and all(s == selectors[0] for s in selectors) else {}
+    override = get_env("DG_PREPULL_NODE_SELECTOR")
+    if override:
+        node_selector = dict(kv.split("=", 1) for kv in override.split(","))
+
+    labels = {"app.kubernetes.io/name": name, "app.kubernetes.io/managed-by": "deploy-guard"}
+    pulls = [
+        {"name": f"pull-{i}", "image": image, "imagePullPolicy": "IfNotPresent", "command": command}
+        for i, image in enumerate(images)
+    ]
+    pod = {"initContainers": pulls, "containers": [{"name": "pause", "image": PAUSE_IMAGE}],
+           "terminationGracePeriodSeconds": 0}
+    if not command:
+        mount = {"name": "noop", "mountPath": NOOP_DIR, "readOnly": True}
+        for c in pulls:
+            c["command"], c["volumeMounts"] = [f"{NOOP_DIR}/true"], [mount]
+        helper = get_env("DG_PREPULL_HELPER_IMAGE", default=DEFAULT_PREPULL_HELPER_IMAGE)
+        pod["initContainers"] = [{"name": "noop", "image": helper, "command": ["cp", "/bin/true", f"{NOOP_DIR}/true"],
+                                  "volumeMounts": [{"name": "noop", "mountPath": NOOP_DIR}]}] + pulls
+        pod["volumes"] = [{"name": "noop", "emptyDir": {}}]
+    if tolerations:
+        pod["tolerations"] = tolerations
+    if node_selector:
+        pod["nodeSelector"] = node_selector
+    if pull_secrets:
+        pod["imagePullSecrets"] = pull_secrets
+    if service_account:
+        pod["serviceAccountName"] = service_account
+    return {
+        "apiVersion": "apps/v1",
+        "kind": "DaemonSet",
+        "metadata": {"name": name, "namespace": namespace, "labels": labels},
+        "spec": {
+            "selector": {"matchLabels": labels},
+            "template": {"metadata": {"labels": labels}, "spec": pod},
+        },
+    }
+
+
+def prepull(manifest, namespace="default", timeout=None, report=None):
+    """
+    Pull the manifests' images onto the target nodes before the real
+    apply. Waits until they are cached or `timeout` (DG_PREPULL_TIMEOUT,
+    default 300s) passes, then deletes the DaemonSet. A failed or slow
+    pre-pull only costs time (the rollout pulls whatever is missing), so
+    this returns 0 either way; the outcome goes to the run report and
+    deploy_guard_prepull_seconds.
+    """
+    timeout = current_deadline().fit(float(timeout or get_env("DG_PREPULL_TIMEOUT", default=DEFAULT_PREPULL_TIMEOUT)))
+    specs = pod_specs(expand_manifests(manifest))
+    images = images_in(specs)
+    if not images:
+        log.info("No images to pre-pull")
+        return 0
+
+    backend = get_backend()
+    start = time.monotonic()
+    with tempfile.TemporaryDirectory(prefix="dg-prepull-") as tmp:
+        path = os.path.join(tmp, "prepull.yaml")
+        with open(path, "w") as f:
+            yaml.safe_dump(daemonset_for(images, namespace, specs), f)
+        log.info("Pre-pulling %d image(s) in %s: %s", len(images), namespace, ", ".join(images))
+        if backend.apply([path], namespace, dry_run=False) != 0:
+            outcome = "failed"
+        elif backend.wait_daemonset(PREPULL_NAME, namespace, timeout) != 0:
+            outcome = "timeout"
+        else:
+            outcome = "cached"
+    elapsed = time.monotonic() - start
+    backend.delete_daemonset(PREPULL_NAME, namespace)
+
+    if outcome == "cached":
+        log.info("Images cached on all target nodes in %.1fs", elapsed)
+    else:
+        log.warning("Pre-pull %s after %.1fs; continuing, the rollout will pull the rest", outcome, elapsed)
+    metrics.record("deploy_guard_prepull_seconds", elapsed, namespace=namespace, outcome=outcome)
+    metrics.flush()
+    if report is not None:
+        report.add("prepull", {"images": images, "outcome": outcome, "seconds": round(elapsed, 3)})
+    return 0
+
+
+def remove_prepull(namespace="default"):
+    """Delete a pre-pull DaemonSet left behind by an interrupted run."""
+    return get_backend().delete_daemonset(PREPULL_NAME, namespace)
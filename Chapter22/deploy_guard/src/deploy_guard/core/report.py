@@ -0,0 +1,25 @@
+import json, logging, time
+log = logging.getLogger("deploy_guard.report")
+
+
+class RunReport:
+    """
+    JSON summary of one pipeline run. Stages add their own sections;
+    written to DG_REPORT_FILE (if set) when the run ends.
+    """
+
+    def __init__(self):
+        self.data = {"started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+
+    def add(self, section, value):
+        self.data[section] = value
+
+    def write(self, path):
+        if not path:
+            return
+        try:
+            with open(path, "w") as f:
+                json.dump(self.data, f, indent=2, default=str)
+            log.info("Run report written to %s", path)
+        except OSError as e:
+            log.error("Failed to write run report: %s", e)
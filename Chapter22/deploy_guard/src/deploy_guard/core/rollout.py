@@ -0,0 +1,93 @@
+import logging, time
+
+log = logging.getLogger("deploy_guard.rollout")
+
+
+class RolloutFailed(RuntimeError):
+    pass
+
+
+def rollout_status(dep):
+    """
+    (done, message) for a Deployment object, using the same rules as
+    `kubectl rollout status`. The controller rolls its ReplicaSets'
+    counts up into these fields, so "done" means the new ReplicaSet is
+    fully available and the old ones are gone. Raises RolloutFailed once
+    the progress deadline is exceeded.
+    """
+    meta, spec, status = dep.get("metadata") or {}, dep.get("spec") or {}, dep.get("status") or {}
+    if meta.get("generation", 0) > status.get("observedGeneration", 0):
+        return False, "waiting for the controller to observe the new spec"
+    for cond in status.get("conditions") or []:
+        if cond.get("type") == "Progressing" and cond.get("reason") == "ProgressDeadlineExceeded":
+            raise RolloutFailed(f"progress deadline exceeded: {cond.get('message', '')}")
+    want = spec.get("replicas", 1)
+    updated = status.get("updatedReplicas", 0)
+    total = status.get("replicas", 0)
+    available = status.get("availableReplicas", 0)
+    if updated < want:
+        return False, f"{updated} of {want} replicas updated"
+    if total > updated:
+        return False, f"{total - updated} old replica(s) pending termination"
+    if available < updated:
+        return False, f"{available} of {updated} updated replicas available"
+    return True, f"{available} replica(s) available"
+
+
+def daemonset_status(ds):
+    """(done, message) for a DaemonSet, by `kubectl rollout status` rules."""
+    meta, status = ds.get("metadata") or {}, ds.get("status") or {}
+    if meta.get("generation", 0) > status.get("observedGeneration", 0):
+        return False, "waiting for the controller to observe the new spec"
+    want = status.get("desiredNumberScheduled", 0)
+    updated = status.get("updatedNumberScheduled", 0)
+    available = status.get("numberAvailable", 0)
+    if updated < want:
+        return False, f"{updated} of {want} pods updated"
+    if available < want:
+        return False, f"{available} of {want} updated pods available"
+    return True, f"{available} pod(s) available"
+
+
+def watch_rollout(client, name, namespace, timeout):
+    """
+    Follow a Deployment through watch events until its rollout completes.
+    The watch is re-established from the last resourceVersion when the
+    server closes it, and restarted from a fresh GET if that version has
+    expired (410 Gone). Raises RolloutFailed on deadline, deletion or
+    timeout; returns the revision that became ready.
+    """
+    from deploy_guard.core.k8s_api import revision_of  # k8s_api imports this module
+    deadline = time.monotonic() + timeout
+    dep = client.get("apps/v1", "Deployment", name, namespace)
+    while True:
+        done, msg = rollout_status(dep)
+        if done:
+            return revision_of(dep)
+        log.info("Rollout of %s: %s", name, msg)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise RolloutFailed(f"not ready after {timeout:.0f}s ({msg})")
+
+        for event in client.watch("apps/v1", "Deployment", namespace,
+                                  field_selector=f"metadata.name={name}",
+                                  resource_version=dep["metadata"].get("resourceVersion"),
+                                  timeout=remaining):
+            kind, obj = event.get("type"), event.get("object") or {}
+            if kind == "ERROR":
+                if obj.get("code") != 410:
+                    raise RolloutFailed(obj.get("message", "watch error"))
+                # history compacted; resume from a fresh GET
+                dep = client.get("apps/v1", "Deployment", name, namespace)
+                break
+            if kind == "DELETED":
+                raise RolloutFailed(f"deployment {name} was deleted")
+            if kind == "BOOKMARK":
+                dep["metadata"]["resourceVersion"] = obj["metadata"]["resourceVersion"]
+                continue
+            dep = obj
+            done, msg = rollout_status(dep)
+            if done:
+                return revision_of(dep)
+            log.info("Rollout of %s: %s", name, msg)
+        # stream closed by the server: loop re-checks the deadline and reconnects
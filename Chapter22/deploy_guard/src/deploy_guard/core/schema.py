@@ -0,0 +1,287 @@
+import glob, json, logging, os, tempfile, threading, time
+from concurrent.futures import ThreadPoolExecutor
+import yaml
+from deploy_guard.config import get_env
+from deploy_guard.core.apply_cache import load_docs
+from deploy_guard.core.checkpoint import files_digest
+
+log = logging.getLogger("deploy_guard.schema")
+
+CACHE_VERSION = 1
+GVK = "x-kubernetes-group-version-kind"
+# Serialized as a string, but manifests routinely write `cpu: 1`
+INT_OR_STRING_DEFS = ("io.k8s.apimachinery.pkg.util.intstr.IntOrString",
+                      "io.k8s.apimachinery.pkg.api.resource.Quantity")
+TYPES = {
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "array": (list,),
+    "object": (dict,),
+    "int-or-string": (int, str),
+}
+
+
+def _ref_name(ref):
+    # "#/definitions/X" (OpenAPI v2) or "#/components/schemas/X" (v3)
+    return ref.rsplit("/", 1)[-1]
+
+
+def _prune(node):
+    """Reduce an OpenAPI schema to what validation needs; refs become names."""
+    if not isinstance(node, dict):
+        return {}
+    if "$ref" in node:
+        return {"ref": _ref_name(node["$ref"])}
+    if len(node.get("allOf") or ()) == 1:  # v3 wraps refs that carry a default
+        return _prune(node["allOf"][0])
+    out = {}
+    if node.get("x-kubernetes-int-or-string") or node.get("format") == "int-or-string":
+        out["type"] = "int-or-string"
+    elif node.get("type") in TYPES:
+        out["type"] = node["type"]
+    if node.get("x-kubernetes-preserve-unknown-fields"):
+        out["open"] = True
+    if "properties" in node:
+        out["properties"] = {k: _prune(v) for k, v in node["properties"].items()}
+    if node.get("required"):
+        out["required"] = list(node["required"])
+    if "items" in node:
+        out["items"] = _prune(node["items"])
+    extra = node.get("additionalProperties")
+    if isinstance(extra, dict):
+        out["additional"] = _prune(extra)
+    elif extra is not None:
+        out["open"] = bool(extra)
+    if node.get("enum"):
+        out["enum"] = list(node["enum"])
+    return out
+
+
+def _refs(node):
+    if "ref" in node:
+        yield node["ref"]
+    for child in (node.get("properties") or {}).values():
+        yield from _refs(child)
+    for key in ("items", "additional"):
+        if key in node:
+            yield from _refs(node[key])
+
+
+def compile_schemas(documents):
+    """
+    OpenAPI documents (v2 swagger or v3 per group-version) -> compact
+    form: {"kinds": {"apps/v1/Deployment": def name}, "defs": {name:
+    pruned schema}}, keeping only definitions reachable from a kind.
+    """
+    raw = {}
+    for doc in documents:
+        raw.update(doc.get("definitions") or (doc.get("components") or {}).get("schemas") or {})
+    kinds = {}
+    for name, node in raw.items():
+        for gvk in node.get(GVK) or ():
+            group_version = f"{gvk['group']}/{gvk['version']}" if gvk.get("group") else gvk["version"]
+            kinds.setdefault(f"{group_version}/{gvk['kind']}", name)
+
+    defs, todo = {}, list(set(kinds.values()))
+    while todo:
+        name = todo.pop()
+        if name in defs or name not in raw:
+            continue
+        defs[name] = {"type": "int-or-string"} if name in INT_OR_STRING_DEFS else _prune(raw[name])
+        todo += _refs(defs[name])
+    return {"kinds": kinds, "defs": defs}
+
+
+class SchemaSet:
+    """
+    Validators compiled from the compact schema form. Each definition
+    becomes one closure, built on first use and shared by every field
+    that references it, so validating a document is plain dict/list
+    walking. Unknown fields are errors unless the schema leaves an
+    object open (maps, preserve-unknown-fields, untyped objects).
+    """
+
+    def __init__(self, compiled):
+        self.kinds = compiled["kinds"]
+        self.defs = compiled["defs"]
+        self._validators = {}
+        self._lock = threading.Lock()
+
+    def _compile(self, node):
+        if "ref" in node:
+            name = node["ref"]
+            if name not in self.defs:
+                return lambda value, path, errors: None
+            return lambda value, path, errors: self._definition(name)(value, path, errors)
+
+        types = TYPES.get(node.get("type"))
+        props = {k: self._compile(v) for k, v in (node.get("properties") or {}).items()}
+        required = node.get("required") or ()
+        items = self._compile(node["items"]) if "items" in node else None
+        extra = self._compile(node["additional"]) if "additional" in node else None
+        is_open = node.get("open") or extra is not None or not props
+        enum = node.get("enum")
+
+        def validate(value, path, errors):
+            if value is None:
+                return  # null means "unset" to the API server
+            if types and (not isinstance(value, types) or (isinstance(value, bool) and bool not in types)):
+                errors.append(f"{path or '<root>'}: expected {node['type']}, got {type(value).__name__}")
+                return
+            if enum and value not in enum:
+                errors.append(f"{path}: {value!r} is not one of {enum}")
+            if isinstance(value, dict):
+                for key in required:
+                    if key not in value:
+                        errors.append(f"{path + '.' if path else ''}{key}: required field missing")
+                for key, child in value.items():
+                    sub = f"{path}.{key}" if path else str(key)
+                    if key in props:
+                        props[key](child, sub, errors)
+                    elif extra is not None:
+                        extra(child, sub, errors)
+                    elif not is_open:
+                        errors.append(f"{sub}: unknown field")
+            elif isinstance(value, list) and items is not None:
+                for i, child in enumerate(value):
+                    items(child, f"{path}[{i}]", errors)
+        return validate
+
+    def _definition(self, name):
+        fn = self._validators.get(name)
+        if fn is None:
+            with self._lock:
+                fn = self._validators.get(name)
+                if fn is None:
+                    fn = self._validators[name] = self._compile(self.defs[name])
+        return fn
+
+    def validate(self, doc):
+        """Errors for one manifest object; None when its kind has no schema."""
+        name = self.kinds.get(f"{doc.get('apiVersion')}/{doc.get('kind')}")
+        if name is None:
+            return None
+        errors = []
+        self._definition(name)(doc, "", errors)
+        return errors
+
+
+def schema_sources(schema_dir):
+    return sorted(glob.glob(os.path.join(schema_dir, "**", "*.json"), recursive=True))
+
+
+def _read_cache(path, source):
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        log.warning("Ignoring unreadable schema cache %s: %s", path, e)
+        return None
+    if data.get("version") != CACHE_VERSION or data.get("source") != source:
+        return None
+    return data
+
+
+def _write_cache(path, compiled):
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".schema-cache-")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"version": CACHE_VERSION, **compiled}, f, separators=(",", ":"))
+        os.replace(tmp, path)
+    except OSError as e:
+        log.error("Failed to write schema cache %s: %s", path, e)
+
+
+def load_schemas(schema_dir, cache_path=None):
+    """
+    Compile every *.json OpenAPI document under `schema_dir`. With
+    `cache_path`, the compact form is reused while the sources' content
+    hash is unchanged, so the large spec files are parsed only once.
+    """
+    sources = [p for p in schema_sources(schema_dir)
+               if not cache_path or os.path.abspath(p) != os.path.abspath(cache_path)]
+    if not sources:
+        raise RuntimeError(f"No OpenAPI schemas (*.json) in {schema_dir}")
+    source = files_digest(sources)
+    start = time.monotonic()
+    compiled = _read_cache(cache_path, source) if cache_path else None
+    if compiled is None:
+        documents = []
+        for p in sources:
+            with open(p) as f:
+                documents.append(json.load(f))
+        compiled = {"source": source, **compile_schemas(documents)}
+        if cache_path:
+            _write_cache(cache_path, compiled)
+        log.debug("Compiled %d schema definitions in %.3fs", len(compiled["defs"]), time.monotonic() - start)
+    else:
+        log.debug("Loaded %d schema definitions from %s in %.3fs",
+                  len(compiled["defs"]), cache_path, time.monotonic() - start)
+    return SchemaSet(compiled)
+
+
+_schemas = {}
+_schemas_lock = threading.Lock()
+
+
+def get_schemas():
+    """Process-wide SchemaSet for DG_SCHEMA_DIR (cached in DG_SCHEMA_CACHE), or None."""
+    schema_dir = get_env("DG_SCHEMA_DIR")
+    if not schema_dir:
+        return None
+    key = (schema_dir, get_env("DG_SCHEMA_CACHE"))
+    with _schemas_lock:
+        if key not in _schemas:
+            _schemas[key] = load_schemas(*key)
+        return _schemas[key]
+
+
+def reset_schemas():
+    with _schemas_lock:
+        _schemas.clear()
+
+
+def _validate_file(schemas, path):
+    try:
+        docs = load_docs(path)
+    except (OSError, yaml.YAMLError) as e:
+        return [f"unreadable: {e}"], []
+    errors, unknown = [], []
+    for i, doc in enumerate(docs):
+        found = schemas.validate(doc)
+        label = f"{doc.get('kind')}/{(doc.get('metadata') or {}).get('name')}"
+        if found is None:
+            unknown.append(f"{doc.get('apiVersion')}/{doc.get('kind')}")
+        else:
+            errors += [f"{label}: {e}" for e in found]
+    return errors, unknown
+
+
+def validate_manifests(paths, schemas, workers=4):
+    """
+    Validate every object in `paths` against `schemas`, files in
+    parallel. Kinds without a schema (e.g. CRDs not in the spec) are
+    skipped with a warning, or fail with DG_SCHEMA_STRICT=1. Returns 0 or 2.
+    """
+    strict = get_env("DG_SCHEMA_STRICT", default="0") == "1"
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="dg-schema") as pool:
+        results = list(pool.map(lambda p: _validate_file(schemas, p), paths))
+
+    rc = 0
+    for path, (errors, unknown) in zip(paths, results):
+        for e in errors:
+            log.error("Schema: %s: %s", path, e)
+        for kind in dict.fromkeys(unknown):
+            (log.error if strict else log.warning)("Schema: %s: no schema for %s", path, kind)
+        if errors or (strict and unknown):
+            rc = 2
+    log.info("Schema validation of %d manifest(s) %s in %.3fs",
+             len(paths), "passed" if rc == 0 else "FAILED", time.monotonic() - start)
+    return rc
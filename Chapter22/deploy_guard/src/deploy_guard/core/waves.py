@@ -0,0 +1,201 @@
+import logging, math, os, time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import requests
+import yaml
+from deploy_guard.core.deploy_k8s import get_backend, apply_to, log_outcomes, check_schemas, DEFAULT_ROLLOUT_TIMEOUT
+from deploy_guard.core.apply_cache import ApplyCache
+from deploy_guard.core.api_checks import get_with_retry
+from deploy_guard.core.report import RunReport
+from deploy_guard.config import get_env
+
+log = logging.getLogger("deploy_guard.waves")
+
+DEFAULT_WAVES = (10, 50, 100)
+DEFAULT_MAX_PARALLEL = 5
+
+
+@dataclass
+class Cluster:
+    name: str
+    context: str
+    health_url: str | None = None
+    canary: bool = False
+
+
+@dataclass
+class ClusterRun:
+    cluster: Cluster
+    wave: int
+    rc: int = 0
+    timings: dict = field(default_factory=dict)
+    plan: object = None
+    error: str | None = None
+
+
+def load_clusters(path):
+    """
+    clusters.yaml:
+
+        clusters:
+          - name: eu-1
+            context: prod-eu-1           # kubeconfig context, default: name
+            health_url: https://eu-1.example.com/health
+            canary: true                 # at most one; default: the first
+        waves: [10, 50, 100]             # optional
+        max_parallel: 5                  # optional
+    """
+    with open(path) as f:
+        data = yaml.safe_load(f) or {}
+    clusters = [
+        Cluster(c["name"], c.get("context") or c["name"], c.get("health_url"), bool(c.get("canary")))
+        for c in data.get("clusters") or []
+    ]
+    if not clusters:
+        raise ValueError(f"{path}: no clusters")
+    if len({c.name for c in clusters}) != len(clusters):
+        raise ValueError(f"{path}: duplicate cluster names")
+    if sum(c.canary for c in clusters) > 1:
+        raise ValueError(f"{path}: more than one canary cluster")
+    return clusters, data.get("waves"), data.get("max_parallel")
+
+
+def plan_waves(clusters, percents=DEFAULT_WAVES):
+    """
+    Wave 0 is the canary cluster alone. The rest are split by cumulative
+    percentages, e.g. 10/50/100 of 19 clusters -> 2, 8, 9. Empty waves
+    are dropped and the last wave always takes the remainder.
+    """
+    canary = next((c for c in clusters if c.canary), clusters[0])
+    rest = [c for c in clusters if c is not canary]
+    percents = sorted(float(p) for p in percents)
+    if not percents or percents[-1] != 100:
+        percents.append(100.0)
+    waves, done = [[canary]], 0
+    for p in percents:
+        upto = min(len(rest), math.ceil(len(rest) * p / 100))
+        if upto > done:
+            waves.append(rest[done:upto])
+            done = upto
+    return waves
+
+
+def _deploy_cluster(cluster, wave, manifest, target, timeout, session, cache):
+    run = ClusterRun(cluster, wave)
+    t0 = time.monotonic()
+    try:
+        backend = get_backend(cluster.context)
+        rc, outcomes, run.plan = apply_to(backend, manifest, cache=cache)
+        run.timings["apply"] = time.monotonic() - t0
+        log_outcomes(outcomes)
+        if rc == 0 and target:
+            t = time.monotonic()
+            rc = backend.wait_ready(*target, timeout)
+            run.timings["rollout"] = time.monotonic() - t
+        if rc == 0 and cluster.health_url:
+            t = time.monotonic()
+            rc = get_with_retry(cluster.health_url, session=session)
+            run.timings["health"] = time.monotonic() - t
+        run.rc = rc
+    except Exception as e:
+        log.error("Cluster %s raised: %s", cluster.name, e)
+        run.rc, run.error = 2, str(e)
+    run.timings["total"] = time.monotonic() - t0
+    log.info("Cluster %s (wave %d) %s in %.2fs", cluster.name, wave,
+             "ok" if run.rc == 0 else "FAILED", run.timings["total"])
+    return run
+
+
+def _rollback_cluster(run, timeout):
+    """Restore from the cluster's pre-apply snapshots; nothing captured, nothing to undo."""
+    if not run.plan:
+        log.info("Nothing to roll back on %s", run.cluster.name)
+        return 0
+    t = time.monotonic()
+    rc = run.plan.restore(get_backend(run.cluster.context), timeout=timeout)
+    run.timings["rollback"] = time.monotonic() - t
+    log.log(logging.INFO if rc == 0 else logging.ERROR, "Rolled back %s: %s",
+            run.cluster.name, "ok" if rc == 0 else "FAILED")
+    return rc
+
+
+def roll_out(manifest, clusters, percents=None, max_parallel=None, report=None):
+    """
+    Apply `manifest` cluster by cluster in waves: the canary first, then
+    each wave's clusters in parallel (at most `max_parallel` at a time).
+    A cluster passes when its apply, rollout and health check do. After
+    each wave every cluster deployed so far must still be healthy
+    (after DG_WAVE_SOAK seconds). On any failure every cluster touched,
+    including the failed ones, is rolled back concurrently. Returns 0 or 2.
+    """
+    percents = percents or DEFAULT_WAVES
+    max_parallel = max(1, int(max_parallel or get_env("DG_WAVE_MAX_PARALLEL", default=DEFAULT_MAX_PARALLEL)))
+    timeout = float(get_env("DG_ROLLOUT_TIMEOUT", default=DEFAULT_ROLLOUT_TIMEOUT))
+    soak = float(get_env("DG_WAVE_SOAK", default="0"))
+    deployment = get_env("DEPLOYMENT_NAME")
+    target = (deployment, get_env("DEPLOYMENT_NAMESPACE", default="default")) if deployment else None
+    report = report or RunReport()
+    if check_schemas(manifest) != 0:
+        log.error("Schema validation failed; no cluster touched")
+        report.add("rc", 2)
+        report.write(os.getenv("DG_REPORT_FILE"))
+        return 2
+    waves = plan_waves(clusters, percents)
+    # one cache for every cluster: separate instances would each save
+    # their own view and the last one to finish would drop the others'
+    cache_path = get_env("DG_APPLY_CACHE")
+    cache = ApplyCache(cache_path) if cache_path else None
+    log.info("Rolling out to %d cluster(s) in %d wave(s): %s", len(clusters), len(waves),
+             " | ".join(",".join(c.name for c in w) for w in waves))
+
+    runs, wave_log, rc = [], [], 0
+    with requests.Session() as session, \
+            ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix="dg-wave") as pool:
+        for i, wave in enumerate(waves):
+            t = time.monotonic()
+            results = list(pool.map(
+                lambda c: _deploy_cluster(c, i, manifest, target, timeout, session, cache), wave
+            ))
+            runs += results
+            status = "ok" if all(r.rc == 0 for r in results) else "failed"
+
+            if status == "ok" and i < len(waves) - 1:
+                if soak:
+                    time.sleep(soak)
+                gated = [r for r in runs if r.cluster.health_url]
+                gate = list(pool.map(lambda r: get_with_retry(r.cluster.health_url, session=session), gated))
+                unhealthy = [r.cluster.name for r, g in zip(gated, gate) if g != 0]
+                if unhealthy:
+                    log.error("Health gate after wave %d failed: %s", i, ", ".join(unhealthy))
+                    status = "gate-failed"
+
+            wave_log.append({"wave": i, "clusters": [c.name for c in wave], "status": status,
+                             "duration": round(time.monotonic() - t, 3)})
+            if status != "ok":
+                rc = 2
+                break
+
+        rolled_back = []
+        if rc:
+            log.error("Wave rollout failed; rolling back %d cluster(s)", len(runs))
+            rbs = list(pool.map(lambda r: _rollback_cluster(r, timeout), runs))
+            rolled_back = [r.cluster.name for r in runs if r.plan]
+            if any(rbs):
+                log.error("Some rollbacks failed; check the clusters by hand")
+
+    report.add("waves", wave_log)
+    report.add("clusters", {
+        r.cluster.name: {
+            "wave": r.wave, "rc": r.rc,
+            **{f"{k}_s": round(v, 3) for k, v in r.timings.items()},
+            **({"error": r.error} if r.error else {}),
+        }
+        for r in runs
+    })
+    report.add("max_parallel", max_parallel)
+    report.add("rolled_back", rolled_back)
+    report.add("rc", rc)
+    report.write(os.getenv("DG_REPORT_FILE"))
+    if rc == 0:
+        log.info("Wave rollout complete: %d cluster(s)", len(runs))
+    return rc
@@ -0,0 +1,61 @@
+import logging, os, tempfile, threading
+from deploy_guard.config import get_env
+
+log = logging.getLogger("deploy_guard.metrics")
+
+_values = {}
+_lock = threading.Lock()
+
+
+def record(name, value, **labels):
+    """Set a gauge; the last value per (name, labels) wins."""
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _values[key] = float(value)
+
+
+def render():
+    lines = []
+    with _lock:
+        items = sorted(_values.items())
+    seen = set()
+    for (name, labels), value in items:
+        if name not in seen:
+            lines.append(f"# TYPE {name} gauge")
+            seen.add(name)
+        lbl = ",".join(f'{k}="{v}"' for k, v in labels)
+        lines.append(f"{name}{{{lbl}}} {value:g}" if lbl else f"{name} {value:g}")
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def flush(path=None):
+    """
+    Write every recorded metric to DG_METRICS_FILE in Prometheus textfile
+    format. The file is replaced atomically so the node exporter never
+    reads a half-written scrape. No-op when no path is configured.
+    """
+    path = path or get_env("DG_METRICS_FILE")
+    if not path:
+        return
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp = None
+    try:
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".deploy_guard-", suffix=".prom")
+        with os.fdopen(fd, "w") as f:
+            f.write(render())
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)  # mkstemp's 0600 would hide it from a node exporter running as another user
+        os.replace(tmp, path)
+    except OSError as e:
+        log.error("Failed to write metrics to %s: %s", path, e)
+        if tmp:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+
+def reset():
+    with _lock:
+        _values.clear()
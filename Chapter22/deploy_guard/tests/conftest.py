@@ -0,0 +1,29 @@
+import json
+import os
+import sys
+import pytest
+from deploy_guard.core import deploy_k8s
+from deploy_guard.core.rollback_plan import RollbackPlan
+
+# The fake kubectl lives with the benchmarks (benchmarks/fake_kubectl.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.fake_kubectl import install_kubectl  # noqa: E402
+
+
+@pytest.fixture
+def kubectl(tmp_path, monkeypatch):
+    bindir = tmp_path / "bin"
+    bindir.mkdir()
+    install_kubectl(str(bindir))
+    logfile = tmp_path / "kubectl.log"
+    monkeypatch.setenv("PATH", f"{bindir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("FAKE_KUBECTL_LOG", str(logfile))
+    monkeypatch.delenv("DG_K8S_BACKEND", raising=False)
+    monkeypatch.setattr(deploy_k8s, "_last_plan", RollbackPlan())
+    deploy_k8s.reset_backend()
+
+    def calls():
+        if not logfile.exists():
+            return []
+        return [json.loads(line) for line in logfile.read_text().splitlines()]
+    return calls
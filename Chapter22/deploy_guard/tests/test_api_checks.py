@@ -1,6 +1,10 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import pytest
 import requests
-from deploy_guard.core.api_checks import get_with_retry
+from deploy_guard.core.api_checks import get_with_retry, probe_latency, check_slo, ProbeResult
+from deploy_guard.core.report import RunReport
 
 class DummyResponse:
     def __init__(self, status_code=200):
@@ -22,4 +26,63 @@ def test_api_retry_then_success(monkeypatch):
 
 def test_api_final_failure(monkeypatch):
     monkeypatch.setattr(requests, "get", lambda url, timeout: (_ for _ in ()).throw(requests.exceptions.RequestException("Fail")))
-    assert get_with_retry("http://fake") == 2
\ No newline at end of file
+    assert get_with_retry("http://fake") == 2
+
+
+class StubService(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.hits += 1
+        if self.path == "/slow":
+            time.sleep(0.2)
+        code = 500 if self.path == "/flaky" and self.server.hits % 4 == 0 else 200
+        self.send_response(code)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+
+@pytest.fixture
+def service():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubService)
+    server.hits = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_percentiles_match_linear_interpolation():
+    r = ProbeResult(latencies_ms=[float(v) for v in range(1, 101)])
+    assert r.percentiles() == {"p50": 50.5, "p95": 95.05, "p99": 99.01}
+    assert r.histogram()["25"] == 25 and r.histogram()["100"] == 50
+
+
+def test_probe_paces_requests(service):
+    start = time.monotonic()
+    r = probe_latency(service + "/fast", count=10, rate=50)
+    assert r.total == 10 and r.errors == 0
+    assert time.monotonic() - start >= 9 / 50
+
+
+def test_slo_passes_fast_service(service):
+    report = RunReport()
+    assert check_slo(service + "/fast", count=20, rate=100, slo={"p95_ms": 150, "max_error_rate": 0}, report=report) == 0
+    section = report.data["api_latency"]
+    assert section["requests"] == 20 and section["breaches"] == []
+    assert sum(section["histogram_ms"].values()) == 20
+
+
+def test_slo_fails_slow_service(service):
+    report = RunReport()
+    assert check_slo(service + "/slow", count=8, rate=40, slo={"p95_ms": 150, "max_error_rate": 0}, report=report) == 2
+    assert report.data["api_latency"]["p95_ms"] >= 200
+    assert "p95" in report.data["api_latency"]["breaches"][0]
+
+
+def test_slo_fails_on_error_rate(service):
+    assert check_slo(service + "/flaky", count=20, rate=100, slo={"max_error_rate": 0.1}) == 2
@@ -0,0 +1,55 @@
+import os
+import subprocess
+import time
+import requests
+from benchmarks.bench import compare, install_kubectl, run
+from benchmarks.stub_server import StubService
+
+
+def _result(median, rc=0):
+    return {"median_s": median, "min_s": median, "max_s": median, "runs": 3, "rc": rc}
+
+
+def test_compare_flags_slowdowns_and_rc_changes():
+    baseline = {"results": {"a": _result(1.0), "b": _result(1.0), "c": _result(0.01), "d": _result(1.0)}}
+    current = {"results": {
+        "a": _result(1.2),    # within tolerance
+        "b": _result(1.5),    # 50% slower
+        "c": _result(0.03),   # 3x, but below min_delta
+        "d": _result(1.0, rc=2),
+        "new": _result(9.0),  # not in the baseline
+    }}
+    assert [(name, reason) for name, _, _, reason in compare(current, baseline)] == [
+        ("b", "+50% slower"), ("d", "rc 0 -> 2"),
+    ]
+
+
+def test_fake_kubectl_latency_and_failure_injection(tmp_path):
+    exe = install_kubectl(str(tmp_path))
+    env = dict(os.environ, FAKE_KUBECTL_LATENCY='{"apply": 0.3}', FAKE_KUBECTL_FAIL_RATE="1",
+               FAKE_KUBECTL_FAIL_VERBS="rollout", FAKE_KUBECTL_LIVE="*")
+    start = time.monotonic()
+    assert subprocess.run([exe, "apply", "-f", "x.yaml", "--dry-run=server"], env=env).returncode == 0
+    assert time.monotonic() - start >= 0.3
+    assert subprocess.run([exe, "rollout", "status", "deployment/a"], env=env,
+                          capture_output=True).returncode == 1
+    out = subprocess.run([exe, "get", "deployment/a", "-n", "prod", "-o", "json"], env=env,
+                         capture_output=True, text=True).stdout
+    assert '"namespace": "prod"' in out
+
+
+def test_stub_service_errors_then_recovers():
+    with StubService(fail_first=1) as stub:
+        assert requests.get(stub.url, timeout=5).status_code == 503
+        assert requests.get(stub.url, timeout=5).status_code == 200
+        assert stub.requests == 2
+
+
+def test_quick_run_records_results(tmp_path, monkeypatch):
+    # the caller's settings must not leak into the timed runs
+    monkeypatch.setenv("DG_APPLY_CACHE", str(tmp_path / "cache.json"))
+    out = run(quick=True, repeat=1, only="get_with_retry|deploy/manifests=10,namespaces=1")
+    assert set(out["results"]) == {"get_with_retry/healthy", "deploy/manifests=10,namespaces=1"}
+    assert all(r["rc"] == 0 and r["median_s"] > 0 for r in out["results"].values())
+    assert not (tmp_path / "cache.json").exists()
+    assert os.environ["DG_APPLY_CACHE"] == str(tmp_path / "cache.json")
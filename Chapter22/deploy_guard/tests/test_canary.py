@@ -0,0 +1,66 @@
+import random
+from deploy_guard.core import canary, pipeline
+from deploy_guard.core.api_checks import ProbeResult
+from deploy_guard.core.canary import mann_whitney_u, compare, PROMOTE, ROLLBACK
+from deploy_guard.core.report import RunReport
+
+
+def test_mann_whitney_known_values():
+    # fully separated samples: U is maximal and p is tiny
+    u, p = mann_whitney_u([1, 2, 3, 4, 5], [6, 7, 8, 9, 10])
+    assert u == 25 and p < 0.01
+    u, p = mann_whitney_u([6, 7, 8, 9, 10], [1, 2, 3, 4, 5])
+    assert u == 0 and p > 0.99
+    # identical samples (all ties) are not significant
+    assert mann_whitney_u([5] * 10, [5] * 10)[1] >= 0.5
+
+
+def test_same_distribution_promotes():
+    rng = random.Random(7)
+    base = ProbeResult([rng.gauss(100, 10) for _ in range(60)])
+    can = ProbeResult([rng.gauss(100, 10) for _ in range(60)])
+    assert compare(base, can)["decision"] == PROMOTE
+
+
+def test_slower_canary_rolls_back():
+    rng = random.Random(7)
+    base = ProbeResult([rng.gauss(100, 10) for _ in range(40)])
+    can = ProbeResult([rng.gauss(150, 10) for _ in range(40)])
+    d = compare(base, can)
+    assert d["decision"] == ROLLBACK and d["p_value"] < 0.001
+    assert d["samples"] == {"baseline": 40, "canary": 40}
+
+
+def test_tiny_but_significant_shift_promotes():
+    base = ProbeResult([100.0 + i % 5 for i in range(200)])
+    can = ProbeResult([102.0 + i % 5 for i in range(200)])
+    d = compare(base, can, max_slowdown=0.1)
+    assert d["p_value"] < 0.05 and d["decision"] == PROMOTE
+
+
+def test_error_rate_rolls_back():
+    d = compare(ProbeResult([10.0] * 50), ProbeResult([10.0] * 45, errors=5))
+    assert d["decision"] == ROLLBACK and "error rate" in d["reasons"][0]
+
+
+def test_run_canary_reports_decision(monkeypatch):
+    samples = {"http://base": ProbeResult([10.0] * 20), "http://canary": ProbeResult([30.0] * 20)}
+    monkeypatch.setattr(canary, "probe_latency", lambda url, count, rate: samples[url])
+    report = RunReport()
+    assert canary.run_canary("http://base", "http://canary", report=report) == 2
+    assert report.data["canary"]["decision"] == ROLLBACK
+
+
+def test_pipeline_canary_stage_rolls_back(monkeypatch):
+    for attr in ("validate_env", "check_disk", "check_memory", "check_manifest", "deploy",
+                 "wait_for_rollout", "get_with_retry"):
+        monkeypatch.setattr(pipeline, attr, lambda *a, **kw: 0)
+    monkeypatch.setattr(pipeline, "run_canary", lambda *a, **kw: 2)
+    rolled = []
+    monkeypatch.setattr(pipeline, "rollback_release", lambda d, *a: rolled.append(d) or 0)
+    monkeypatch.setenv("DG_CANARY_URL", "http://canary")
+    monkeypatch.setenv("DG_BASELINE_URL", "http://base")
+    monkeypatch.setenv("DEPLOYMENT_NAME", "web")
+    assert [s.name for s in pipeline.build_stages("m.yaml", "http://svc")][-2:] == ["canary", "api"]
+    assert pipeline.run_pipeline("m.yaml", "http://svc") == 2
+    assert rolled == ["web"]
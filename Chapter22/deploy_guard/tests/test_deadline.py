@@ -0,0 +1,66 @@
+import json
+import time
+from deploy_guard.core import pipeline
+from deploy_guard.core.api_checks import get_with_retry
+from deploy_guard.core.deadline import Deadline, budget, current
+from deploy_guard.core.deploy_k8s import wait_for_rollout
+
+
+def _alive(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] not in ("Z", "X")
+    except FileNotFoundError:
+        return False
+
+
+def test_fit_caps_timeouts_to_the_budget():
+    assert Deadline().fit(30) == 30 and Deadline().remaining() is None
+    d = Deadline(10)
+    assert 9 < d.fit(30) <= 10 and d.fit(2) == 2 and 9 < d.fit(None) <= 10
+    with budget(5) as b:
+        assert current() is b
+    assert current().remaining() is None
+
+
+def test_hung_command_and_its_children_are_killed(kubectl, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_KUBECTL_HANG", "rollout")
+    start = time.monotonic()
+    with budget(1):
+        assert wait_for_rollout("web", "prod") == 2
+    assert time.monotonic() - start < 4
+    pids = [int(p) for p in (tmp_path / "kubectl.log.pids").read_text().split()]
+    gone = time.monotonic() + 2  # SIGTERM is delivered asynchronously
+    while any(_alive(p) for p in pids) and time.monotonic() < gone:
+        time.sleep(0.05)
+    assert len(pids) == 2 and not any(_alive(p) for p in pids)
+    # the rollout timeout handed to kubectl was cut to the budget
+    assert kubectl()[0][-1] == "--timeout=1s"
+
+
+def test_retries_stop_at_the_deadline():
+    start = time.monotonic()
+    with budget(1.5):
+        assert get_with_retry("http://127.0.0.1:9/health", max_attempts=5) == 2
+    assert time.monotonic() - start < 3  # unbounded, the backoff alone is 15s
+
+
+def test_pipeline_deadline_kills_rollout_and_rolls_back(kubectl, tmp_path, monkeypatch):
+    for attr in ("validate_env", "check_disk", "check_memory", "check_manifest", "deploy", "get_with_retry"):
+        monkeypatch.setattr(pipeline, attr, lambda *a, **kw: 0)
+    rolled = []
+    monkeypatch.setattr(pipeline, "rollback_release", lambda d, *a: rolled.append(d) or 0)
+    monkeypatch.setenv("FAKE_KUBECTL_HANG", "rollout")
+    monkeypatch.setenv("DEPLOYMENT_NAME", "web")
+    report = tmp_path / "report.json"
+    monkeypatch.setenv("DG_REPORT_FILE", str(report))
+
+    start = time.monotonic()
+    assert pipeline.run_pipeline("m.yaml", "http://svc", deadline=1.5) == 2
+    assert time.monotonic() - start < 5
+    assert rolled == ["web"]
+    data = json.loads(report.read_text())
+    assert data["deadline"]["expired"] is True
+    assert data["stages"]["rollout"]["status"] == "failed"
+    assert 0 < data["stages"]["rollout"]["budget_left"] < 1.5
+    assert data["stages"]["api"]["status"] == "cancelled"
@@ -0,0 +1,183 @@
+import json
+import os
+import time
+import pytest
+from deploy_guard.core import deploy_k8s
+from deploy_guard.core.deploy_k8s import deploy, apply_manifests, expand_manifests, rollback, rollback_release
+from deploy_guard.core.rollback_plan import RollbackPlan, Snapshot
+
+@pytest.fixture
+def manifests(tmp_path):
+    d = tmp_path / "k8s"
+    d.mkdir()
+    for i in range(3):
+        (d / f"a{i}.yaml").write_text(f"kind: ConfigMap\nmetadata:\n  name: a{i}\n  namespace: team-a\n")
+    for i in range(2):
+        (d / f"b{i}.yml").write_text(f"kind: ConfigMap\nmetadata:\n  name: b{i}\n  namespace: team-b\n")
+    (d / "global.yaml").write_text("kind: Namespace\nmetadata:\n  name: team-c\n")
+    (d / "README.md").write_text("not a manifest")
+    return d
+
+
+def test_expand_dir_and_glob(manifests):
+    assert len(expand_manifests(str(manifests))) == 6
+    assert len(expand_manifests(str(manifests / "a*.yaml"))) == 3
+
+
+def test_groups_batched_per_namespace(kubectl, manifests):
+    assert deploy(str(manifests)) == 0
+    calls = kubectl()
+    # one dry-run + one apply per namespace group instead of 2 per file
+    assert len(calls) == 6
+    dry = [c for c in calls if "--dry-run=server" in c]
+    assert sorted(c.count("-f") for c in dry) == [1, 2, 3]
+    assert dry[[c.count("-f") for c in dry].index(3)][2:4] == ["-n", "team-a"]
+
+
+def test_failed_dry_run_applies_nothing_and_names_culprit(kubectl, manifests, monkeypatch):
+    monkeypatch.setenv("FAKE_KUBECTL_FAIL", "a1.yaml")
+    rc, outcomes = apply_manifests(str(manifests))
+    assert rc == 2
+    assert not [c for c in kubectl() if "--dry-run=server" not in c]
+    failed = [os.path.basename(o.manifest) for o in outcomes if o.rc != 0]
+    assert failed == ["a1.yaml"]
+
+
+def test_single_manifest_still_works(kubectl, manifests):
+    assert deploy(str(manifests / "global.yaml")) == 0
+    assert kubectl() == [
+        ["apply", "--dry-run=server", "-f", str(manifests / "global.yaml")],
+        ["apply", "-f", str(manifests / "global.yaml")],
+    ]
+
+
+def test_no_matches_fails(kubectl, tmp_path):
+    assert deploy(str(tmp_path / "nothing-*.yaml")) == 2
+
+
+def _applies(calls):
+    return [f for c in calls if c[0] == "apply" and "--dry-run=server" not in c
+            for i, f in enumerate(c) if c[i - 1] == "-f"]
+
+
+def test_cache_skips_unchanged_manifests(kubectl, manifests, tmp_path, monkeypatch):
+    monkeypatch.setenv("DG_APPLY_CACHE", str(tmp_path / "state.json"))
+    assert deploy(str(manifests)) == 0
+    assert len(_applies(kubectl())) == 6
+
+    log = tmp_path / "kubectl.log"
+    log.unlink()
+    (manifests / "a1.yaml").write_text("kind: ConfigMap\nmetadata:\n  name: a1\n  namespace: team-a\ndata:\n  k: v\n")
+    rc, outcomes = apply_manifests(str(manifests))
+    assert rc == 0
+    assert _applies(kubectl()) == [str(manifests / "a1.yaml")]
+    assert sum(o.stage == "cached" for o in outcomes) == 5
+
+    log.unlink()
+    assert deploy(str(manifests)) == 0
+    assert _applies(kubectl()) == []
+    assert not [c for c in kubectl() if c[0] == "apply"]
+
+
+def test_cache_detects_live_drift_and_force(kubectl, manifests, tmp_path, monkeypatch):
+    monkeypatch.setenv("DG_APPLY_CACHE", str(tmp_path / "state.json"))
+    assert deploy(str(manifests)) == 0
+    (tmp_path / "kubectl.log").unlink()
+
+    # someone edited b0 in the cluster: its generation moved on
+    monkeypatch.setenv("FAKE_KUBECTL_GENERATIONS", json.dumps({"b0": 2}))
+    assert deploy(str(manifests)) == 0
+    assert _applies(kubectl()) == [str(manifests / "b0.yml")]
+
+    (tmp_path / "kubectl.log").unlink()
+    assert deploy(str(manifests), force=True) == 0
+    assert len(_applies(kubectl())) == 6
+
+
+def test_cache_ignores_failed_applies(kubectl, manifests, tmp_path, monkeypatch):
+    monkeypatch.setenv("DG_APPLY_CACHE", str(tmp_path / "state.json"))
+    monkeypatch.setenv("FAKE_KUBECTL_FAIL", "a2.yaml")
+    monkeypatch.setenv("FAKE_KUBECTL_FAIL_APPLY", "1")
+    assert deploy(str(manifests)) == 2
+    monkeypatch.delenv("FAKE_KUBECTL_FAIL")
+    (tmp_path / "kubectl.log").unlink()
+    assert deploy(str(manifests)) == 0
+    assert str(manifests / "a2.yaml") in _applies(kubectl())
+
+
+def test_failed_apply_is_not_retried_file_by_file(kubectl, manifests, monkeypatch):
+    monkeypatch.setenv("FAKE_KUBECTL_FAIL", "a2.yaml")
+    rc, outcomes = apply_manifests(str(manifests))
+    assert rc == 2
+    # a failed dry run is narrowed down to the broken file
+    assert [o.manifest for o in outcomes if o.rc] == [str(manifests / "a2.yaml")]
+
+    (manifests.parent / "kubectl.log").unlink()
+    monkeypatch.setenv("FAKE_KUBECTL_FAIL_APPLY", "1")
+    rc, outcomes = apply_manifests(str(manifests))
+    assert rc == 2
+    real = [c for c in kubectl() if c[0] == "apply" and "--dry-run=server" not in c]
+    assert len(real) == 3  # one per namespace group, nothing re-applied
+    failed = [o for o in outcomes if o.rc]
+    assert {o.stage for o in failed} == {"apply"} and all(o.batch == len(failed) for o in failed)
+    assert len({o.duration for o in failed}) == 1
+
+
+def _deployment(name, image, revision):
+    return {"metadata": {"name": name, "namespace": "prod",
+                         "annotations": {"deployment.kubernetes.io/revision": str(revision)}},
+            "spec": {"template": {"spec": {"containers": [{"name": name, "image": image}]}}}}
+
+
+def test_deploy_snapshots_and_rolls_back_all_deployments(kubectl, tmp_path, monkeypatch):
+    d = tmp_path / "app"
+    d.mkdir()
+    for name in ("web", "worker", "fresh"):
+        (d / f"{name}.yaml").write_text(
+            f"kind: Deployment\nmetadata:\n  name: {name}\n  namespace: prod\n"
+            f"spec:\n  template:\n    spec:\n      containers: [{{name: {name}, image: {name}:2}}]\n"
+        )
+    live = {"web": _deployment("web", "web:1", 4), "worker": _deployment("worker", "worker:1", 9)}
+    monkeypatch.setenv("FAKE_KUBECTL_LIVE", json.dumps(live))
+    metrics_file = tmp_path / "m.prom"
+    monkeypatch.setenv("DG_METRICS_FILE", str(metrics_file))
+    assert deploy(str(d)) == 0
+
+    plan = deploy_k8s.last_rollback_plan()
+    assert sorted(plan.snapshots) == ["prod/web", "prod/worker"]  # "fresh" did not exist yet
+    # snapshots are taken after the dry run and before the apply
+    calls = kubectl()
+    first_apply = next(i for i, c in enumerate(calls) if c[0] == "apply" and "--dry-run=server" not in c)
+    assert all(i < first_apply for i, c in enumerate(calls) if c[0] == "get")
+
+    (tmp_path / "kubectl.log").unlink()
+    assert rollback_release("web", "prod") == 0
+    patches = {c[1]: json.loads(c[c.index("-p") + 1]) for c in kubectl() if c[0] == "patch"}
+    assert patches["deployment/web"][0]["value"]["spec"]["containers"][0]["image"] == "web:1"
+    assert patches["deployment/worker"][0]["value"]["spec"]["containers"][0]["image"] == "worker:1"
+    assert sum(c[:2] == ["rollout", "status"] for c in kubectl()) == 2
+    assert 'deploy_guard_rollback_seconds{deployment="worker",namespace="prod",outcome="ok"}' in metrics_file.read_text()
+
+
+def test_rollback_uses_saved_plan_across_processes(kubectl, tmp_path, monkeypatch):
+    plan = RollbackPlan({"prod/web": Snapshot("web", "prod", "4", {"spec": {"image": "web:1"}})})
+    plan.save(str(tmp_path / "plan.json"))
+    monkeypatch.setenv("DG_ROLLBACK_FILE", str(tmp_path / "plan.json"))
+    assert rollback("web", "prod") == 0
+    assert [c[0] for c in kubectl()] == ["patch", "rollout"]
+    assert rollback("other", "prod") == 0
+    assert kubectl()[-1][:2] == ["rollout", "undo"]
+
+
+def test_restore_runs_concurrently():
+    class SlowBackend:
+        def restore(self, snap):
+            time.sleep(0.2)
+            return 0
+
+        def wait_ready(self, *a):
+            return 0
+    plan = RollbackPlan({f"prod/d{i}": Snapshot(f"d{i}", "prod", "1", {}) for i in range(4)})
+    start = time.monotonic()
+    assert plan.restore(SlowBackend(), workers=4, timeout=5) == 0
+    assert time.monotonic() - start < 0.6
@@ -0,0 +1,263 @@
+import base64
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import pytest
+import yaml
+from deploy_guard.core import deploy_k8s
+from deploy_guard.core.deploy_k8s import deploy, rollback, get_backend, wait_for_rollout
+from deploy_guard.core.k8s_api import KubeClient
+from deploy_guard.core.rollback_plan import RollbackPlan
+
+DISCOVERY = {
+    "/api/v1": [
+        {"name": "configmaps", "kind": "ConfigMap", "namespaced": True},
+        {"name": "namespaces", "kind": "Namespace", "namespaced": False},
+    ],
+    "/apis/apps/v1": [
+        {"name": "deployments", "kind": "Deployment", "namespaced": True},
+        {"name": "deployments/status", "kind": "Deployment", "namespaced": True},
+        {"name": "replicasets", "kind": "ReplicaSet", "namespaced": True},
+    ],
+}
+
+
+class FakeAPI(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooling is observable
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, code, body):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _record(self):
+        url = urlsplit(self.path)
+        st = self.server.state
+        st["peers"].add(self.client_address)
+        st["calls"].append((self.command, url.path, parse_qs(url.query), self.headers.get("Content-Type")))
+        return url.path, parse_qs(url.query)
+
+    def do_GET(self):
+        path, query = self._record()
+        st = self.server.state
+        if query.get("watch"):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for event in st["events"]:
+                self.wfile.write(json.dumps(event).encode() + b"\n")
+                self.wfile.flush()
+            self.close_connection = True
+            return
+        if path in DISCOVERY:
+            return self._send(200, {"resources": DISCOVERY[path]})
+        if path.endswith("/replicasets"):
+            return self._send(200, {"items": st["replicasets"]})
+        if path in st["objects"]:
+            return self._send(200, st["objects"][path])
+        self._send(404, {"message": f"{path} not found"})
+
+    def do_PATCH(self):
+        path, query = self._record()
+        st = self.server.state
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.headers["Content-Type"] == "application/apply-patch+yaml":
+            obj = yaml.safe_load(body)
+            if obj["metadata"]["name"] == "broken":
+                return self._send(422, {"message": "spec is invalid"})
+            if "dryRun" not in query:
+                st["objects"][path] = obj
+            return self._send(200, obj)
+        ops = json.loads(body)
+        st["objects"][path]["spec"]["template"] = ops[0]["value"]
+        self._send(200, st["objects"][path])
+
+
+@pytest.fixture
+def api(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeAPI)
+    server.state = {"calls": [], "peers": set(), "objects": {}, "replicasets": [], "events": []}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("DG_K8S_BACKEND", "api")
+    monkeypatch.setenv("DG_K8S_API_SERVER", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setenv("DG_APPLY_WORKERS", "1")
+    monkeypatch.setattr(deploy_k8s, "_last_plan", RollbackPlan())
+    deploy_k8s.reset_backend()
+    yield server.state
+    deploy_k8s.reset_backend()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def manifests(tmp_path):
+    d = tmp_path / "k8s"
+    d.mkdir()
+    (d / "cm.yaml").write_text(
+        "apiVersion: v1\nkind: ConfigMap\nmetadata:\n  name: a\n  namespace: team-a\n"
+        "---\napiVersion: v1\nkind: ConfigMap\nmetadata:\n  name: b\n  namespace: team-a\n"
+    )
+    (d / "ns.yaml").write_text("apiVersion: v1\nkind: Namespace\nmetadata:\n  name: team-a\n")
+    return d
+
+
+def test_server_side_apply_dry_run_then_apply(api, manifests):
+    assert get_backend().name == "api"
+    assert deploy(str(manifests)) == 0
+    patches = [c for c in api["calls"] if c[0] == "PATCH"]
+    assert len(patches) == 6
+    assert all(c[3] == "application/apply-patch+yaml" for c in patches)
+    assert all(c[2]["fieldManager"] == ["deploy-guard"] for c in patches)
+    assert not any("force" in c[2] for c in patches)
+    assert sum("dryRun" in c[2] for c in patches) == 3
+    assert set(api["objects"]) == {
+        "/api/v1/namespaces/team-a/configmaps/a",
+        "/api/v1/namespaces/team-a/configmaps/b",
+        "/api/v1/namespaces/team-a",
+    }
+    # discovery is fetched once and every call shares one connection
+    assert sum(c[1] == "/api/v1" for c in api["calls"]) == 1
+    assert len(api["peers"]) == 1
+
+
+def test_rejected_dry_run_applies_nothing(api, manifests):
+    (manifests / "bad.yaml").write_text("apiVersion: v1\nkind: ConfigMap\nmetadata:\n  name: broken\n")
+    assert deploy(str(manifests)) == 2
+    assert not api["objects"]
+
+
+def test_rollback_restores_previous_template(api):
+    base = "/apis/apps/v1/namespaces/default"
+    api["objects"][f"{base}/deployments/web"] = {
+        "metadata": {"name": "web", "uid": "u1", "annotations": {"deployment.kubernetes.io/revision": "3"}},
+        "spec": {"selector": {"matchLabels": {"app": "web"}}, "template": {"spec": {"image": "web:3"}}},
+    }
+
+    def rs(rev, image, owner="u1"):
+        return {
+            "metadata": {"annotations": {"deployment.kubernetes.io/revision": str(rev)},
+                         "ownerReferences": [{"uid": owner}]},
+            "spec": {"template": {"metadata": {"labels": {"app": "web", "pod-template-hash": "x"}},
+                                  "spec": {"image": image}}},
+        }
+    api["replicasets"] = [rs(1, "web:1"), rs(2, "web:2"), rs(3, "web:3"), rs(2, "other", owner="u2")]
+
+    assert rollback("web") == 0
+    template = api["objects"][f"{base}/deployments/web"]["spec"]["template"]
+    assert template == {"metadata": {"labels": {"app": "web"}}, "spec": {"image": "web:2"}}
+    assert ("GET", f"{base}/replicasets", {"labelSelector": ["app=web"]}, None) in api["calls"]
+
+
+def test_rollback_without_history_fails(api):
+    api["objects"]["/apis/apps/v1/namespaces/default/deployments/web"] = {
+        "metadata": {"name": "web", "uid": "u1", "annotations": {"deployment.kubernetes.io/revision": "1"}},
+        "spec": {"selector": {"matchLabels": {"app": "web"}}},
+    }
+    assert rollback("web") == 2
+
+
+def test_kubeconfig_token_and_context(tmp_path, monkeypatch):
+    cfg = {
+        "current-context": "prod",
+        "contexts": [{"name": "prod", "context": {"cluster": "c1", "user": "u1", "namespace": "apps"}}],
+        "clusters": [{"name": "c1", "cluster": {"server": "https://k8s.example:6443/", "insecure-skip-tls-verify": True}}],
+        "users": [{"name": "u1", "user": {"token": "s3cret"}}],
+    }
+    path = tmp_path / "config"
+    path.write_text(yaml.safe_dump(cfg))
+    monkeypatch.delenv("DG_K8S_API_SERVER", raising=False)
+    monkeypatch.setenv("KUBECONFIG", str(path))
+    client = KubeClient.from_config()
+    assert client.server == "https://k8s.example:6443"
+    assert client.namespace == "apps"
+    assert client.session.verify is False
+    assert client.session.headers["Authorization"] == "Bearer s3cret"
+
+
+def test_kubeconfig_list_is_merged_like_kubectl(tmp_path, monkeypatch):
+    first = {"current-context": "dev",
+             "contexts": [{"name": "dev", "context": {"cluster": "c1", "user": "u1"}}],
+             "clusters": [{"name": "c1", "cluster": {"server": "https://dev.example"}}],
+             "users": [{"name": "u1", "user": {"token": "dev"}}]}
+    second = {"current-context": "prod",
+              "contexts": [{"name": "prod", "context": {"cluster": "c2", "user": "u2"}},
+                           {"name": "dev", "context": {"cluster": "c2", "user": "u2"}}],
+              "clusters": [{"name": "c2", "cluster": {"server": "https://prod.example", "certificate-authority": "ca.crt"}}],
+              "users": [{"name": "u2", "user": {"token": "prod"}}]}
+    (tmp_path / "a").write_text(yaml.safe_dump(first))
+    (tmp_path / "b").write_text(yaml.safe_dump(second))
+    (tmp_path / "ca.crt").write_text("")
+    paths = [tmp_path / "missing", tmp_path / "a", tmp_path / "b"]
+    monkeypatch.delenv("DG_K8S_API_SERVER", raising=False)
+    monkeypatch.setenv("KUBECONFIG", os.pathsep.join(map(str, paths)))
+    assert KubeClient.from_config().server == "https://dev.example"
+    client = KubeClient.from_config(context="prod")
+    assert client.server == "https://prod.example"
+    assert client.session.verify == str(tmp_path / "ca.crt")
+    with pytest.raises(RuntimeError, match="staging"):
+        KubeClient.from_config(context="staging")
+
+
+def test_force_conflicts_is_opt_in(api, manifests, monkeypatch):
+    monkeypatch.setenv("DG_K8S_FORCE_CONFLICTS", "1")
+    assert deploy(str(manifests)) == 0
+    assert all(c[2]["force"] == ["true"] for c in api["calls"] if c[0] == "PATCH")
+
+
+def test_kubeconfig_key_material_is_private_and_removed(tmp_path, monkeypatch):
+    b64 = base64.b64encode(b"-----BEGIN-----").decode()
+    cfg = {
+        "current-context": "prod",
+        "contexts": [{"name": "prod", "context": {"cluster": "c1", "user": "u1"}}],
+        "clusters": [{"name": "c1", "cluster": {"server": "https://k8s.example", "certificate-authority-data": b64}}],
+        "users": [{"name": "u1", "user": {"client-certificate-data": b64, "client-key-data": b64}}],
+    }
+    path = tmp_path / "config"
+    path.write_text(yaml.safe_dump(cfg))
+    monkeypatch.delenv("DG_K8S_API_SERVER", raising=False)
+    monkeypatch.setenv("KUBECONFIG", str(path))
+    client = KubeClient.from_config()
+    files = [client.session.verify, *client.session.cert]
+    assert {os.path.dirname(f) for f in files} == {client.keydir}
+    assert os.stat(client.keydir).st_mode & 0o777 == 0o700
+    assert all(os.stat(f).st_mode & 0o777 == 0o600 for f in files)
+    client.close()
+    assert not os.path.exists(client.keydir)
+
+
+def test_unconfigured_api_backend_falls_back_to_kubectl(tmp_path, monkeypatch):
+    monkeypatch.setenv("DG_K8S_BACKEND", "api")
+    monkeypatch.delenv("DG_K8S_API_SERVER", raising=False)
+    monkeypatch.setenv("KUBECONFIG", str(tmp_path / "missing"))
+    deploy_k8s.reset_backend()
+    try:
+        assert get_backend().name == "kubectl"
+    finally:
+        deploy_k8s.reset_backend()
+
+
+def test_rollout_watch_streams_until_ready(api):
+    def dep(rv, available):
+        return {
+            "metadata": {"name": "web", "generation": 2, "resourceVersion": rv},
+            "spec": {"replicas": 2},
+            "status": {"observedGeneration": 2, "updatedReplicas": 2, "replicas": 2,
+                       "availableReplicas": available},
+        }
+    api["objects"]["/apis/apps/v1/namespaces/default/deployments/web"] = dep("10", 0)
+    api["events"] = [{"type": "MODIFIED", "object": dep("11", 1)},
+                     {"type": "MODIFIED", "object": dep("12", 2)}]
+    assert wait_for_rollout("web", timeout=5) == 0
+    watch = [c for c in api["calls"] if "watch" in c[2]]
+    assert len(watch) == 1
+    assert watch[0][2]["fieldSelector"] == ["metadata.name=web"]
+    assert watch[0][2]["resourceVersion"] == ["10"]
@@ -0,0 +1,212 @@
+import json
+import time
+from deploy_guard.core import pipeline
+from deploy_guard.core.dag import Stage, run_dag, critical_path, OK, FAILED, CANCELLED, SKIPPED
+from deploy_guard.core.deadline import Deadline, TIMED_OUT
+
+
+def _sleep_rc(seconds, rc=0, calls=None, name=None):
+    def fn():
+        if calls is not None:
+            calls.append(name)
+        time.sleep(seconds)
+        return rc
+    return fn
+
+
+def test_independent_stages_overlap():
+    stages = [Stage(n, _sleep_rc(0.3)) for n in ("a", "b", "c")]
+    stages.append(Stage("d", _sleep_rc(0), deps=("a", "b", "c")))
+    start = time.monotonic()
+    results = run_dag(stages)
+    assert time.monotonic() - start < 0.8
+    assert all(r.status == OK for r in results.values())
+
+
+def test_fail_fast_cancels_pending():
+    calls = []
+    stages = [
+        Stage("bad", _sleep_rc(0, rc=2)),
+        Stage("slow", _sleep_rc(0.2)),
+        Stage("after", _sleep_rc(0, calls=calls, name="after"), deps=("slow",)),
+    ]
+    results = run_dag(stages, workers=2)
+    assert results["bad"].status == FAILED
+    assert results["slow"].status == OK       # already running, allowed to finish
+    assert results["after"].status == CANCELLED
+    assert calls == []
+
+
+def test_fail_fast_stops_running_siblings():
+    deadline = Deadline()
+    stages = [
+        Stage("bad", _sleep_rc(0.1, rc=2)),
+        Stage("hung", lambda: deadline.run(["sleep", "30"]).returncode),
+        Stage("waiting", lambda: 0 if deadline.sleep(30) else 2),
+    ]
+    start = time.monotonic()
+    results = run_dag(stages, workers=3, on_halt=deadline.cancel)
+    assert time.monotonic() - start < 5
+    assert results["bad"].status == FAILED
+    assert results["hung"].status == CANCELLED and results["hung"].rc == TIMED_OUT
+    assert results["waiting"].status == CANCELLED
+    assert deadline.cancelled and not deadline.timed_out()
+
+
+def test_without_fail_fast_only_dependents_skip():
+    stages = [
+        Stage("bad", _sleep_rc(0, rc=2)),
+        Stage("good", _sleep_rc(0)),
+        Stage("child", _sleep_rc(0), deps=("bad",)),
+    ]
+    results = run_dag(stages, fail_fast=False)
+    assert [r.status for r in results.values()] == [FAILED, OK, SKIPPED]
+
+
+def test_critical_path_follows_slowest_chain():
+    stages = [
+        Stage("fast", _sleep_rc(0)),
+        Stage("slow", _sleep_rc(0.2)),
+        Stage("deploy", _sleep_rc(0), deps=("fast", "slow")),
+    ]
+    results = run_dag(stages)
+    assert critical_path(stages, results) == ["slow", "deploy"]
+
+
+def _patch_stages(monkeypatch, **rcs):
+    for name, attr in [("env", "validate_env"), ("disk", "check_disk"),
+                       ("memory", "check_memory"), ("manifest", "check_manifest"),
+                       ("deploy", "deploy"), ("rollout", "wait_for_rollout"),
+                       ("api", "get_with_retry")]:
+        rc = rcs.get(name, 0)
+        monkeypatch.setattr(pipeline, attr, lambda *a, _rc=rc, **kw: _rc)
+    rolled = []
+    monkeypatch.setattr(pipeline, "rollback_release", lambda d, *a: rolled.append(d) or 0)
+    return rolled
+
+
+def test_pipeline_success_writes_report(monkeypatch, tmp_path):
+    _patch_stages(monkeypatch)
+    report = tmp_path / "report.json"
+    monkeypatch.setenv("DG_REPORT_FILE", str(report))
+    assert pipeline.run_pipeline("m.yaml", "http://svc") == 0
+    assert '"deploy"' in report.read_text()
+
+
+def test_pipeline_env_failure_blocks_deploy(monkeypatch):
+    rolled = _patch_stages(monkeypatch, env=2)
+    assert pipeline.run_pipeline("m.yaml", "http://svc") == 2
+    assert rolled == []
+
+
+def test_pipeline_api_failure_rolls_back(monkeypatch):
+    rolled = _patch_stages(monkeypatch, api=2)
+    monkeypatch.setenv("DEPLOYMENT_NAME", "web")
+    assert pipeline.run_pipeline("m.yaml", "http://svc") == 2
+    assert rolled == ["web"]
+
+
+def test_pipeline_rollout_failure_rolls_back_before_api(monkeypatch):
+    rolled = _patch_stages(monkeypatch, rollout=2)
+    probed = []
+    monkeypatch.setattr(pipeline, "get_with_retry", lambda url: probed.append(url) or 0)
+    monkeypatch.setenv("DEPLOYMENT_NAME", "web")
+    assert pipeline.run_pipeline("m.yaml", "http://svc") == 2
+    assert rolled == ["web"]
+    assert probed == []
+
+
+def test_rollout_is_watched_only_for_a_named_deployment(monkeypatch):
+    monkeypatch.delenv("DEPLOYMENT_NAME", raising=False)
+    stages = {s.name: s for s in pipeline.build_stages("m.yaml", "http://svc")}
+    assert "rollout" not in stages and stages["api"].deps == ("deploy",)
+    monkeypatch.setenv("DEPLOYMENT_NAME", "web")
+    stages = {s.name: s for s in pipeline.build_stages("m.yaml", "http://svc")}
+    assert stages["rollout"].deps == ("deploy",) and stages["api"].deps == ("rollout",)
+
+
+def _counting_stages(monkeypatch, **rcs):
+    counts = {}
+    for name, attr in [("env", "validate_env"), ("disk", "check_disk"),
+                       ("memory", "check_memory"), ("manifest", "check_manifest"),
+                       ("deploy", "deploy"), ("rollout", "wait_for_rollout"),
+                       ("api", "get_with_retry")]:
+        def fn(*a, _name=name, **kw):
+            counts[_name] = counts.get(_name, 0) + 1
+            return rcs.get(_name, 0)
+        monkeypatch.setattr(pipeline, attr, fn)
+    monkeypatch.setattr(pipeline, "rollback_release", lambda *a: 0)
+    return counts
+
+
+def _setup_checkpoint(monkeypatch, tmp_path):
+    manifest = tmp_path / "app.yaml"
+    manifest.write_text("kind: ConfigMap\nmetadata:\n  name: a\n")
+    monkeypatch.setenv("DG_CHECKPOINT_FILE", str(tmp_path / "ckpt.json"))
+    monkeypatch.setenv("DEPLOYMENT_NAME", "web")
+    return str(manifest)
+
+
+def test_resume_skips_completed_stages(kubectl, monkeypatch, tmp_path):
+    manifest = _setup_checkpoint(monkeypatch, tmp_path)
+    _counting_stages(monkeypatch, rollout=2)
+    assert pipeline.run_pipeline(manifest, "http://svc") == 2
+
+    counts = _counting_stages(monkeypatch)
+    report = tmp_path / "report.json"
+    monkeypatch.setenv("DG_REPORT_FILE", str(report))
+    assert pipeline.run_pipeline(manifest, "http://svc", resume=True) == 0
+    # deploy was invalidated by the rollback; pre-flight was resumed
+    assert counts == {"deploy": 1, "rollout": 1, "api": 1}
+    assert json.loads(report.read_text())["resumed"] == ["disk", "env", "manifest", "memory"]
+
+
+def test_resume_after_interrupted_run_skips_deploy(kubectl, monkeypatch, tmp_path):
+    manifest = _setup_checkpoint(monkeypatch, tmp_path)
+    _counting_stages(monkeypatch)
+    # a run killed during the rollout watch: only the stages it finished are recorded
+    stages = pipeline.build_stages(manifest, "http://svc")
+    ckpt = pipeline.Checkpoint(str(tmp_path / "ckpt.json"))
+    for s in pipeline._resumable(stages, manifest, ckpt, False, []):
+        if s.name in pipeline.CHECKPOINTED:
+            assert s.func() == 0
+
+    counts = _counting_stages(monkeypatch)
+    assert pipeline.run_pipeline(manifest, "http://svc", resume=True) == 0
+    assert counts == {"rollout": 1, "api": 1}
+
+
+def test_switched_cluster_invalidates_deploy(monkeypatch, tmp_path):
+    manifest = _setup_checkpoint(monkeypatch, tmp_path)
+    cluster = ["https://a:6443"]
+    monkeypatch.setattr(pipeline, "get_backend", lambda: type("B", (), {"cluster_id": lambda self: cluster[0]})())
+    _counting_stages(monkeypatch)
+    assert pipeline.run_pipeline(manifest, "http://svc") == 0
+
+    # `kubectl config use-context b`: same KUBECONFIG path, other cluster
+    cluster[0] = "https://b:6443"
+    counts = _counting_stages(monkeypatch)
+    assert pipeline.run_pipeline(manifest, "http://svc", resume=True) == 0
+    assert counts == {"deploy": 1, "rollout": 1, "api": 1}
+
+
+def test_changed_manifest_invalidates_downstream(kubectl, monkeypatch, tmp_path):
+    manifest = _setup_checkpoint(monkeypatch, tmp_path)
+    _counting_stages(monkeypatch)
+    assert pipeline.run_pipeline(manifest, "http://svc") == 0
+
+    with open(manifest, "a") as f:
+        f.write("data:\n  k: v\n")
+    counts = _counting_stages(monkeypatch)
+    assert pipeline.run_pipeline(manifest, "http://svc", resume=True) == 0
+    assert counts == {"manifest": 1, "deploy": 1, "rollout": 1, "api": 1}
+
+
+def test_expired_checkpoint_is_stale(kubectl, monkeypatch, tmp_path):
+    manifest = _setup_checkpoint(monkeypatch, tmp_path)
+    _counting_stages(monkeypatch)
+    assert pipeline.run_pipeline(manifest, "http://svc") == 0
+    monkeypatch.setenv("DG_CHECKPOINT_TTL", "0")
+    counts = _counting_stages(monkeypatch)
+    assert pipeline.run_pipeline(manifest, "http://svc", resume=True) == 0
+    assert counts["env"] == 1 and counts["deploy"] == 1
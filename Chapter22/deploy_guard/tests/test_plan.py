@@ -0,0 +1,58 @@
+import json
+import pytest
+from deploy_guard import cli
+from deploy_guard.core.plan import load_plan, run_plan, Step
+
+
+def test_load_plan_forms(tmp_path):
+    p = tmp_path / "plan.yaml"
+    p.write_text(
+        "steps:\n"
+        "  - env\n"
+        "  - run: apply --manifest k8s/ --workers 8\n"
+        "    name: apply-app\n"
+        "    on_failure: continue\n"
+        "  - run: [api, --url, 'http://svc']\n"
+        "    ok_codes: [0, 1]\n"
+    )
+    steps = load_plan(str(p))
+    assert [s.name for s in steps] == ["env", "apply-app", "api"]
+    assert steps[1].argv == ["apply", "--manifest", "k8s/", "--workers", "8"]
+    assert steps[1].on_failure == "continue" and steps[2].ok_codes == (0, 1)
+
+
+def test_stop_skips_rest_and_continue_keeps_going():
+    rcs = {"a": 0, "b": 2, "c": 0, "d": 0}
+    steps = [Step("a", ["a"]), Step("b", ["b"], on_failure="continue"),
+             Step("c", ["c"]), Step("d", ["d"], ok_codes=(1,))]
+    rc, summary = run_plan(steps, lambda s: rcs[s.name])
+    assert rc == 2
+    assert [s["status"] for s in summary["steps"]] == ["ok", "failed", "ok", "failed"]
+
+    steps[1].on_failure = "stop"
+    rc, summary = run_plan(steps, lambda s: rcs[s.name])
+    assert [s["status"] for s in summary["steps"]] == ["ok", "failed", "skipped", "skipped"]
+
+
+def test_run_plan_shares_one_session(tmp_path, monkeypatch):
+    seen = []
+    monkeypatch.setattr(cli, "get_with_retry", lambda url, session=None: seen.append(session) or 0)
+    monkeypatch.setattr(cli, "check_disk", lambda: 0)
+    plan = tmp_path / "plan.yaml"
+    plan.write_text("steps:\n  - disk\n  - api --url http://a\n  - api --url http://b\n")
+    out = tmp_path / "summary.json"
+    assert cli.run_plan_file(str(plan), str(out)) == 0
+    assert len(seen) == 2 and seen[0] is seen[1] and seen[0] is not None
+    summary = json.loads(out.read_text())
+    assert [s["name"] for s in summary["steps"]] == ["disk", "api", "api"]
+    assert all("duration" in s for s in summary["steps"])
+
+
+def test_invalid_step_fails_before_running(tmp_path, monkeypatch):
+    ran = []
+    monkeypatch.setattr(cli, "check_disk", lambda: ran.append("disk") or 0)
+    plan = tmp_path / "plan.yaml"
+    plan.write_text("steps:\n  - disk\n  - apply --no-such-flag\n")
+    with pytest.raises(ValueError, match="invalid arguments"):
+        cli.run_plan_file(str(plan))
+    assert ran == []
@@ -0,0 +1,132 @@
+import re
+import pytest
+from deploy_guard import metrics
+from deploy_guard.core.report import RunReport
+from deploy_guard.core.deploy_k8s import deploy, wait_for_rollout
+from deploy_guard.core.pipeline import build_stages
+from deploy_guard.core.prepull import prepull, daemonset_for, images_in, pod_specs, PREPULL_NAME
+
+APP = """apiVersion: apps/v1
+kind: Deployment
+metadata: {name: web, namespace: prod}
+spec:
+  template:
+    spec:
+      nodeSelector: {pool: web}
+      tolerations: [{key: dedicated, operator: Exists}]
+      initContainers: [{name: migrate, image: "web-migrate:2"}]
+      containers: [{name: web, image: "web:2"}, {name: proxy, image: "envoy:1.30"}]
+"""
+JOB = """apiVersion: batch/v1
+kind: CronJob
+metadata: {name: report, namespace: prod}
+spec:
+  jobTemplate:
+    spec:
+      template:
+        spec:
+          containers: [{name: report, image: "web:2"}]
+"""
+
+
+@pytest.fixture
+def app(tmp_path):
+    d = tmp_path / "app"
+    d.mkdir()
+    (d / "web.yaml").write_text(APP)
+    return d
+
+
+def test_images_and_daemonset(app, monkeypatch):
+    (app / "report.yaml").write_text(JOB)
+    specs = pod_specs([str(app / "web.yaml"), str(app / "report.yaml")])
+    images = images_in(specs)
+    assert images == ["web-migrate:2", "web:2", "envoy:1.30"]
+
+    pod = daemonset_for(images, "prod", specs)["spec"]["template"]["spec"]
+    helper, *pulls = pod["initContainers"]
+    assert [c["image"] for c in pulls] == images
+    # the no-op comes from the helper, so images without a shell work too
+    assert helper["command"] == ["cp", "/bin/true", "/deploy-guard-prepull/true"]
+    assert all(c["command"] == ["/deploy-guard-prepull/true"] for c in pulls)
+    assert all(c["volumeMounts"][0]["name"] == "noop" for c in pulls)
+    assert pod["volumes"] == [{"name": "noop", "emptyDir": {}}]
+    assert pod["tolerations"] == [{"key": "dedicated", "operator": "Exists"}]
+    assert "nodeSelector" not in pod  # the CronJob has none, so no common selector
+
+    assert daemonset_for(images, "prod", specs[:1])["spec"]["template"]["spec"]["nodeSelector"] == {"pool": "web"}
+    monkeypatch.setenv("DG_PREPULL_NODE_SELECTOR", "pool=all,zone=a")
+    assert daemonset_for(images, "prod", specs)["spec"]["template"]["spec"]["nodeSelector"] == {"pool": "all", "zone": "a"}
+
+    monkeypatch.setenv("DG_PREPULL_COMMAND", "/app/healthcheck --version")
+    pod = daemonset_for(images, "prod", specs)["spec"]["template"]["spec"]
+    assert [c["image"] for c in pod["initContainers"]] == images and "volumes" not in pod
+    assert pod["initContainers"][0]["command"] == ["/app/healthcheck", "--version"]
+
+
+def test_daemonset_pulls_with_the_workloads_credentials(app):
+    (app / "web.yaml").write_text(APP.replace("      nodeSelector", (
+        "      serviceAccountName: web\n"
+        "      imagePullSecrets: [{name: registry}]\n"
+        "      nodeSelector")))
+    (app / "api.yaml").write_text(APP.replace("name: web,", "name: api,").replace("      nodeSelector", (
+        "      serviceAccountName: web\n"
+        "      imagePullSecrets: [{name: registry}, {name: mirror}]\n"
+        "      nodeSelector")))
+    specs = pod_specs([str(app / "api.yaml"), str(app / "web.yaml")])
+    pod = daemonset_for(images_in(specs), "prod", specs)["spec"]["template"]["spec"]
+    assert pod["imagePullSecrets"] == [{"name": "registry"}, {"name": "mirror"}]
+    assert pod["serviceAccountName"] == "web"
+
+    # no account shared by every workload: keep the namespace default
+    (app / "report.yaml").write_text(JOB)
+    specs = pod_specs([str(app / "api.yaml"), str(app / "report.yaml")])
+    assert "serviceAccountName" not in daemonset_for(images_in(specs), "prod", specs)["spec"]["template"]["spec"]
+
+
+def test_prepull_waits_then_cleans_up(kubectl, app):
+    report = RunReport()
+    assert prepull(str(app), "prod", report=report) == 0
+    calls = kubectl()
+    assert calls[0][:2] == ["apply", "-n"] and calls[0][-1].endswith("prepull.yaml")
+    assert calls[1] == ["rollout", "status", f"daemonset/{PREPULL_NAME}", "-n", "prod", "--timeout=300s"]
+    assert calls[2][:2] == ["delete", f"daemonset/{PREPULL_NAME}"]
+    assert report.data["prepull"]["outcome"] == "cached"
+
+
+def test_prepull_timeout_does_not_fail(kubectl, app, monkeypatch):
+    monkeypatch.setenv("FAKE_KUBECTL_PULL_SECONDS", "0.3")
+    monkeypatch.setenv("DG_PREPULL_TIMEOUT", "1")
+    report = RunReport()
+    assert prepull(str(app), "prod", report=report) == 0
+    assert report.data["prepull"]["outcome"] == "timeout"
+    assert kubectl()[-1][:2] == ["delete", f"daemonset/{PREPULL_NAME}"]
+
+
+def _rollout_seconds(prepull_label):
+    m = re.search(r'deploy_guard_rollout_seconds\{[^}]*prepull="%s"[^}]*\} (\S+)' % prepull_label, metrics.render())
+    return float(m.group(1))
+
+
+def test_prepull_shortens_rollout(kubectl, app, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_KUBECTL_PULL_SECONDS", "0.3")
+    metrics.reset()
+    assert deploy(str(app)) == 0
+    assert wait_for_rollout("web", "prod", prepulled=False) == 0
+
+    (tmp_path / "kubectl.log.state").unlink()  # fresh nodes
+    assert prepull(str(app), "prod") == 0
+    assert deploy(str(app)) == 0
+    assert wait_for_rollout("web", "prod", prepulled=True) == 0
+
+    assert _rollout_seconds("off") >= 0.9  # three uncached images
+    assert _rollout_seconds("on") < _rollout_seconds("off") - 0.5
+    metrics.reset()
+
+
+def test_pipeline_stage_runs_before_deploy(monkeypatch):
+    assert "prepull" not in [s.name for s in build_stages("m.yaml", "http://svc")]
+    monkeypatch.setenv("DG_PREPULL", "1")
+    stages = {s.name: s for s in build_stages("m.yaml", "http://svc")}
+    assert stages["prepull"].deps == ("manifest",)
+    assert "prepull" in stages["deploy"].deps
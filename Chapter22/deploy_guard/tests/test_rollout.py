@@ -0,0 +1,100 @@
+import pytest
+from deploy_guard import metrics
+from deploy_guard.core import deploy_k8s
+from deploy_guard.core.rollout import rollout_status, watch_rollout, RolloutFailed
+
+
+def dep(rv, updated=0, total=0, available=0, replicas=2, generation=2, observed=2, conditions=()):
+    return {
+        "metadata": {"name": "web", "generation": generation, "resourceVersion": str(rv),
+                     "annotations": {"deployment.kubernetes.io/revision": "7"}},
+        "spec": {"replicas": replicas},
+        "status": {"observedGeneration": observed, "updatedReplicas": updated, "replicas": total,
+                   "availableReplicas": available, "conditions": list(conditions)},
+    }
+
+
+class FakeClient:
+    def __init__(self, initial, streams):
+        self.initial = initial
+        self.streams = list(streams)
+        self.watches = []
+
+    def get(self, *a):
+        return self.initial
+
+    def watch(self, *a, resource_version=None, **kw):
+        self.watches.append(resource_version)
+        yield from (self.streams.pop(0) if self.streams else [])
+
+
+def test_status_rules():
+    assert not rollout_status(dep(1, observed=1))[0]
+    assert not rollout_status(dep(1, updated=1, total=1, available=1))[0]
+    assert "old replica" in rollout_status(dep(1, updated=2, total=3, available=2))[1]
+    assert not rollout_status(dep(1, updated=2, total=2, available=1))[0]
+    assert rollout_status(dep(1, updated=2, total=2, available=2))[0]
+    stuck = dep(1, conditions=[{"type": "Progressing", "reason": "ProgressDeadlineExceeded"}])
+    with pytest.raises(RolloutFailed):
+        rollout_status(stuck)
+
+
+def test_returns_on_first_ready_event():
+    client = FakeClient(dep(1), [[
+        {"type": "MODIFIED", "object": dep(2, updated=2, total=4, available=2)},
+        {"type": "BOOKMARK", "object": {"metadata": {"resourceVersion": "3"}}},
+        {"type": "MODIFIED", "object": dep(4, updated=2, total=2, available=2)},
+        {"type": "MODIFIED", "object": dep(5)},  # never consumed
+    ]])
+    assert watch_rollout(client, "web", "default", timeout=5) == 7
+    assert client.watches == ["1"]
+
+
+def test_reconnects_from_last_version_and_after_gone():
+    client = FakeClient(dep(1), [
+        [{"type": "MODIFIED", "object": dep(2, updated=1, total=3, available=2)}],
+        [{"type": "ERROR", "object": {"code": 410, "message": "too old"}}],
+        [{"type": "MODIFIED", "object": dep(9, updated=2, total=2, available=2)}],
+    ])
+    assert watch_rollout(client, "web", "default", timeout=5) == 7
+    assert client.watches == ["1", "2", "1"]
+
+
+def test_deleted_and_timeout_fail():
+    with pytest.raises(RolloutFailed, match="deleted"):
+        watch_rollout(FakeClient(dep(1), [[{"type": "DELETED", "object": dep(2)}]]), "web", "default", 5)
+    with pytest.raises(RolloutFailed, match="not ready"):
+        watch_rollout(FakeClient(dep(1), []), "web", "default", 0.05)
+
+
+def test_time_to_ready_metric(monkeypatch, tmp_path):
+    class Backend:
+        name = "fake"
+
+        def wait_ready(self, deployment, namespace, timeout):
+            return 0
+    monkeypatch.setattr(deploy_k8s, "get_backend", lambda: Backend())
+    out = tmp_path / "deploy_guard.prom"
+    monkeypatch.setenv("DG_METRICS_FILE", str(out))
+    metrics.reset()
+    assert deploy_k8s.wait_for_rollout("web", "prod") == 0
+    text = out.read_text()
+    assert "# TYPE deploy_guard_rollout_seconds gauge" in text
+    assert 'deploy_guard_rollout_seconds{deployment="web",namespace="prod",outcome="ready"}' in text
+    assert not [p for p in tmp_path.iterdir() if p.name.startswith(".")]
+
+
+def test_metrics_textfile_is_world_readable_and_failed_writes_leave_nothing(tmp_path, monkeypatch):
+    metrics.reset()
+    metrics.record("deploy_guard_rollout_seconds", 1.5, deployment="web")
+    path = tmp_path / "dg.prom"
+    metrics.flush(str(path))
+    assert path.stat().st_mode & 0o777 == 0o644
+    assert 'deploy_guard_rollout_seconds{deployment="web"} 1.5' in path.read_text()
+
+    def broken(*a):
+        raise OSError("disk full")
+    monkeypatch.setattr(metrics.os, "replace", broken)
+    metrics.flush(str(path))
+    assert [p.name for p in tmp_path.iterdir()] == ["dg.prom"]
+    metrics.reset()
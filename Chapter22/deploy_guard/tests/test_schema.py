@@ -0,0 +1,192 @@
+import json
+import pytest
+from deploy_guard.core import schema
+from deploy_guard.core.deploy_k8s import deploy, check_manifest
+from deploy_guard.core.schema import compile_schemas, load_schemas, SchemaSet
+
+REF = "#/definitions/"
+SWAGGER = {
+    "swagger": "2.0",
+    "definitions": {
+        "io.k8s.api.apps.v1.Deployment": {
+            "description": "Deployment enables declarative updates for Pods and ReplicaSets.",
+            "properties": {
+                "apiVersion": {"type": "string"},
+                "kind": {"type": "string"},
+                "metadata": {"$ref": REF + "io.k8s.apimachinery.pkg.apis.meta.v1.ObjectMeta"},
+                "spec": {"$ref": REF + "io.k8s.api.apps.v1.DeploymentSpec"},
+            },
+            "type": "object",
+            "x-kubernetes-group-version-kind": [{"group": "apps", "kind": "Deployment", "version": "v1"}],
+        },
+        "io.k8s.api.apps.v1.DeploymentSpec": {
+            "properties": {
+                "replicas": {"type": "integer", "format": "int32"},
+                "selector": {"$ref": REF + "io.k8s.apimachinery.pkg.apis.meta.v1.LabelSelector"},
+                "strategy": {"properties": {
+                    "type": {"type": "string", "enum": ["Recreate", "RollingUpdate"]},
+                    "rollingUpdate": {"properties": {
+                        "maxSurge": {"$ref": REF + "io.k8s.apimachinery.pkg.util.intstr.IntOrString"}},
+                        "type": "object"},
+                }, "type": "object"},
+                "template": {"$ref": REF + "io.k8s.api.core.v1.PodTemplateSpec"},
+            },
+            "required": ["selector", "template"],
+            "type": "object",
+        },
+        "io.k8s.api.core.v1.PodTemplateSpec": {
+            "properties": {
+                "metadata": {"$ref": REF + "io.k8s.apimachinery.pkg.apis.meta.v1.ObjectMeta"},
+                "spec": {"properties": {
+                    "containers": {"items": {"$ref": REF + "io.k8s.api.core.v1.Container"}, "type": "array"},
+                }, "required": ["containers"], "type": "object"},
+            },
+            "type": "object",
+        },
+        "io.k8s.api.core.v1.Container": {
+            "properties": {
+                "name": {"type": "string"},
+                "image": {"type": "string"},
+                "resources": {"properties": {"limits": {
+                    "additionalProperties": {"$ref": REF + "io.k8s.apimachinery.pkg.api.resource.Quantity"},
+                    "type": "object"}}, "type": "object"},
+            },
+            "required": ["name"],
+            "type": "object",
+        },
+        "io.k8s.apimachinery.pkg.apis.meta.v1.ObjectMeta": {
+            "properties": {
+                "name": {"type": "string"},
+                "namespace": {"type": "string"},
+                "labels": {"additionalProperties": {"type": "string"}, "type": "object"},
+            },
+            "type": "object",
+        },
+        "io.k8s.apimachinery.pkg.apis.meta.v1.LabelSelector": {
+            "properties": {"matchLabels": {"additionalProperties": {"type": "string"}, "type": "object"}},
+            "type": "object",
+        },
+        "io.k8s.apimachinery.pkg.util.intstr.IntOrString": {"type": "string", "format": "int-or-string"},
+        "io.k8s.apimachinery.pkg.api.resource.Quantity": {"type": "string"},
+        "io.k8s.api.core.v1.Unused": {"type": "object"},
+    },
+}
+
+GOOD = """apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: web
+  labels: {app: web}
+spec:
+  replicas: 3
+  selector: {matchLabels: {app: web}}
+  strategy: {type: RollingUpdate, rollingUpdate: {maxSurge: 25%}}
+  template:
+    metadata: {labels: {app: web}}
+    spec:
+      containers:
+        - name: web
+          image: web:2
+          resources: {limits: {cpu: 1, memory: 256Mi}}
+"""
+
+
+@pytest.fixture
+def schemas():
+    return SchemaSet(compile_schemas([SWAGGER]))
+
+
+def _errors(schemas, text):
+    import yaml
+    return schemas.validate(yaml.safe_load(text))
+
+
+def test_valid_manifest_passes(schemas):
+    assert _errors(schemas, GOOD) == []
+
+
+def test_compile_keeps_reachable_definitions_only():
+    compiled = compile_schemas([SWAGGER])
+    assert compiled["kinds"] == {"apps/v1/Deployment": "io.k8s.api.apps.v1.Deployment"}
+    assert "io.k8s.api.core.v1.Unused" not in compiled["defs"]
+    assert "description" not in json.dumps(compiled)
+
+
+@pytest.mark.parametrize("old,new,error", [
+    ("replicas: 3", "replicas: three", "spec.replicas: expected integer, got str"),
+    ("replicas: 3", "replicas: true", "spec.replicas: expected integer, got bool"),
+    ("replicas: 3", "replica: 3", "spec.replica: unknown field"),
+    ("type: RollingUpdate", "type: Rolling", "spec.strategy.type: 'Rolling' is not one of"),
+    ("- name: web\n          image", "- image", "spec.template.spec.containers[0].name: required field missing"),
+    ("  selector: {matchLabels: {app: web}}\n", "", "spec.selector: required field missing"),
+    ("labels: {app: web}\n", "labels: {app: [web]}\n", "metadata.labels.app: expected string, got list"),
+])
+def test_errors_name_the_field(schemas, old, new, error):
+    errors = _errors(schemas, GOOD.replace(old, new, 1))
+    assert len(errors) == 1 and errors[0].startswith(error)
+
+
+def test_unknown_kind_has_no_schema(schemas):
+    assert schemas.validate({"apiVersion": "example.com/v1", "kind": "Widget"}) is None
+
+
+def test_openapi_v3_documents():
+    v3 = {"openapi": "3.0.0", "components": {"schemas": {
+        k: json.loads(json.dumps(v).replace(REF, "#/components/schemas/"))
+        for k, v in SWAGGER["definitions"].items()
+    }}}
+    spec = v3["components"]["schemas"]["io.k8s.api.apps.v1.DeploymentSpec"]["properties"]
+    spec["template"] = {"allOf": [spec["template"]], "default": {}}
+    schemas = SchemaSet(compile_schemas([v3]))
+    assert _errors(schemas, GOOD) == []
+    assert _errors(schemas, GOOD.replace("image: web:2", "image: 2")) == [
+        "spec.template.spec.containers[0].image: expected string, got int"]
+
+
+def test_compiled_form_is_cached_on_disk(tmp_path, monkeypatch):
+    (tmp_path / "swagger.json").write_text(json.dumps(SWAGGER))
+    cache = tmp_path / "cache" / "schemas.json"
+    load_schemas(str(tmp_path), str(cache))
+    assert cache.exists()
+
+    def boom(documents):
+        raise AssertionError("recompiled")
+    monkeypatch.setattr(schema, "compile_schemas", boom)
+    assert load_schemas(str(tmp_path), str(cache)).kinds
+
+    (tmp_path / "swagger.json").write_text(json.dumps({"definitions": {}}))
+    with pytest.raises(AssertionError, match="recompiled"):
+        load_schemas(str(tmp_path), str(cache))
+
+
+@pytest.fixture
+def schema_env(tmp_path, monkeypatch):
+    d = tmp_path / "openapi"
+    d.mkdir()
+    (d / "swagger.json").write_text(json.dumps(SWAGGER))
+    monkeypatch.setenv("DG_SCHEMA_DIR", str(d))
+    schema.reset_schemas()
+    yield
+    schema.reset_schemas()
+
+
+def test_invalid_manifest_fails_before_any_cluster_call(kubectl, schema_env, tmp_path):
+    app = tmp_path / "app"
+    app.mkdir()
+    (app / "web.yaml").write_text(GOOD)
+    (app / "api.yaml").write_text(GOOD.replace("name: web\n  labels", "name: api\n  label"))
+    assert check_manifest(str(app)) == 2
+    assert deploy(str(app)) == 2
+    assert kubectl() == []
+
+    (app / "api.yaml").unlink()
+    assert deploy(str(app)) == 0
+    assert [c[0] for c in kubectl()].count("apply") == 2
+
+
+def test_unknown_kinds_fail_only_when_strict(kubectl, schema_env, tmp_path, monkeypatch):
+    crd = tmp_path / "widget.yaml"
+    crd.write_text("apiVersion: example.com/v1\nkind: Widget\nmetadata: {name: w}\n")
+    assert check_manifest(str(crd)) == 0
+    monkeypatch.setenv("DG_SCHEMA_STRICT", "1")
+    assert check_manifest(str(crd)) == 2
@@ -0,0 +1,81 @@
+import json
+import pytest
+from deploy_guard.core.report import RunReport
+from deploy_guard.core.waves import Cluster, plan_waves, roll_out, load_clusters
+
+
+def _clusters(n):
+    return [Cluster(f"c{i}", f"ctx-{i}") for i in range(n)]
+
+
+def test_plan_waves_percentages():
+    clusters = _clusters(20)
+    waves = plan_waves(clusters, [10, 50, 100])
+    assert [len(w) for w in waves] == [1, 2, 8, 9]
+    assert waves[0] == [clusters[0]]
+    clusters[5].canary = True
+    assert plan_waves(clusters, [50])[0] == [clusters[5]]
+    assert [len(w) for w in plan_waves(clusters, [50])] == [1, 10, 9]  # 100 is implied
+    assert [len(w) for w in plan_waves(_clusters(2), [10, 50, 100])] == [1, 1]
+
+
+def test_load_clusters_rejects_two_canaries(tmp_path):
+    p = tmp_path / "clusters.yaml"
+    p.write_text("clusters:\n  - {name: a, canary: true}\n  - {name: b, canary: true}\n")
+    with pytest.raises(ValueError, match="canary"):
+        load_clusters(str(p))
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    d = tmp_path / "app"
+    d.mkdir()
+    (d / "web.yaml").write_text(
+        "kind: Deployment\nmetadata:\n  name: web\n  namespace: prod\n"
+        "spec:\n  template:\n    spec:\n      containers: [{name: web, image: web:2}]\n"
+    )
+    live = {"web": {"metadata": {"name": "web", "namespace": "prod"},
+                    "spec": {"template": {"spec": {"containers": [{"name": "web", "image": "web:1"}]}}}}}
+    monkeypatch.setenv("FAKE_KUBECTL_LIVE", json.dumps(live))
+    monkeypatch.setenv("DEPLOYMENT_NAME", "web")
+    monkeypatch.setenv("DEPLOYMENT_NAMESPACE", "prod")
+    return str(d)
+
+
+def _by_context(calls, verb):
+    return sorted({c[1] for c in calls if c[0] == "--context" and c[2] == verb})
+
+
+def test_all_waves_succeed(kubectl, app):
+    report = RunReport()
+    assert roll_out(app, _clusters(5), [50, 100], max_parallel=2, report=report) == 0
+    assert [w["clusters"] for w in report.data["waves"]] == [["c0"], ["c1", "c2"], ["c3", "c4"]]
+    applied = [c[1] for c in kubectl() if c[0] == "--context" and c[2] == "apply" and "--dry-run=server" not in c]
+    assert applied[0] == "ctx-0" and sorted(applied) == [f"ctx-{i}" for i in range(5)]
+    assert set(report.data["clusters"]["c3"]) >= {"apply_s", "rollout_s", "total_s"}
+    assert report.data["max_parallel"] == 2 and report.data["rolled_back"] == []
+
+
+def test_failed_wave_rolls_back_every_touched_cluster(kubectl, app, monkeypatch):
+    monkeypatch.setenv("FAKE_KUBECTL_FAIL_CONTEXTS", "ctx-2")
+    report = RunReport()
+    assert roll_out(app, _clusters(5), [50, 100], report=report) == 2
+    assert [w["status"] for w in report.data["waves"]] == ["ok", "failed"]
+    # the wave-2 clusters were never touched
+    assert _by_context(kubectl(), "apply") == ["ctx-0", "ctx-1", "ctx-2"]
+    assert _by_context(kubectl(), "patch") == ["ctx-0", "ctx-1", "ctx-2"]
+    assert sorted(report.data["rolled_back"]) == ["c0", "c1", "c2"]
+
+
+def test_canary_failure_stops_everything(kubectl, app, monkeypatch):
+    monkeypatch.setenv("FAKE_KUBECTL_FAIL_CONTEXTS", "ctx-0")
+    assert roll_out(app, _clusters(4), [100]) == 2
+    assert _by_context(kubectl(), "apply") == ["ctx-0"]
+
+
+def test_apply_cache_keeps_every_clusters_records(kubectl, app, tmp_path, monkeypatch):
+    cache = tmp_path / "apply-cache.json"
+    monkeypatch.setenv("DG_APPLY_CACHE", str(cache))
+    assert roll_out(app, _clusters(5), [100], max_parallel=4) == 0
+    clusters = {key.split("|", 1)[0] for key in json.loads(cache.read_text())["objects"]}
+    assert clusters == {f"https://ctx-{i}:6443" for i in range(5)}
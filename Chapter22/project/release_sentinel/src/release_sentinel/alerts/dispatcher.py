@@ -0,0 +1,187 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+
+from release_sentinel.alerts.webhook import post_alert
+from release_sentinel.config import get_env
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPOOL_DIR = "/tmp/release_sentinel_alerts"
+DEFAULT_DRAIN_TIMEOUT = 2.0   # seconds the process may wait at exit
+MAX_SPOOL_ATTEMPTS = 10       # give up on an alert after this many runs
+
+_STOP = object()
+
+
+class AlertDispatcher:
+    """
+    Delivers alerts from a background worker so the gate never waits on
+    a slow webhook.
+
+    Duplicate alerts raised within one run are sent once. An alert that
+    cannot be delivered (or is still queued when the exit drain times
+    out) is written to the spool directory and retried on the next
+    invocation.
+    """
+
+    def __init__(self, spool_dir=None, drain_timeout=None, post=None):
+        self.spool_dir = Path(spool_dir or get_env("RS_ALERT_SPOOL_DIR", DEFAULT_SPOOL_DIR))
+        self.drain_timeout = float(
+            drain_timeout if drain_timeout is not None
+            else get_env("RS_ALERT_DRAIN_TIMEOUT", DEFAULT_DRAIN_TIMEOUT)
+        )
+        self._post = post or post_alert
+        self._queue: queue.Queue = queue.Queue()
+        self._seen: set[str] = set()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._inflight = None
+
+    # -- producer side -------------------------------------------------
+
+    def submit(self, message: str, severity: str):
+        """Queue an alert; returns immediately."""
+        alert = {"message": message, "severity": severity, "attempts": 0}
+        key = _alert_key(alert)
+        with self._lock:
+            if key in self._seen:
+                logger.info("Duplicate alert coalesced: %s", message)
+                return
+            self._seen.add(key)
+        self._ensure_worker()
+        self._queue.put(alert)
+
+    def replay_spool(self):
+        """Queue alerts left undelivered by earlier runs."""
+        if not self.spool_dir.is_dir():
+            return
+        for path in sorted(self.spool_dir.glob("*.json")):
+            try:
+                alert = json.loads(path.read_text(encoding="utf-8"))
+                path.unlink()
+            except (OSError, ValueError) as e:
+                logger.error("Unreadable spooled alert %s: %s", path.name, e)
+                continue
+            key = _alert_key(alert)
+            with self._lock:
+                if key in self._seen:
+                    continue
+                self._seen.add(key)
+            self._ensure_worker()
+            self._queue.put(alert)
+
+    def new_run(self):
+        """Forget coalesced alerts; used by long-running callers per gate."""
+        with self._lock:
+            self._seen.clear()
+
+    # -- worker side ---------------------------------------------------
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="rs-alerts", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            alert = self._queue.get()
+            try:
+                if alert is _STOP:
+                    return
+                self._inflight = alert
+                if not self._post(alert["message"], alert["severity"]):
+                    self._spool(alert)
+            finally:
+                self._inflight = None
+                self._queue.task_done()
+
+    def _spool(self, alert: dict):
+        alert = dict(alert, attempts=alert.get("attempts", 0) + 1)
+        if alert["attempts"] >= MAX_SPOOL_ATTEMPTS:
+            logger.error("Dropping alert after %d attempts: %s",
+                         alert["attempts"], alert["message"])
+            return
+        try:
+            self.spool_dir.mkdir(parents=True, exist_ok=True)
+            path = self.spool_dir / f"{time.time_ns()}-{_alert_key(alert)[:12]}.json"
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(alert), encoding="utf-8")
+            os.replace(tmp, path)
+            logger.warning("Alert spooled for retry: %s", path)
+        except OSError as e:
+            logger.error("Failed to spool alert: %s", e)
+
+    # -- shutdown ------------------------------------------------------
+
+    def drain(self, timeout: float | None = None):
+        """
+        Wait up to `timeout` seconds for queued alerts, then spool
+        whatever is left so nothing is lost.
+        """
+        if self._worker is None:
+            return
+        timeout = self.drain_timeout if timeout is None else timeout
+        self._queue.put(_STOP)
+        self._worker.join(timeout)
+        if self._worker.is_alive():
+            # The in-flight post may still land: at-least-once delivery
+            leftover = [self._inflight] if self._inflight else []
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _STOP:
+                    leftover.append(item)
+            for alert in leftover:
+                # Not attempted this run, so don't count it against the cap
+                self._spool(dict(alert, attempts=alert.get("attempts", 0) - 1))
+            logger.warning("Alert drain timed out; %d alert(s) spooled", len(leftover))
+        self._worker = None
+
+
+def _alert_key(alert: dict) -> str:
+    raw = f"{alert['severity']}\0{alert['message']}".encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+_dispatcher: AlertDispatcher | None = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher() -> AlertDispatcher:
+    """Process-wide dispatcher; replays the spool and drains at exit."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = AlertDispatcher()
+            _dispatcher.replay_spool()
+            atexit.register(_dispatcher.drain)
+        return _dispatcher
+
+
+def replay_spooled_alerts():
+    """
+    Retry alerts spooled by earlier runs. Every run calls this, passing
+    or not; with an empty spool it is one directory listing and no
+    dispatcher (or worker thread) is created.
+    """
+    if _dispatcher is None:
+        spool_dir = Path(get_env("RS_ALERT_SPOOL_DIR", DEFAULT_SPOOL_DIR))
+        if not any(spool_dir.glob("*.json")):
+            return
+    get_dispatcher().replay_spool()
+
+
+def dispatch_alert(message: str, severity: str):
+    get_dispatcher().submit(message, severity)
@@ -1,15 +1,22 @@
 import os
 import logging
-import requests
+
+from release_sentinel.tracing import span
 
 logger = logging.getLogger(__name__)
 
-def send_webhook(message: str, severity: str):
+def post_alert(message: str, severity: str) -> bool:
+    """
+    Deliver one alert. Returns False only when delivery should be
+    retried later; an unconfigured webhook counts as delivered.
+    """
     webhook_url = os.getenv("RS_ALERT_WEBHOOK")
 
     if not webhook_url:
         logger.info("No webhook configured, skipping alert")
-        return
+        return True
+
+    import requests  # deferred: only paid when an alert is sent
 
     payload = {
         "text": f":rotating_light: Release Sentinel Alert\n"
@@ -18,13 +25,20 @@ def send_webhook(message: str, severity: str):
     }
 
     try:
-        r = requests.post(
-            webhook_url,
-            json=payload,
-            timeout=3
-        )
+        with span("http:POST", url="alert-webhook", severity=severity):
+            r = requests.post(
+                webhook_url,
+                json=payload,
+                timeout=3
+            )
         r.raise_for_status()
         logger.info("Alert sent successfully")
+        return True
     except Exception as e:
         # NEVER fail the pipeline because alerting failed
         logger.error("Failed to send alert: %s", e)
+        return False
+
+def send_webhook(message: str, severity: str):
+    """Synchronous delivery; the gate itself uses alerts.dispatcher."""
+    post_alert(message, severity)
@@ -1,13 +1,33 @@
-import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
+
 from release_sentinel.checks.result import CheckResult, OK, CRIT
+from release_sentinel.tracing import span
 
 RETRYABLE = {429, 500, 502, 503, 504}
+DEFAULT_CONCURRENCY = 10
 
-def check_api(url: str, timeout=3, retries=3) -> CheckResult:
+
+def make_session(pool_size: int = DEFAULT_CONCURRENCY) -> requests.Session:
+    """Session whose keep-alive pool can hold one connection per worker."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+async def _probe(loop, pool, sem, session, url, timeout, retries) -> CheckResult:
     for attempt in range(retries):
         try:
-            r = requests.get(url, timeout=timeout)
+            async with sem:
+                with span("http:GET", url=url, attempt=attempt + 1):
+                    r = await loop.run_in_executor(
+                        pool, lambda: session.get(url, timeout=timeout)
+                    )
             if r.status_code == 200:
                 return CheckResult(OK, f"API OK: {url}")
 
@@ -25,4 +45,46 @@ def check_api(url: str, timeout=3, retries=3) -> CheckResult:
                     CRIT,
                     f"API CRITICAL: {url} unreachable"
                 )
-            time.sleep(2 ** attempt)
+            # Backoff outside the semaphore so a waiting probe frees its slot
+            await asyncio.sleep(2 ** attempt)
+
+
+async def probe_all(
+    urls,
+    timeout=3,
+    retries=3,
+    concurrency=DEFAULT_CONCURRENCY,
+    session: requests.Session | None = None,
+) -> list[CheckResult]:
+    """Probe every URL concurrently; one CheckResult per URL, in order."""
+    if not urls:
+        return []
+
+    own_session = session is None
+    session = session or make_session(concurrency)
+    loop = asyncio.get_running_loop()
+    sem = asyncio.Semaphore(concurrency)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="rs-api") as pool:
+        try:
+            return list(await asyncio.gather(*(
+                _probe(loop, pool, sem, session, url, timeout, retries)
+                for url in urls
+            )))
+        finally:
+            if own_session:
+                session.close()
+
+
+def check_apis(
+    urls,
+    timeout=3,
+    retries=3,
+    concurrency=DEFAULT_CONCURRENCY,
+    session: requests.Session | None = None,
+) -> list[CheckResult]:
+    return asyncio.run(probe_all(urls, timeout, retries, concurrency, session))
+
+
+def check_api(url: str, timeout=3, retries=3) -> CheckResult:
+    return check_apis([url], timeout=timeout, retries=retries, concurrency=1)[0]
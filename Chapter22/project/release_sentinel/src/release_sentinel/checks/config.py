@@ -1,18 +1,58 @@
 import logging
+from pathlib import Path
 from release_sentinel.config import get_env
 
 logger = logging.getLogger(__name__)
 
+
+def load_api_urls() -> list[str]:
+    """
+    Endpoints to probe, from (first match wins):
+      RS_API_URLS       comma/whitespace separated list
+      RS_API_URLS_FILE  one URL per line, '#' comments allowed
+      RS_API_URL        single URL (required if neither above is set)
+    """
+    inline = get_env("RS_API_URLS")
+    if inline:
+        return [u for u in inline.replace(",", " ").split() if u]
+
+    path = get_env("RS_API_URLS_FILE")
+    if path:
+        urls = []
+        for line in Path(path).read_text(encoding="utf-8").splitlines():
+            line = line.split("#", 1)[0].strip()
+            if line:
+                urls.append(line)
+        if not urls:
+            raise RuntimeError(f"No endpoints listed in {path}")
+        return urls
+
+    return [get_env("RS_API_URL", required=True)]
+
+
+def load_required_processes() -> list[str]:
+    """RS_REQUIRED_PROCESSES (comma separated), else RS_REQUIRED_PROCESS."""
+    listed = get_env("RS_REQUIRED_PROCESSES")
+    if listed:
+        return [p.strip() for p in listed.split(",") if p.strip()]
+    return [get_env("RS_REQUIRED_PROCESS", required=True)]
+
+
 def ensure_required_config():
-    process = get_env("RS_REQUIRED_PROCESS", required=True)
-    api_url = get_env("RS_API_URL", required=True)
+    processes = load_required_processes()
+    api_urls = load_api_urls()
     token = get_env("RS_DEPLOY_TOKEN", required=True)
 
     # NEVER log secrets
-    logger.info("Config OK: process=%s, api_url=%s", process, api_url)
+    logger.info(
+        "Config OK: processes=%s, api_urls=%d (%s)",
+        ",".join(processes), len(api_urls), api_urls[0]
+    )
 
     return {
-        "process": process,
-        "api_url": api_url,
+        "process": processes[0],
+        "processes": processes,
+        "api_url": api_urls[0],
+        "api_urls": api_urls,
         "token": token,  # used later, not logged
     }
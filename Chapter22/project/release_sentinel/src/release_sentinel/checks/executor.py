@@ -0,0 +1,112 @@
+import contextvars
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from release_sentinel.checks.result import CheckResult, CRIT
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEADLINE = 10.0   # seconds a single check may run
+DEFAULT_BUDGET = 20.0     # seconds all checks together may take
+DEFAULT_WORKERS = 4
+
+
+def _worker(tasks: queue.Queue):
+    while True:
+        item = tasks.get()
+        if item is None:
+            return
+        fut, fn = item
+        if not fut.set_running_or_notify_cancel():
+            continue
+        try:
+            fut.set_result(fn())
+        except BaseException as e:
+            fut.set_exception(e)
+
+
+def run_parallel(
+    checks,
+    deadline: float = DEFAULT_DEADLINE,
+    budget: float = DEFAULT_BUDGET,
+    workers: int = DEFAULT_WORKERS,
+) -> list[CheckResult]:
+    """
+    Run (name, callable) checks concurrently on a few worker threads.
+
+    A check may return one CheckResult or a list of them (e.g. one per
+    API endpoint); lists are flattened in place so results come back in
+    the order the checks were given. Each check gets `deadline` seconds
+    from the moment it starts running, and the whole batch gets `budget`
+    seconds. A check that overruns either limit, or
+    raises, is reported as CRIT instead of blocking the gate.
+
+    The workers are daemon threads: ThreadPoolExecutor joins its
+    workers at interpreter exit, so one hung check would keep the
+    process alive after the verdict.
+    """
+    if not checks:
+        return []
+
+    starts: dict[int, float] = {}
+
+    def _timed(idx, fn):
+        starts[idx] = time.monotonic()
+        return fn()
+
+    tasks: queue.Queue = queue.Queue()
+    threads = [
+        threading.Thread(target=_worker, args=(tasks,), name=f"rs-check_{i}", daemon=True)
+        for i in range(max(1, min(workers, len(checks))))
+    ]
+    for t in threads:
+        t.start()
+    budget_end = time.monotonic() + budget
+    futures = []
+    for idx, (name, fn) in enumerate(checks):
+        fut = Future()
+        # copy_context() so worker spans nest under the caller's span
+        tasks.put((fut, lambda idx=idx, fn=fn, ctx=contextvars.copy_context(): ctx.run(_timed, idx, fn)))
+        futures.append((name, fut))
+
+    results = []
+    try:
+        for idx, (name, fut) in enumerate(futures):
+            res = _collect(name, fut, idx, starts, deadline, budget_end)
+            if isinstance(res, list):
+                results.extend(res)
+            else:
+                results.append(res)
+    finally:
+        # Never wait on a hung check: queued ones are cancelled, idle
+        # workers exit, and running ones are abandoned to their thread.
+        for _, fut in futures:
+            fut.cancel()
+        for _ in threads:
+            tasks.put(None)
+
+    return results
+
+
+def _collect(name, fut, idx, starts, deadline, budget_end):
+    while True:
+        now = time.monotonic()
+        # A check still queued behind busy workers only spends budget.
+        due = min(budget_end, starts.get(idx, now) + deadline)
+        try:
+            return fut.result(timeout=max(0.0, due - now))
+        except FutureTimeout:
+            now = time.monotonic()
+            due = min(budget_end, starts.get(idx, now) + deadline)
+            if now < due:
+                continue  # check started while we waited; re-arm
+            fut.cancel()
+            limit = "time budget" if now >= budget_end else f"deadline ({deadline:.1f}s)"
+            logger.error("Check %s overran its %s", name, limit)
+            return CheckResult(CRIT, f"{name} CRITICAL: exceeded {limit}")
+        except Exception as e:
+            logger.error("Check %s failed: %s", name, e)
+            return CheckResult(CRIT, f"{name} CRITICAL: {e}")
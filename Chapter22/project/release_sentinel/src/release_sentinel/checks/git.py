@@ -1,33 +1,26 @@
-import subprocess
 import logging
 import re
 
+from release_sentinel.snapshot import GitSnapshot
+
 logger = logging.getLogger(__name__)
 
 SEMVER_PATTERN = r"^v\d+\.\d+\.\d+$"
 ALLOWED_BRANCHES = {"main", "master"}
 
-def _run(cmd):
-    return subprocess.run(
-        cmd,
-        capture_output=True,
-        text=True
-    )
-
-def ensure_git_repo():
-    res = _run(["git", "rev-parse", "--is-inside-work-tree"])
-    if res.returncode != 0:
+def ensure_git_repo(snapshot: GitSnapshot | None = None):
+    snapshot = snapshot or GitSnapshot()
+    if not snapshot.is_repo:
         raise RuntimeError("Not inside a Git repository")
 
-def ensure_clean_tree():
-    res = _run(["git", "status", "--porcelain"])
-    if res.stdout.strip():
+def ensure_clean_tree(snapshot: GitSnapshot | None = None):
+    snapshot = snapshot or GitSnapshot()
+    if not snapshot.is_clean:
         raise RuntimeError("Git working tree is dirty")
 
-def ensure_branch_allowed():
-    branch = _run(
-        ["git", "rev-parse", "--abbrev-ref", "HEAD"]
-    ).stdout.strip()
+def ensure_branch_allowed(snapshot: GitSnapshot | None = None):
+    snapshot = snapshot or GitSnapshot()
+    branch = snapshot.branch
 
     if branch not in ALLOWED_BRANCHES:
         raise RuntimeError(
@@ -40,9 +33,9 @@ def ensure_version_valid(version: str):
             f"Invalid version format: {version}"
         )
 
-def ensure_tag_not_exists(version: str):
-    tags = _run(["git", "tag"]).stdout.splitlines()
-    if version in tags:
+def ensure_tag_not_exists(version: str, snapshot: GitSnapshot | None = None):
+    snapshot = snapshot or GitSnapshot()
+    if snapshot.has_tag(version):
         raise RuntimeError(
             f"Git tag already exists: {version}"
         )
@@ -1,5 +1,6 @@
+import os
+import re
 import shutil
-import psutil
 from release_sentinel.checks.result import CheckResult, OK, WARN, CRIT
 
 DISK_WARN = 75
@@ -18,6 +19,8 @@ def check_disk(path="/") -> CheckResult:
     return CheckResult(OK, f"Disk OK: {pct:.1f}%")
 
 def check_memory() -> CheckResult:
+    import psutil  # deferred: keeps psutil out of startup
+
     pct = psutil.virtual_memory().percent
 
     if pct >= MEM_CRIT:
@@ -26,9 +29,104 @@ def check_memory() -> CheckResult:
         return CheckResult(WARN, f"Memory WARNING: {pct:.1f}%")
     return CheckResult(OK, f"Memory OK: {pct:.1f}%")
 
+COMM_LEN = 15  # the kernel truncates /proc/<pid>/comm to this many chars
+
+
+class ProcessIndex:
+    """
+    Names of all running processes, collected in a single pass.
+
+    On Linux the index is read straight from /proc/*/comm; elsewhere it
+    falls back to one psutil.process_iter() sweep. Command lines are only
+    read when a regex query needs them. Query syntax:
+
+      "python"     name starts with (case-insensitive)
+      "=sshd"      name equals (case-insensitive)
+      "~gunicorn"  regex searched in the full command line
+    """
+
+    def __init__(self, names: dict[int, str], proc_root: str | None = None):
+        self.names = names
+        self.proc_root = proc_root
+        self._cmdlines: dict[int, str] = {}
+
+    @classmethod
+    def build(cls, proc_root: str = "/proc") -> "ProcessIndex":
+        if not os.path.isdir(proc_root):
+            import psutil
+            return cls({
+                p.pid: p.info["name"]
+                for p in psutil.process_iter(["name"])
+                if p.info["name"]
+            })
+
+        names = {}
+        for entry in os.scandir(proc_root):
+            if not entry.name.isdigit():
+                continue
+            try:
+                with open(f"{entry.path}/comm", encoding="utf-8", errors="replace") as f:
+                    names[int(entry.name)] = f.read().rstrip("\n")
+            except OSError:
+                continue  # process exited mid-scan
+        return cls(names, proc_root)
+
+    def cmdline(self, pid: int) -> str:
+        if pid not in self._cmdlines:
+            try:
+                if self.proc_root:
+                    with open(f"{self.proc_root}/{pid}/cmdline", "rb") as f:
+                        raw = f.read().rstrip(b"\0").replace(b"\0", b" ")
+                    self._cmdlines[pid] = raw.decode("utf-8", "replace")
+                else:
+                    import psutil
+                    self._cmdlines[pid] = " ".join(psutil.Process(pid).cmdline())
+            except Exception:  # OSError, or psutil.Error off Linux
+                self._cmdlines[pid] = ""
+        return self._cmdlines[pid]
+
+    def _full_name(self, pid: int, name: str) -> str:
+        # comm is cut at 15 chars; recover the rest from argv[0]
+        if len(name) == COMM_LEN and self.proc_root:
+            argv0 = os.path.basename(self.cmdline(pid).split(" ", 1)[0])
+            if argv0.startswith(name):
+                return argv0
+        return name
+
+    def find(self, query: str) -> str | None:
+        """Name of the first process matching `query`, else None."""
+        if query.startswith("~"):
+            pattern = re.compile(query[1:])
+            for pid, name in self.names.items():
+                if pattern.search(self.cmdline(pid)):
+                    return name
+            return None
+
+        exact = query.startswith("=")
+        want = (query[1:] if exact else query).lower()
+        for pid, name in self.names.items():
+            low = name.lower()
+            if len(want) > COMM_LEN and want.startswith(low):
+                low = self._full_name(pid, name).lower()
+            matched = low == want if exact else low.startswith(want)
+            if matched:
+                return name
+        return None
+
+
+def check_processes(queries, index: ProcessIndex | None = None) -> list[CheckResult]:
+    """One CheckResult per required process, from a single process scan."""
+    index = index or ProcessIndex.build()
+    results = []
+    for query in queries:
+        found = index.find(query)
+        if found:
+            results.append(CheckResult(OK, f"Process OK: {found} running"))
+        else:
+            results.append(CheckResult(CRIT, f"Process CRITICAL: {query} not running"))
+    return results
+
+
 def check_process(name: str) -> CheckResult:
-    for p in psutil.process_iter(["name"]):
-        if p.info["name"] and p.info["name"].lower().startswith(name.lower()):
-            return CheckResult(OK, f"Process OK: {p.info['name']} running")
-    return CheckResult(CRIT, f"Process CRITICAL: {name} not running")
+    return check_processes([name])[0]
 
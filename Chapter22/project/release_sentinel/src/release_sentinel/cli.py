@@ -1,11 +1,36 @@
 import sys
 import argparse
-from release_sentinel.core import run_checks
+import logging
+from release_sentinel.core import run_checks, parse_check_groups, CHECK_GROUPS
 from release_sentinel.logging import setup_logging
+from release_sentinel import tracing
+
+logger = logging.getLogger("release_sentinel.cli")
+
+def serve_main(argv):
+    from release_sentinel.server import serve, DEFAULT_HOST, DEFAULT_PORT
+
+    parser = argparse.ArgumentParser(
+        prog="release-sentinel serve",
+        description="Keep gate state warm and evaluate gates on request"
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="Listen on a Unix socket instead of TCP"
+    )
+    args = parser.parse_args(argv)
+    serve(host=args.host, port=args.port, socket_path=args.socket)
 
 def main():
     setup_logging()
 
+    if sys.argv[1:2] == ["serve"]:
+        serve_main(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(
         description="Release safety gate"
     )
@@ -20,12 +45,64 @@ def main():
         help="Release version (vX.Y.Z)"
     )
 
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="Write a Chrome trace-event JSON of all stages and calls"
+    )
+    parser.add_argument(
+        "--trace-otlp",
+        metavar="FILE",
+        help="Also write the spans as OTLP/JSON"
+    )
+    parser.add_argument(
+        "--checks",
+        metavar="GROUPS",
+        help=f"Comma-separated subset of {','.join(CHECK_GROUPS)} "
+             "(default: all; release actions need all)"
+    )
+    parser.add_argument(
+        "--server",
+        metavar="URL",
+        help="Evaluate on a running 'release-sentinel serve' "
+             "(http://host:port or unix:///path); falls back to a local run "
+             "when it cannot be reached or its checkout/RS_* settings differ"
+    )
+
     args = parser.parse_args()
+    try:
+        groups = parse_check_groups(args.checks)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.server and (args.trace or args.trace_otlp):
+        parser.error("--trace/--trace-otlp cannot be used with --server")
+
+    if args.server:
+        from release_sentinel.server import request_gate, GateUnavailable
+        try:
+            sys.exit(request_gate(args.server, args.env, args.version, groups))
+        except GateUnavailable as e:
+            logger.warning("Gate server unavailable (%s); running locally", e)
+        except (OSError, ValueError) as e:
+            # The server may already have run the gate (tag, alerts):
+            # running it again locally could repeat those side effects
+            logger.error("Gate server failed mid-request (%s); not re-running locally", e)
+            sys.exit(2)
+
+    if args.trace or args.trace_otlp:
+        tracing.enable()
 
     exit_code = run_checks(
         env=args.env,
-        version=args.version
+        version=args.version,
+        checks=groups
     )
+
+    if args.trace:
+        tracing.write_chrome_trace(args.trace)
+    if args.trace_otlp:
+        tracing.write_otlp_json(args.trace_otlp)
     sys.exit(exit_code)
 
 if __name__ == "__main__":
@@ -1,6 +1,10 @@
 import logging
 import os
+from contextlib import contextmanager
 
+# Only light modules are imported here. requests, psutil, asyncio and
+# the thread pool load inside the stage that needs them, so a run that
+# selects only policy gates (e.g. --checks env,git) never pays for them.
 from release_sentinel.checks.git import (
     ensure_git_repo,
     ensure_clean_tree,
@@ -9,70 +13,189 @@ from release_sentinel.checks.git import (
     ensure_tag_not_exists,
 )
 from release_sentinel.checks.env import ensure_env_allowed
-from release_sentinel.checks.config import ensure_required_config
-from release_sentinel.checks.system import (
-    check_disk,
-    check_memory,
-    check_process,
+from release_sentinel.checks.config import (
+    ensure_required_config,
+    load_api_urls,
+    load_required_processes,
 )
-from release_sentinel.checks.api import check_api
 from release_sentinel.checks.result import CRIT
 
-from release_sentinel.alerts.webhook import send_webhook
-from release_sentinel.release.git import create_and_push_tag
-from release_sentinel.release.github import create_github_release
-from release_sentinel.release.notes import generate_notes
-from release_sentinel.metrics import write_metric
+from release_sentinel.metrics import REGISTRY, write_metric, flush_metrics
+from release_sentinel.snapshot import GitSnapshot
+from release_sentinel.config import get_env
+from release_sentinel.tracing import span
 
 logger = logging.getLogger(__name__)
 
+RUN_SECONDS = "release_sentinel_run_duration_seconds"
+STAGE_SECONDS = "release_sentinel_stage_duration_seconds"
+CHECK_SECONDS = "release_sentinel_check_duration_seconds"
+CHECK_RESULTS = "release_sentinel_check_results_total"
 
-def run_checks(env: str, version: str) -> int:
+CHECK_GROUPS = ("env", "git", "config", "system", "api")
+
+
+def parse_check_groups(value: str | None) -> set[str]:
+    """'env,git' -> {"env", "git"}; None or 'all' selects every group."""
+    if not value or value.strip().lower() == "all":
+        return set(CHECK_GROUPS)
+    groups = {g.strip().lower() for g in value.split(",") if g.strip()}
+    unknown = groups - set(CHECK_GROUPS)
+    if unknown:
+        raise ValueError(
+            f"Unknown check group(s): {', '.join(sorted(unknown))} "
+            f"(choose from {', '.join(CHECK_GROUPS)})"
+        )
+    return groups
+
+
+@contextmanager
+def _stage(name: str):
+    with span(f"stage:{name}"), REGISTRY.time(STAGE_SECONDS, {"stage": name}):
+        yield
+
+
+def _timed(name: str, fn):
+    def run():
+        with span(f"check:{name}"), REGISTRY.time(CHECK_SECONDS, {"check": name}):
+            return fn()
+    return run
+
+
+def run_checks(
+    env: str,
+    version: str,
+    *,
+    checks: set[str] | None = None,
+    snapshot: GitSnapshot | None = None,
+    session=None,
+    process_index=None,
+) -> int:
     """
     Exit codes:
       0 = SAFE
       1 = BLOCKED (policy/config failure)
       2 = CRITICAL (runtime health failure)
+
+    `checks` selects a subset of CHECK_GROUPS; unselected groups are
+    skipped without importing their dependencies, and release actions
+    only run when every group was checked.
+
+    All metrics recorded during the run are flushed once, at the end.
+    A long-running caller (see release_sentinel.server) may pass warm
+    state: a GitSnapshot, a pooled requests.Session and a ProcessIndex.
     """
+    _replay_alerts()
+    try:
+        with span("run_checks", env=env, version=version), \
+                REGISTRY.time(RUN_SECONDS, {"env": env}):
+            return _run_checks(
+                env, version, checks or set(CHECK_GROUPS),
+                snapshot, session, process_index,
+            )
+    finally:
+        flush_metrics()
+
+
+def _runtime_checks(groups, cfg, session, process_index):
+    checks = []
+    if "system" in groups:
+        from release_sentinel.checks.system import (
+            check_disk,
+            check_memory,
+            check_processes,
+        )
+        processes = cfg.get("processes") or load_required_processes()
+        checks += [
+            ("disk", check_disk),
+            ("memory", check_memory),
+            ("process", lambda: check_processes(processes, process_index)),
+        ]
+    if "api" in groups:
+        from release_sentinel.checks.api import check_apis, DEFAULT_CONCURRENCY
+        urls = cfg.get("api_urls") or load_api_urls()
+        checks.append(("api", lambda: check_apis(
+            urls,
+            concurrency=int(get_env("RS_API_CONCURRENCY", DEFAULT_CONCURRENCY)),
+            session=session,
+        )))
+    return checks
+
+
+def _replay_alerts():
+    # Alerts a previous run could not deliver are retried on every run,
+    # including the (usual) passing one that never raises an alert itself
+    from release_sentinel.alerts.dispatcher import replay_spooled_alerts
+    replay_spooled_alerts()
+
+
+def _alert(message: str, severity: str):
+    from release_sentinel.alerts.dispatcher import dispatch_alert
+    dispatch_alert(message, severity=severity)
+
+
+def _run_checks(env, version, groups, snapshot, session, process_index) -> int:
     try:
         logger.info("Starting release validation")
 
         # -------------------------
         # Environment policy
         # -------------------------
-        ensure_env_allowed(env)
+        if "env" in groups:
+            with _stage("env"):
+                ensure_env_allowed(env)
 
-        skip_git = os.getenv("RS_SKIP_GIT_CHECKS", "").lower() == "true"
+        skip_git = (
+            os.getenv("RS_SKIP_GIT_CHECKS", "").lower() == "true"
+            or "git" not in groups
+        )
+        # One set of git facts for the whole run (checks, notes, tagging)
+        snapshot = snapshot or GitSnapshot()
 
         # -------------------------
         # Git policy checks (CI / local)
         # -------------------------
         if not skip_git:
-            ensure_git_repo()
-            ensure_clean_tree()
-            ensure_branch_allowed()
-            ensure_version_valid(version)
-            ensure_tag_not_exists(version)
+            with _stage("git"):
+                ensure_git_repo(snapshot)
+                ensure_clean_tree(snapshot)
+                ensure_branch_allowed(snapshot)
+                ensure_version_valid(version)
+                ensure_tag_not_exists(version, snapshot)
         else:
             logger.info("Skipping Git checks (runtime environment)")
 
         # -------------------------
         # Config & secrets
         # -------------------------
-        cfg = ensure_required_config()
+        cfg = {}
+        if "config" in groups:
+            with _stage("config"):
+                cfg = ensure_required_config()
 
         # -------------------------
-        # Runtime health checks
+        # Runtime health checks (concurrent, each with a deadline)
         # -------------------------
-        results = [
-            check_disk(),
-            check_memory(),
-            check_process(cfg["process"]),
-            check_api(cfg["api_url"]),
-        ]
+        results = []
+        checks = _runtime_checks(groups, cfg, session, process_index)
+        if checks:
+            from release_sentinel.checks.executor import (
+                run_parallel,
+                DEFAULT_DEADLINE,
+                DEFAULT_BUDGET,
+                DEFAULT_WORKERS,
+            )
+            with _stage("checks"):
+                results = run_parallel(
+                    [(name, _timed(name, fn)) for name, fn in checks],
+                    deadline=float(get_env("RS_CHECK_DEADLINE", DEFAULT_DEADLINE)),
+                    budget=float(get_env("RS_CHECK_BUDGET", DEFAULT_BUDGET)),
+                    workers=int(get_env("RS_CHECK_WORKERS", DEFAULT_WORKERS)),
+                )
 
         exit_code = 0
         for r in results:
+            REGISTRY.inc(CHECK_RESULTS, labels={"status": r.status})
             if r.status == CRIT:
                 logger.error(r.message)
                 exit_code = 2
@@ -85,7 +208,7 @@ def run_checks(env: str, version: str) -> int:
         if exit_code == 2:
             msg = "Release BLOCKED (CRITICAL): system or dependency unhealthy"
             logger.error(msg)
-            send_webhook(msg, severity="CRITICAL")
+            _alert(msg, severity="CRITICAL")
 
             write_metric(
                 "release_sentinel_status",
@@ -105,11 +228,21 @@ def run_checks(env: str, version: str) -> int:
             {"result": "safe", "env": env}
         )
 
-        # Release actions ONLY where Git context exists (CI)
-        if not skip_git:
-            notes = generate_notes(version)
-            create_and_push_tag(version)
-            create_github_release(version, notes)
+        # Release actions ONLY where Git context exists (CI) and the
+        # full gate ran
+        if groups != set(CHECK_GROUPS):
+            logger.info("Skipping release creation (partial check set)")
+        elif not skip_git:
+            from release_sentinel.release.git import create_and_push_tag
+            from release_sentinel.release.github import create_github_release
+            from release_sentinel.release.notes import generate_notes
+
+            with _stage("notes"):
+                notes = generate_notes(version, snapshot)
+            with _stage("tag"):
+                create_and_push_tag(version, snapshot)
+            with _stage("github_release"):
+                create_github_release(version, notes)
         else:
             logger.info("Skipping release creation (runtime mode)")
 
@@ -121,7 +254,7 @@ def run_checks(env: str, version: str) -> int:
     except Exception as e:
         msg = f"Release BLOCKED (policy): {e}"
         logger.error(msg)
-        send_webhook(msg, severity="BLOCKED")
+        _alert(msg, severity="BLOCKED")
 
         write_metric(
             "release_sentinel_status",
@@ -0,0 +1,162 @@
+import logging
+import mmap
+import os
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class RefReader:
+    """
+    Reads HEAD, loose refs and packed-refs straight from a .git directory.
+
+    No process is spawned. packed-refs is memory-mapped and, when git
+    marks it `sorted` (every modern git does), searched by bisection, so a
+    tag lookup is O(log n) however many tags the repo has.
+
+    Only the plain `<worktree>/.git/` layout is handled. `discover()`
+    returns None for linked worktrees, submodules (.git is a file),
+    reftable repos or an overridden GIT_DIR; callers fall back to `git`.
+    """
+
+    def __init__(self, git_dir):
+        self.git_dir = Path(git_dir)
+        self._packed = None      # mmap, or b"" when there is no packed-refs
+        self._body = 0           # offset of the first record after the header
+        self._sorted = True
+        self._index = None       # refname -> oid, only for unsorted files
+
+    @classmethod
+    def discover(cls, start=None) -> "RefReader | None":
+        if os.getenv("GIT_DIR") or os.getenv("GIT_COMMON_DIR"):
+            return None
+
+        path = Path(start or os.getcwd()).resolve()
+        for candidate in (path, *path.parents):
+            dot_git = candidate / ".git"
+            if dot_git.is_dir():
+                break
+            if dot_git.exists():
+                return None      # "gitdir: ..." file: worktree/submodule
+        else:
+            return None
+
+        if (dot_git / "reftable").is_dir() or (dot_git / "commondir").exists():
+            return None
+        if not (dot_git / "HEAD").is_file():
+            return None
+        return cls(dot_git)
+
+    # -- HEAD / branch -------------------------------------------------
+
+    def _read_head(self) -> str:
+        return (self.git_dir / "HEAD").read_text(encoding="utf-8").strip()
+
+    @property
+    def branch(self) -> str:
+        """Short branch name, or "HEAD" when detached (like rev-parse)."""
+        head = self._read_head()
+        if head.startswith("ref: refs/heads/"):
+            return head[len("ref: refs/heads/"):]
+        return "HEAD"
+
+    @property
+    def head(self) -> str | None:
+        """Commit id HEAD points at, None on an unborn branch."""
+        return self.resolve("HEAD")
+
+    def resolve(self, ref: str, _depth: int = 0) -> str | None:
+        if _depth > 5:
+            return None
+        if ref == "HEAD":
+            value = self._read_head()
+        else:
+            value = self._loose(ref)
+            if value is None:
+                return self._lookup_packed(ref)
+        if value.startswith("ref: "):
+            return self.resolve(value[5:].strip(), _depth + 1)
+        return value or None
+
+    # -- tags ----------------------------------------------------------
+
+    def has_tag(self, name: str) -> bool:
+        if not name or ".." in name or name.startswith("/"):
+            return False  # not a valid ref name, so it cannot exist
+        ref = f"refs/tags/{name}"
+        return self._loose(ref) is not None or self._lookup_packed(ref) is not None
+
+    # -- storage -------------------------------------------------------
+
+    def _loose(self, ref: str) -> str | None:
+        try:
+            return (self.git_dir / ref).read_text(encoding="utf-8").strip()
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            return None
+
+    def _open_packed(self):
+        if self._packed is not None:
+            return
+        try:
+            with open(self.git_dir / "packed-refs", "rb") as f:
+                self._packed = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):  # ValueError: empty file
+            self._packed = b""
+            return
+
+        if self._packed[:17] == b"# pack-refs with:":
+            header_end = self._packed.find(b"\n") + 1
+            traits = self._packed[:header_end].split()
+            self._sorted = b"sorted" in traits
+            self._body = header_end
+        else:
+            self._sorted = False
+
+    def _lookup_packed(self, ref: str) -> str | None:
+        self._open_packed()
+        if not self._packed:
+            return None
+        if not self._sorted:
+            return self._unsorted_index().get(ref)
+        return self._bisect(ref.encode("utf-8"))
+
+    def _bisect(self, refname: bytes) -> str | None:
+        # Invariant: lo and hi sit on record-line starts (never on the
+        # "^<peeled>" line that may follow an annotated tag's record).
+        mm = self._packed
+        lo, hi = self._body, len(mm)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = mm.rfind(b"\n", lo, mid) + 1
+            if start <= lo:
+                start = lo
+            if mm[start:start + 1] == b"^":
+                start = mm.rfind(b"\n", lo, start - 1) + 1
+                if start <= lo:
+                    start = lo
+
+            end = mm.find(b"\n", start)
+            if end == -1:
+                end = len(mm)
+            oid, _, name = mm[start:end].partition(b" ")
+
+            if name == refname:
+                return oid.decode("ascii")
+            if name < refname:
+                lo = end + 1
+                if mm[lo:lo + 1] == b"^":
+                    nxt = mm.find(b"\n", lo)
+                    lo = len(mm) if nxt == -1 else nxt + 1
+            else:
+                hi = start
+        return None
+
+    def _unsorted_index(self) -> dict[str, str]:
+        if self._index is None:
+            self._index = {}
+            for line in bytes(self._packed[self._body:]).splitlines():
+                if not line or line[:1] in (b"#", b"^"):
+                    continue
+                oid, _, name = line.partition(b" ")
+                self._index[name.decode("utf-8")] = oid.decode("ascii")
+        return self._index
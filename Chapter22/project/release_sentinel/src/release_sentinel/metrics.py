@@ -1,15 +1,157 @@
+import logging
 import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
 METRICS_DIR = Path(os.getenv("RS_METRICS_DIR", "/tmp"))
 METRICS_FILE = METRICS_DIR / "release_sentinel.prom"
 
+# Seconds; covers a fast local check up to a slow API probe with retries
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _label_key(labels: dict | None) -> tuple:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_block(key: tuple, extra: tuple = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+    return f"{{{body}}}"
+
+
+class Registry:
+    """
+    In-memory gauges, counters and histograms for one run.
+
+    Nothing touches disk until flush(), which renders every family and
+    swaps the textfile in atomically (temp file + rename), so the
+    node-exporter textfile collector never scrapes a torn file.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._families: dict[str, dict] = {}
+
+    def _family(self, name: str, kind: str, help_text: str = "") -> dict:
+        fam = self._families.get(name)
+        if fam is None:
+            fam = {"type": kind, "help": help_text, "samples": {}}
+            self._families[name] = fam
+        elif fam["type"] != kind:
+            raise ValueError(f"Metric {name} already registered as {fam['type']}")
+        return fam
+
+    def gauge(self, name: str, value: float, labels: dict | None = None, help: str = ""):
+        with self._lock:
+            self._family(name, "gauge", help)["samples"][_label_key(labels)] = value
+
+    def inc(self, name: str, amount: float = 1, labels: dict | None = None, help: str = ""):
+        with self._lock:
+            samples = self._family(name, "counter", help)["samples"]
+            key = _label_key(labels)
+            samples[key] = samples.get(key, 0) + amount
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        labels: dict | None = None,
+        buckets=DEFAULT_BUCKETS,
+        help: str = "",
+    ):
+        with self._lock:
+            fam = self._family(name, "histogram", help)
+            fam.setdefault("buckets", tuple(buckets))
+            key = _label_key(labels)
+            h = fam["samples"].get(key)
+            if h is None:
+                h = {"counts": [0] * len(fam["buckets"]), "sum": 0.0, "count": 0}
+                fam["samples"][key] = h
+            for i, bound in enumerate(fam["buckets"]):
+                if value <= bound:
+                    h["counts"][i] += 1
+            h["sum"] += value
+            h["count"] += 1
+
+    @contextmanager
+    def time(self, name: str, labels: dict | None = None):
+        """Observe the duration of the `with` block into histogram `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, labels)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, fam in sorted(self._families.items()):
+                if fam["help"]:
+                    lines.append(f"# HELP {name} {fam['help']}")
+                lines.append(f"# TYPE {name} {fam['type']}")
+                for key, val in fam["samples"].items():
+                    if fam["type"] != "histogram":
+                        lines.append(f"{name}{_label_block(key)} {val}")
+                        continue
+                    for bound, count in zip(fam["buckets"], val["counts"]):
+                        lines.append(
+                            f"{name}_bucket{_label_block(key, (('le', bound),))} {count}"
+                        )
+                    lines.append(
+                        f"{name}_bucket{_label_block(key, (('le', '+Inf'),))} {val['count']}"
+                    )
+                    lines.append(f"{name}_sum{_label_block(key)} {val['sum']:.6f}")
+                    lines.append(f"{name}_count{_label_block(key)} {val['count']}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self, path: Path | None = None):
+        path = Path(path or METRICS_FILE)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.render())
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def reset(self, kinds: tuple[str, ...] | None = None):
+        """Drop every family, or only those of the given types (e.g. ("gauge",))."""
+        with self._lock:
+            if kinds is None:
+                self._families.clear()
+                return
+            for name in [n for n, fam in self._families.items() if fam["type"] in kinds]:
+                del self._families[name]
+
+
+REGISTRY = Registry()
+
+
 def write_metric(name: str, value: int, labels: dict | None = None):
-    labels = labels or {}
-    label_str = ",".join(f'{k}="{v}"' for k, v in labels.items())
-    label_block = f"{{{label_str}}}" if label_str else ""
-
-    METRICS_DIR.mkdir(parents=True, exist_ok=True)
-    with open(METRICS_FILE, "w", encoding="utf-8") as f:
-        f.write(f"# TYPE {name} gauge\n")
-        f.write(f"{name}{label_block} {value}\n")
+    """Record a gauge; it is written out with everything else on flush."""
+    REGISTRY.gauge(name, value, labels)
+
+
+def flush_metrics(path: Path | None = None):
+    """Write all metrics once; a metrics failure never fails the gate."""
+    try:
+        REGISTRY.flush(path)
+    except OSError as e:
+        logger.error("Failed to write metrics: %s", e)
@@ -1,19 +1,24 @@
 import subprocess
 import logging
 
+from release_sentinel.snapshot import GitSnapshot
+from release_sentinel.tracing import span
+
 logger = logging.getLogger(__name__)
 
 def _run(cmd):
-    return subprocess.run(
-        cmd,
-        capture_output=True,
-        text=True
-    )
+    with span("subprocess", cmd=" ".join(cmd[:3])):
+        return subprocess.run(
+            cmd,
+            capture_output=True,
+            text=True
+        )
+
+def create_and_push_tag(version: str, snapshot: GitSnapshot | None = None):
+    snapshot = snapshot or GitSnapshot()
 
-def create_and_push_tag(version: str):
     # Check if tag already exists (idempotency)
-    tags = _run(["git", "tag"]).stdout.splitlines()
-    if version in tags:
+    if snapshot.has_tag(version):
         raise RuntimeError(f"Tag already exists: {version}")
 
     # Create annotated tag
@@ -22,6 +27,7 @@ def create_and_push_tag(version: str):
     ])
     if res.returncode != 0:
         raise RuntimeError(res.stderr.strip())
+    snapshot.add_tag(version)
 
     # Push tag
     res = _run(["git", "push", "origin", version])
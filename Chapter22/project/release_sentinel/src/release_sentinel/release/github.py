@@ -1,6 +1,7 @@
 import os
 import logging
-import requests
+
+from release_sentinel.tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +13,8 @@ def create_github_release(version: str, body: str):
     if not token or not repo:
         raise RuntimeError("GitHub credentials not configured")
 
+    import requests  # deferred: only paid when a release is created
+
     url = f"https://api.github.com/repos/{repo}/releases"
 
     payload = {
@@ -27,12 +30,13 @@ def create_github_release(version: str, body: str):
         "Accept": "application/vnd.github+json"
     }
 
-    response = requests.post(
-        url,
-        json=payload,
-        headers=headers,
-        timeout=5
-    )
+    with span("http:POST", url=url):
+        response = requests.post(
+            url,
+            json=payload,
+            headers=headers,
+            timeout=5
+        )
 
     if response.status_code != 201:
         raise RuntimeError(
@@ -0,0 +1,265 @@
+import hashlib
+import http.client
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from release_sentinel.alerts.dispatcher import get_dispatcher
+from release_sentinel.checks.api import make_session, DEFAULT_CONCURRENCY
+from release_sentinel.checks.system import ProcessIndex
+from release_sentinel.config import get_env
+from release_sentinel.core import run_checks, parse_check_groups
+from release_sentinel.metrics import REGISTRY
+from release_sentinel.snapshot import GitSnapshot
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8787
+DEFAULT_SAMPLE_INTERVAL = 2.0   # seconds between process-table samples
+# Read by the server process only; the client's value does not matter
+SERVER_ONLY_SETTINGS = ("RS_SERVE_SAMPLE_INTERVAL",)
+
+
+class GateUnavailable(OSError):
+    """The server did not run the gate, so running it locally is safe."""
+
+
+def gate_context(cwd=None) -> dict:
+    """
+    What a verdict depends on besides env and version: the checkout the
+    gate runs in and the RS_* settings. Settings travel as a digest so
+    secrets such as RS_DEPLOY_TOKEN never cross the socket.
+    """
+    settings = sorted(
+        (k, v) for k, v in os.environ.items()
+        if k.startswith("RS_") and k not in SERVER_ONLY_SETTINGS
+    )
+    return {
+        "cwd": os.path.realpath(cwd or os.getcwd()),
+        "settings": hashlib.sha256(json.dumps(settings).encode("utf-8")).hexdigest(),
+    }
+
+
+class ProcessSampler:
+    """Keeps a fresh ProcessIndex in the background."""
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.index = ProcessIndex.build()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="rs-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.index = ProcessIndex.build()
+            except Exception as e:
+                logger.error("Process sample failed: %s", e)
+
+
+class SnapshotCache:
+    """Hands out a GitSnapshot per gate, reusing ref data while refs are unchanged."""
+
+    def __init__(self, cwd=None):
+        self.cwd = cwd
+        self._last = None
+        self._fp = None
+
+    def get(self) -> GitSnapshot:
+        snap = GitSnapshot(cwd=self.cwd)
+        fp = snap.fingerprint()
+        if fp is not None and fp == self._fp:
+            snap.inherit(self._last)
+        self._last, self._fp = snap, fp
+        return snap
+
+
+class WarmState:
+    def __init__(self, cwd=None):
+        self.session = make_session(int(get_env("RS_API_CONCURRENCY", DEFAULT_CONCURRENCY)))
+        self.sampler = ProcessSampler(
+            float(get_env("RS_SERVE_SAMPLE_INTERVAL", DEFAULT_SAMPLE_INTERVAL))
+        ).start()
+        self.snapshots = SnapshotCache(cwd)
+        self.context = gate_context(cwd)
+        # run_checks touches process-wide state (metrics, git tags): one gate at a time
+        self.lock = threading.Lock()
+
+    def mismatch(self, context: dict) -> str | None:
+        """Name of the first part of the caller's context that differs from ours."""
+        for key in ("cwd", "settings"):
+            if context.get(key) != self.context[key]:
+                return key
+        return None
+
+    def evaluate(self, env: str, version: str, checks: set[str] | None = None) -> int:
+        with self.lock:
+            get_dispatcher().new_run()
+            # The textfile shows one verdict: drop the previous gate's status gauges
+            REGISTRY.reset(kinds=("gauge",))
+            return run_checks(
+                env,
+                version,
+                checks=checks,
+                snapshot=self.snapshots.get(),
+                session=self.session,
+                process_index=self.sampler.index,
+            )
+
+    def close(self):
+        self.sampler.stop()
+        self.session.close()
+
+
+class GateHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: WarmState
+
+    def _reply(self, code: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/healthz":
+            self._reply(200, {"status": "ok"})
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/gate":
+            self._reply(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            req = json.loads(self.rfile.read(length) or b"{}")
+            env, version = req["env"], req["version"]
+            checks = parse_check_groups(",".join(req.get("checks") or ()))
+        except (ValueError, KeyError, TypeError) as e:
+            self._reply(400, {"error": f"bad request: {e}"})
+            return
+        differs = self.server.state.mismatch(req.get("context") or {})
+        if differs:
+            # A verdict for another checkout or config would be wrong, not just stale
+            self._reply(409, {"error": f"caller's {differs} differs from the server's"})
+            return
+        self._reply(200, {"exit_code": self.server.state.evaluate(env, version, checks)})
+
+    def address_string(self):
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, fmt, *args):
+        logger.info("%s %s", self.address_string(), fmt % args)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        conn, _ = super().get_request()
+        return conn, ("unix", 0)
+
+
+def make_server(state: WarmState, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None):
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = _UnixHTTPServer(socket_path, GateHandler)
+        os.chmod(socket_path, 0o600)
+    else:
+        server = ThreadingHTTPServer((host, port), GateHandler)
+        server.daemon_threads = True
+    server.state = state
+    return server
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None):
+    state = WarmState()
+    server = make_server(state, host, port, socket_path)
+    logger.info("release-sentinel serving on %s", socket_path or f"http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        state.close()
+
+
+# -------------------------
+# Thin client
+# -------------------------
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+def request_gate(
+    server: str,
+    env: str,
+    version: str,
+    checks: set[str] | None = None,
+    timeout: float = 120,
+) -> int:
+    """
+    Ask a running server to evaluate the gate. `server` is
+    http://host:port or unix:///path/to.sock; `checks` selects
+    CHECK_GROUPS as for a local run (None: all).
+
+    Raises GateUnavailable when the server cannot be reached or refuses
+    because its checkout or RS_* settings differ from ours; the gate did
+    not run. Any other OSError (a timeout, a server error) means it may
+    have run, tag and alerts included.
+    """
+    url = urlparse(server)
+    if url.scheme == "unix":
+        conn = _UnixConnection(url.path, timeout)
+    else:
+        conn = http.client.HTTPConnection(url.hostname, url.port or DEFAULT_PORT, timeout=timeout)
+    try:
+        try:
+            conn.connect()
+        except OSError as e:
+            raise GateUnavailable(f"cannot connect to {server}: {e}") from e
+        conn.request(
+            "POST", "/gate",
+            body=json.dumps({
+                "env": env,
+                "version": version,
+                "checks": sorted(checks) if checks else None,
+                "context": gate_context(),
+            }),
+            headers={"Content-Type": "application/json"},
+        )
+        resp = conn.getresponse()
+        body = json.loads(resp.read() or b"{}")
+    finally:
+        conn.close()
+    if resp.status == 409:
+        raise GateUnavailable(f"Gate server refused: {body.get('error')}")
+    if resp.status != 200:
+        raise OSError(f"Gate server error {resp.status}: {body.get('error')}")
+    return int(body["exit_code"])
@@ -0,0 +1,148 @@
+import logging
+import os
+import subprocess
+from functools import cached_property
+
+from release_sentinel.gitrefs import RefReader
+from release_sentinel.tracing import span
+
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = "--pretty=format:- %h %s"
+
+
+def _run(cmd, cwd=None):
+    with span("subprocess", cmd=" ".join(cmd[:3])):
+        return subprocess.run(
+            cmd,
+            capture_output=True,
+            text=True,
+            cwd=cwd,
+        )
+
+
+class GitSnapshot:
+    """
+    Git facts for a single release run, gathered on first use and
+    memoized for the rest of it.
+
+    Repo status, branch, HEAD and dirtiness come from one
+    `git status --porcelain=v2 --branch` call; the tag set, previous tag
+    and commit log cost one call each, and only if something asks.
+    Create one per run and pass it to the git checks, tagging and notes.
+
+    Where the .git layout allows it, branch, HEAD and tag existence are
+    read from ref files by RefReader without spawning git at all.
+    """
+
+    def __init__(self, cwd=None):
+        self.cwd = cwd
+        self._logs: dict[str | None, str] = {}
+        self._created: set[str] = set()
+
+    def _git(self, *args):
+        return _run(["git", *args], cwd=self.cwd)
+
+    @cached_property
+    def _status(self) -> dict:
+        res = self._git("status", "--porcelain=v2", "--branch")
+        if res.returncode != 0:
+            return {"repo": False, "head": None, "branch": None, "dirty": []}
+
+        head = branch = None
+        dirty = []
+        for line in res.stdout.splitlines():
+            if line.startswith("# branch.oid "):
+                oid = line.split(" ", 2)[2]
+                head = None if oid == "(initial)" else oid
+            elif line.startswith("# branch.head "):
+                name = line.split(" ", 2)[2]
+                # Match `git rev-parse --abbrev-ref HEAD` on a detached HEAD
+                branch = "HEAD" if name == "(detached)" else name
+            elif not line.startswith("#"):
+                dirty.append(line)
+        return {"repo": True, "head": head, "branch": branch, "dirty": dirty}
+
+    @property
+    def is_repo(self) -> bool:
+        return self._status["repo"]
+
+    @property
+    def is_clean(self) -> bool:
+        return not self._status["dirty"]
+
+    @cached_property
+    def refs(self) -> RefReader | None:
+        return RefReader.discover(self.cwd)
+
+    @property
+    def branch(self) -> str | None:
+        if self.refs and "_status" not in self.__dict__:
+            return self.refs.branch
+        return self._status["branch"]
+
+    @property
+    def head(self) -> str | None:
+        if self.refs and "_status" not in self.__dict__:
+            return self.refs.head
+        return self._status["head"]
+
+    @cached_property
+    def tags(self) -> set[str]:
+        return set(self._git("tag").stdout.splitlines())
+
+    def has_tag(self, name: str) -> bool:
+        if name in self._created:
+            return True
+        if self.refs and "tags" not in self.__dict__:
+            return self.refs.has_tag(name)
+        return name in self.tags
+
+    def add_tag(self, name: str):
+        """Record a tag created during this run."""
+        self._created.add(name)
+        if "tags" in self.__dict__:
+            self.tags.add(name)
+
+    @cached_property
+    def previous_tag(self) -> str | None:
+        res = self._git("describe", "--tags", "--abbrev=0")
+        return res.stdout.strip() if res.returncode == 0 else None
+
+    def fingerprint(self) -> tuple | None:
+        """
+        Cheap identity of HEAD and the tag refs, from file reads and
+        stats only. None when the layout needs the git fallback.
+        """
+        if not self.refs:
+            return None
+        git_dir = self.refs.git_dir
+        try:
+            st = (git_dir / "packed-refs").stat()
+            packed = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            packed = None
+        try:
+            # Loose tags are few once packed; list them rather than trust
+            # a directory mtime that may not tick between two quick tags.
+            loose = hash(tuple(sorted(os.listdir(git_dir / "refs/tags"))))
+        except FileNotFoundError:
+            loose = None
+        return (self.refs.head, packed, loose)
+
+    def inherit(self, previous: "GitSnapshot"):
+        """
+        Reuse tag set, previous tag and logs from an earlier snapshot of
+        the same refs. Working-tree status is never inherited.
+        """
+        for name in ("tags", "previous_tag"):
+            if name in previous.__dict__:
+                self.__dict__[name] = previous.__dict__[name]
+        self._logs.update(previous._logs)
+
+    def log(self, since: str | None = None) -> str:
+        """`git log` in release-notes format, optionally from `since`..HEAD."""
+        if since not in self._logs:
+            rev = [f"{since}..HEAD"] if since else []
+            self._logs[since] = self._git("log", *rev, LOG_FORMAT).stdout
+        return self._logs[since]
@@ -0,0 +1,143 @@
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+_tracer = None
+_NOOP = nullcontext()
+_current = contextvars.ContextVar("rs_span", default=None)
+
+
+class Tracer:
+    """Collects finished spans for one process; thread-safe."""
+
+    def __init__(self):
+        self.trace_id = secrets.token_hex(16)
+        self.spans: list[dict] = []
+        self._lock = threading.Lock()
+
+    def record(self, span: dict):
+        with self._lock:
+            self.spans.append(span)
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "attrs", "span_id", "parent", "start", "_token")
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.span_id = secrets.token_hex(8)
+        self.parent = _current.get()
+        self._token = _current.set(self.span_id)
+        self.start = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.time_ns()
+        _current.reset(self._token)
+        if exc is not None:
+            self.attrs["error"] = f"{exc_type.__name__}: {exc}"
+        self.tracer.record({
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent,
+            "start_ns": self.start,
+            "end_ns": end,
+            "tid": threading.get_ident(),
+            "attrs": self.attrs,
+        })
+        return False
+
+
+def span(name: str, **attrs):
+    """
+    Context manager timing one unit of work.
+
+    Returns a shared no-op context when tracing is off, so instrumented
+    code costs one global lookup per call.
+    """
+    if _tracer is None:
+        return _NOOP
+    return _Span(_tracer, name, attrs)
+
+
+def enable() -> Tracer:
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def disable():
+    global _tracer
+    _tracer = None
+
+
+def write_chrome_trace(path, tracer: Tracer | None = None):
+    """Chrome trace-event JSON (chrome://tracing, Perfetto, speedscope)."""
+    tracer = tracer or _tracer
+    pid = os.getpid()
+    events = [
+        {
+            "name": s["name"],
+            "cat": "release_sentinel",
+            "ph": "X",
+            "ts": s["start_ns"] / 1000,
+            "dur": (s["end_ns"] - s["start_ns"]) / 1000,
+            "pid": pid,
+            "tid": s["tid"],
+            "args": s["attrs"],
+        }
+        for s in sorted(tracer.spans, key=lambda s: s["start_ns"])
+    ]
+    Path(path).write_text(
+        json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}, default=str),
+        encoding="utf-8",
+    )
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def write_otlp_json(path, tracer: Tracer | None = None):
+    """Span dump in the OTLP/JSON layout (ExportTraceServiceRequest)."""
+    tracer = tracer or _tracer
+    spans = [
+        {
+            "traceId": tracer.trace_id,
+            "spanId": s["span_id"],
+            "parentSpanId": s["parent_id"] or "",
+            "name": s["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(s["start_ns"]),
+            "endTimeUnixNano": str(s["end_ns"]),
+            "attributes": [
+                {"key": k, "value": _otlp_value(v)} for k, v in s["attrs"].items()
+            ],
+            "status": {"code": 2 if "error" in s["attrs"] else 1},
+        }
+        for s in tracer.spans
+    ]
+    doc = {
+        "resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": "release-sentinel"}},
+            ]},
+            "scopeSpans": [{"scope": {"name": "release_sentinel"}, "spans": spans}],
+        }]
+    }
+    Path(path).write_text(json.dumps(doc), encoding="utf-8")
@@ -0,0 +1,72 @@
+import threading
+import time
+from release_sentinel.alerts import dispatcher
+from release_sentinel.alerts.dispatcher import AlertDispatcher
+from release_sentinel.core import run_checks
+
+
+def test_duplicates_coalesced_and_delivered(tmp_path):
+    sent = []
+    d = AlertDispatcher(spool_dir=tmp_path, post=lambda m, s: sent.append((m, s)) or True)
+    d.submit("disk full", "CRITICAL")
+    d.submit("disk full", "CRITICAL")
+    d.submit("bad config", "BLOCKED")
+    d.drain(timeout=2)
+    assert sent == [("disk full", "CRITICAL"), ("bad config", "BLOCKED")]
+    assert not list(tmp_path.iterdir())
+
+
+def test_submit_does_not_block_on_slow_webhook(tmp_path):
+    release = threading.Event()
+    d = AlertDispatcher(spool_dir=tmp_path, post=lambda m, s: release.wait(5))
+    start = time.monotonic()
+    d.submit("slow", "CRITICAL")
+    assert time.monotonic() - start < 0.1
+    release.set()
+    d.drain(timeout=2)
+
+
+def test_undelivered_alerts_spool_and_replay(tmp_path):
+    d = AlertDispatcher(spool_dir=tmp_path, post=lambda m, s: False)
+    d.submit("api down", "CRITICAL")
+    d.drain(timeout=2)
+    assert len(list(tmp_path.glob("*.json"))) == 1
+
+    sent = []
+    d2 = AlertDispatcher(spool_dir=tmp_path, post=lambda m, s: sent.append(m) or True)
+    d2.replay_spool()
+    d2.submit("api down", "CRITICAL")   # same alert again this run
+    d2.drain(timeout=2)
+    assert sent == ["api down"]
+    assert not list(tmp_path.glob("*.json"))
+
+
+def test_drain_timeout_spools_pending(tmp_path):
+    hang = threading.Event()
+    d = AlertDispatcher(spool_dir=tmp_path, post=lambda m, s: hang.wait(5))
+    d.submit("one", "CRITICAL")
+    d.submit("two", "CRITICAL")
+    start = time.monotonic()
+    d.drain(timeout=0.2)
+    assert time.monotonic() - start < 1
+    assert len(list(tmp_path.glob("*.json"))) == 2
+    hang.set()
+
+
+def test_spooled_alert_is_delivered_by_a_passing_run(tmp_path, monkeypatch):
+    d = AlertDispatcher(spool_dir=tmp_path, post=lambda m, s: False)
+    d.submit("api down", "CRITICAL")
+    d.drain(timeout=2)
+
+    sent = []
+    monkeypatch.setenv("RS_ALERT_SPOOL_DIR", str(tmp_path))
+    monkeypatch.setenv("RS_SKIP_GIT_CHECKS", "true")
+    monkeypatch.setattr("release_sentinel.metrics.METRICS_FILE", tmp_path / "rs.prom")
+    monkeypatch.setattr(dispatcher, "_dispatcher", None)
+    monkeypatch.setattr(dispatcher, "post_alert", lambda m, s: sent.append(m) or True)
+    assert run_checks("dev", "v1.0.0", checks={"env"}) == 0
+    # the run itself picked up the spool (get_dispatcher() here would replay it too)
+    assert dispatcher._dispatcher is not None
+    dispatcher._dispatcher.drain(timeout=2)
+    assert sent == ["api down"]
+    assert not list(tmp_path.glob("*.json"))
@@ -0,0 +1,85 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from release_sentinel.checks.api import check_apis
+from release_sentinel.checks.config import load_api_urls
+from release_sentinel.checks.result import OK, CRIT
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive
+    flaky_hits: dict = {}
+    ports: set = set()
+
+    def do_GET(self):
+        StubHandler.ports.add(self.client_address[1])
+        if self.path.startswith("/slow"):
+            time.sleep(0.3)
+        if self.path.startswith("/flaky"):
+            hits = StubHandler.flaky_hits.get(self.path, 0) + 1
+            StubHandler.flaky_hits[self.path] = hits
+            code = 503 if hits == 1 else 200
+        elif self.path.startswith("/missing"):
+            code = 404
+        else:
+            code = 200
+        self.send_response(code)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    StubHandler.flaky_hits = {}
+    StubHandler.ports = set()
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_one_result_per_endpoint_in_order(stub):
+    urls = [f"{stub}/ok", f"{stub}/missing", "http://127.0.0.1:9/"]
+    res = check_apis(urls, retries=1)
+    assert [r.status for r in res] == [OK, CRIT, CRIT]
+    assert "404" in res[1].message
+
+
+def test_endpoints_probed_concurrently(stub):
+    urls = [f"{stub}/slow/{i}" for i in range(10)]
+    start = time.monotonic()
+    res = check_apis(urls, retries=1, concurrency=10)
+    assert all(r.status == OK for r in res)
+    assert time.monotonic() - start < 1.5
+
+
+def test_connections_are_reused(stub):
+    check_apis([f"{stub}/ok/{i}" for i in range(20)], retries=1, concurrency=2)
+    assert len(StubHandler.ports) <= 2
+
+
+def test_retryable_status_is_retried(stub):
+    res = check_apis([f"{stub}/flaky"], retries=2)
+    assert res[0].status == OK
+    assert StubHandler.flaky_hits["/flaky"] == 2
+
+
+def test_load_api_urls_from_file(tmp_path, monkeypatch):
+    f = tmp_path / "endpoints.txt"
+    f.write_text("# upstreams\nhttp://a\n\nhttp://b  # inline\n")
+    monkeypatch.delenv("RS_API_URLS", raising=False)
+    monkeypatch.setenv("RS_API_URLS_FILE", str(f))
+    assert load_api_urls() == ["http://a", "http://b"]
+
+
+def test_load_api_urls_inline_wins(monkeypatch):
+    monkeypatch.setenv("RS_API_URLS", "http://a, http://b")
+    monkeypatch.setenv("RS_API_URL", "http://c")
+    assert load_api_urls() == ["http://a", "http://b"]
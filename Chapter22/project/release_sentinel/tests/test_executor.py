@@ -0,0 +1,78 @@
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from release_sentinel.checks.executor import run_parallel
+from release_sentinel.checks.result import CheckResult, OK, CRIT
+
+
+def _slow(seconds, status=OK):
+    def check():
+        time.sleep(seconds)
+        return CheckResult(status, f"slept {seconds}")
+    return check
+
+
+def test_results_keep_check_order():
+    res = run_parallel([
+        ("a", _slow(0.2)),
+        ("b", _slow(0.0, CRIT)),
+        ("c", _slow(0.1)),
+    ])
+    assert [r.message for r in res] == ["slept 0.2", "slept 0.0", "slept 0.1"]
+    assert [r.status for r in res] == [OK, CRIT, OK]
+
+
+def test_checks_run_concurrently():
+    start = time.monotonic()
+    run_parallel([(str(i), _slow(0.3)) for i in range(4)], workers=4)
+    assert time.monotonic() - start < 1.0
+
+
+def test_overrun_check_is_critical():
+    start = time.monotonic()
+    res = run_parallel([("api", _slow(5)), ("disk", _slow(0))], deadline=0.2)
+    assert time.monotonic() - start < 2
+    assert res[0].status == CRIT
+    assert "deadline" in res[0].message
+    assert res[1].status == OK
+
+
+def test_budget_caps_total_wait():
+    res = run_parallel(
+        [("a", _slow(5)), ("b", _slow(5))],
+        deadline=10,
+        budget=0.3,
+    )
+    assert all(r.status == CRIT for r in res)
+    assert "time budget" in res[1].message
+
+
+def test_raising_check_is_critical():
+    def boom():
+        raise RuntimeError("boom")
+    res = run_parallel([("boom", boom)])
+    assert res[0].status == CRIT
+
+
+HANGING_GATE = """
+import sys, threading
+from release_sentinel import cli, core
+core._runtime_checks = lambda *a: [("hang", lambda: threading.Event().wait())]
+sys.argv = ["release-sentinel", "--env", "dev", "--version", "v1.0.0", "--checks", "env,system"]
+cli.main()
+"""
+
+
+def test_hung_check_does_not_keep_the_process_alive(tmp_path):
+    src = str(Path(__file__).resolve().parents[1] / "src")
+    env = dict(
+        os.environ, PYTHONPATH=src, RS_SKIP_GIT_CHECKS="true", RS_CHECK_DEADLINE="0.5",
+        RS_METRICS_DIR=str(tmp_path), RS_ALERT_SPOOL_DIR=str(tmp_path / "spool"),
+        RS_ALERT_DRAIN_TIMEOUT="0.5",
+    )
+    start = time.monotonic()
+    proc = subprocess.run([sys.executable, "-c", HANGING_GATE], env=env, timeout=20)
+    assert proc.returncode == 2
+    assert time.monotonic() - start < 10
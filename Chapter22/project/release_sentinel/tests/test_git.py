@@ -0,0 +1,98 @@
+import subprocess
+import pytest
+from release_sentinel import snapshot as snap_mod
+from release_sentinel.snapshot import GitSnapshot
+from release_sentinel.checks.git import (
+    ensure_git_repo,
+    ensure_clean_tree,
+    ensure_branch_allowed,
+    ensure_tag_not_exists,
+)
+from release_sentinel.release.notes import generate_notes
+
+
+def _git(repo, *args):
+    subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    _git(tmp_path, "init", "-q", "-b", "main")
+    _git(tmp_path, "config", "user.email", "ci@example.com")
+    _git(tmp_path, "config", "user.name", "CI")
+    (tmp_path / "a.txt").write_text("a")
+    _git(tmp_path, "add", "a.txt")
+    _git(tmp_path, "commit", "-qm", "first")
+    _git(tmp_path, "tag", "v0.1.0")
+    (tmp_path / "b.txt").write_text("b")
+    _git(tmp_path, "add", "b.txt")
+    _git(tmp_path, "commit", "-qm", "second")
+    return tmp_path
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    seen = []
+    real = snap_mod._run
+
+    def counting(cmd, cwd=None):
+        seen.append(cmd)
+        return real(cmd, cwd=cwd)
+
+    monkeypatch.setattr(snap_mod, "_run", counting)
+    return seen
+
+
+def test_snapshot_facts(repo):
+    s = GitSnapshot(cwd=repo)
+    assert s.is_repo and s.is_clean
+    assert s.branch == "main"
+    assert len(s.head) == 40
+    assert s.tags == {"v0.1.0"}
+    assert s.previous_tag == "v0.1.0"
+
+
+def test_git_checks_share_one_snapshot(repo, calls):
+    s = GitSnapshot(cwd=repo)
+    ensure_git_repo(s)
+    ensure_clean_tree(s)
+    ensure_branch_allowed(s)
+    ensure_tag_not_exists("v0.2.0", s)
+    notes = generate_notes("v0.2.0", s)
+    generate_notes("v0.2.0", s)
+
+    assert "second" in notes and "first" not in notes
+    # status, describe, log -- each exactly once; tags read from .git
+    assert [c[1] for c in calls] == ["status", "describe", "log"]
+
+
+def test_existing_tag_blocks(repo):
+    with pytest.raises(RuntimeError):
+        ensure_tag_not_exists("v0.1.0", GitSnapshot(cwd=repo))
+
+
+def test_dirty_tree_blocks(repo):
+    (repo / "c.txt").write_text("untracked")
+    with pytest.raises(RuntimeError):
+        ensure_clean_tree(GitSnapshot(cwd=repo))
+
+
+def test_not_a_repo(tmp_path):
+    s = GitSnapshot(cwd=tmp_path)
+    with pytest.raises(RuntimeError):
+        ensure_git_repo(s)
+
+
+def test_inherit_reuses_ref_data_until_refs_change(repo, calls):
+    first = GitSnapshot(cwd=repo)
+    first.tags, first.previous_tag
+    fp = first.fingerprint()
+
+    second = GitSnapshot(cwd=repo)
+    assert second.fingerprint() == fp
+    second.inherit(first)
+    second.tags, second.previous_tag
+    assert [c[1] for c in calls] == ["tag", "describe"]
+
+    _git(repo, "tag", "v0.2.0")
+    assert GitSnapshot(cwd=repo).fingerprint() != fp
@@ -0,0 +1,62 @@
+import subprocess
+import pytest
+from release_sentinel.gitrefs import RefReader
+
+
+def _git(repo, *args):
+    return subprocess.run(
+        ["git", *args], cwd=repo, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+@pytest.fixture
+def repo(tmp_path):
+    _git(tmp_path, "init", "-q", "-b", "main")
+    _git(tmp_path, "config", "user.email", "ci@example.com")
+    _git(tmp_path, "config", "user.name", "CI")
+    (tmp_path / "a.txt").write_text("a")
+    _git(tmp_path, "add", "a.txt")
+    _git(tmp_path, "commit", "-qm", "first")
+    for i in range(300):
+        if i % 3:
+            _git(tmp_path, "tag", f"v1.{i}.0")
+        else:
+            _git(tmp_path, "tag", "-a", f"v1.{i}.0", "-m", "annotated")
+    _git(tmp_path, "pack-refs", "--all")
+    _git(tmp_path, "tag", "v9.9.9")   # stays loose
+    return tmp_path
+
+
+def test_reads_head_and_branch(repo):
+    refs = RefReader.discover(repo)
+    assert refs.branch == "main"
+    assert refs.head == _git(repo, "rev-parse", "HEAD")
+
+
+def test_packed_and_loose_tags(repo):
+    refs = RefReader.discover(repo)
+    for i in range(300):
+        assert refs.has_tag(f"v1.{i}.0")
+    assert refs.has_tag("v9.9.9")
+    for missing in ("v0.0.0", "v1.300.0", "v1.15", "zzz", "a", "../HEAD"):
+        assert not refs.has_tag(missing)
+
+
+def test_detached_head(repo):
+    _git(repo, "checkout", "-q", "--detach")
+    assert RefReader.discover(repo).branch == "HEAD"
+
+
+def test_discovers_from_subdirectory(repo):
+    (repo / "sub").mkdir()
+    assert RefReader.discover(repo / "sub").git_dir == repo / ".git"
+
+
+def test_worktree_falls_back(repo, tmp_path_factory):
+    wt = tmp_path_factory.mktemp("wt") / "tree"
+    _git(repo, "worktree", "add", "-q", str(wt))
+    assert RefReader.discover(wt) is None
+
+
+def test_no_repo(tmp_path):
+    assert RefReader.discover(tmp_path) is None
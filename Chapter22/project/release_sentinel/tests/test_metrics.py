@@ -0,0 +1,39 @@
+from release_sentinel.metrics import Registry
+
+
+def test_registry_renders_all_families():
+    reg = Registry()
+    reg.gauge("rs_status", 1, {"env": "dev"})
+    reg.gauge("rs_status", 0, {"env": "prod"})
+    reg.inc("rs_checks_total", labels={"status": "OK"})
+    reg.inc("rs_checks_total", labels={"status": "OK"})
+    reg.observe("rs_check_seconds", 0.02, {"check": "disk"})
+    reg.observe("rs_check_seconds", 3.0, {"check": "disk"})
+
+    text = reg.render()
+    assert 'rs_status{env="dev"} 1' in text
+    assert 'rs_status{env="prod"} 0' in text
+    assert 'rs_checks_total{status="OK"} 2' in text
+    assert "# TYPE rs_check_seconds histogram" in text
+    assert 'rs_check_seconds_bucket{check="disk",le="0.025"} 1' in text
+    assert 'rs_check_seconds_bucket{check="disk",le="+Inf"} 2' in text
+    assert 'rs_check_seconds_count{check="disk"} 2' in text
+
+
+def test_flush_is_single_atomic_write(tmp_path):
+    reg = Registry()
+    reg.gauge("a", 1)
+    reg.gauge("b", 2)
+    out = tmp_path / "metrics" / "rs.prom"
+    reg.flush(out)
+    reg.flush(out)
+
+    text = out.read_text()
+    assert "a 1" in text and "b 2" in text
+    assert [p.name for p in out.parent.iterdir()] == ["rs.prom"]
+
+
+def test_label_values_are_escaped():
+    reg = Registry()
+    reg.gauge("m", 1, {"msg": 'a "quoted"\nline'})
+    assert 'm{msg="a \\"quoted\\"\\nline"} 1' in reg.render()
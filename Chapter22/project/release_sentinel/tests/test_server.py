@@ -0,0 +1,106 @@
+import sys
+import threading
+import pytest
+from release_sentinel import cli, server as srv
+
+
+@pytest.fixture
+def gate_env(monkeypatch, tmp_path):
+    monkeypatch.setenv("RS_SKIP_GIT_CHECKS", "true")
+    monkeypatch.setenv("RS_REQUIRED_PROCESS", "python")
+    monkeypatch.setenv("RS_API_URL", "http://127.0.0.1:9")
+    monkeypatch.setenv("RS_DEPLOY_TOKEN", "secret")
+    monkeypatch.setenv("RS_ALERT_SPOOL_DIR", str(tmp_path / "spool"))
+    monkeypatch.setattr("release_sentinel.metrics.METRICS_FILE", tmp_path / "rs.prom")
+
+
+def _start(server):
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    return server
+
+
+@pytest.mark.parametrize("transport", ["tcp", "unix"])
+def test_client_gets_same_exit_codes(gate_env, tmp_path, transport):
+    state = srv.WarmState()
+    if transport == "unix":
+        sock = str(tmp_path / "rs.sock")
+        server = _start(srv.make_server(state, socket_path=sock))
+        url = f"unix://{sock}"
+    else:
+        server = _start(srv.make_server(state, port=0))
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        # API endpoint is unreachable -> CRITICAL
+        assert srv.request_gate(url, "dev", "v1.0.0") == 2
+        # Invalid env -> BLOCKED
+        assert srv.request_gate(url, "production", "v1.0.0") == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+        state.close()
+
+
+def test_unreachable_server_raises(tmp_path):
+    with pytest.raises(srv.GateUnavailable):
+        srv.request_gate(f"unix://{tmp_path}/missing.sock", "dev", "v1.0.0")
+
+
+@pytest.fixture
+def gate_server(gate_env, tmp_path):
+    state = srv.WarmState()
+    server = _start(srv.make_server(state, socket_path=str(tmp_path / "rs.sock")))
+    yield f"unix://{tmp_path / 'rs.sock'}"
+    server.shutdown()
+    server.server_close()
+    state.close()
+
+
+def test_server_refuses_other_checkout_or_settings(gate_server, tmp_path, monkeypatch):
+    monkeypatch.setenv("RS_CHECK_DEADLINE", "3")
+    with pytest.raises(srv.GateUnavailable, match="settings"):
+        srv.request_gate(gate_server, "dev", "v1.0.0")
+    monkeypatch.delenv("RS_CHECK_DEADLINE")
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(srv.GateUnavailable, match="cwd"):
+        srv.request_gate(gate_server, "dev", "v1.0.0")
+
+
+def test_textfile_holds_only_the_latest_status(gate_server, tmp_path):
+    assert srv.request_gate(gate_server, "dev", "v1.0.0") == 2
+    assert srv.request_gate(gate_server, "production", "v1.0.0") == 1
+    status = [l for l in (tmp_path / "rs.prom").read_text().splitlines()
+              if l.startswith("release_sentinel_status")]
+    assert status == ['release_sentinel_status{env="production",result="blocked"} 0']
+
+
+def test_checks_selection_is_forwarded(gate_server):
+    # only env runs, so the unreachable API cannot make it CRITICAL
+    assert srv.request_gate(gate_server, "dev", "v1.0.0", checks={"env"}) == 0
+    assert srv.request_gate(gate_server, "dev", "v1.0.0") == 2
+
+
+def _cli(monkeypatch, *argv):
+    monkeypatch.setattr(sys, "argv", ["release-sentinel", "--env", "dev", "--version", "v1.0.0", *argv])
+    with pytest.raises(SystemExit) as exc:
+        cli.main()
+    return exc.value.code
+
+
+def test_cli_falls_back_only_when_the_gate_did_not_run(monkeypatch):
+    local = []
+    monkeypatch.setattr(cli, "run_checks", lambda *a, **kw: local.append(1) or 0)
+
+    def fail(error):
+        def request_gate(*a, **kw):
+            raise error
+        monkeypatch.setattr(srv, "request_gate", request_gate)
+
+    fail(srv.GateUnavailable("connection refused"))
+    assert _cli(monkeypatch, "--server", "unix:///x") == 0 and local == [1]
+    fail(TimeoutError("timed out"))
+    assert _cli(monkeypatch, "--server", "unix:///x") == 2 and local == [1]
+
+
+def test_cli_rejects_trace_with_server(monkeypatch):
+    assert _cli(monkeypatch, "--server", "unix:///x", "--trace", "t.json") == 2
@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+from release_sentinel.core import run_checks, parse_check_groups
+
+SRC = str(Path(__file__).resolve().parents[1] / "src")
+
+# Wall-clock budget for `import release_sentinel.cli`, opt-in because
+# timing flakes on loaded runners: RS_TEST_IMPORT_BUDGET=0.15 was
+# generous locally, where eagerly importing requests/psutil took ~4x.
+IMPORT_BUDGET_SECONDS = os.getenv("RS_TEST_IMPORT_BUDGET")
+
+PROBE = """
+import sys, time
+t = time.perf_counter()
+import release_sentinel.cli
+elapsed = time.perf_counter() - t
+heavy = sorted(m for m in ("requests", "psutil", "asyncio", "urllib3") if m in sys.modules)
+print(elapsed, ",".join(heavy))
+"""
+
+
+def _probe():
+    env = dict(os.environ, PYTHONPATH=SRC)
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        capture_output=True, text=True, env=env, check=True,
+    ).stdout.split()
+    return float(out[0]), (out[1] if len(out) > 1 else "")
+
+
+def test_cli_import_skips_heavy_dependencies():
+    _, heavy = _probe()
+    assert heavy == ""
+
+
+@pytest.mark.skipif(not IMPORT_BUDGET_SECONDS, reason="set RS_TEST_IMPORT_BUDGET to time the import")
+def test_cli_import_within_budget():
+    # best of three to ride out a cold disk cache
+    best = min(_probe()[0] for _ in range(3))
+    assert best < float(IMPORT_BUDGET_SECONDS), f"import took {best:.3f}s"
+
+
+def test_parse_check_groups():
+    assert parse_check_groups("env, GIT") == {"env", "git"}
+    assert parse_check_groups(None) == {"env", "git", "config", "system", "api"}
+
+
+def test_policy_only_run_needs_no_runtime_config(monkeypatch, tmp_path):
+    monkeypatch.setattr("release_sentinel.metrics.METRICS_FILE", tmp_path / "rs.prom")
+    monkeypatch.setenv("RS_ALERT_SPOOL_DIR", str(tmp_path / "spool"))
+    # a dispatcher built by an earlier test would still spool to its directory
+    monkeypatch.setattr("release_sentinel.alerts.dispatcher._dispatcher", None)
+    monkeypatch.delenv("RS_REQUIRED_PROCESS", raising=False)
+    monkeypatch.delenv("RS_API_URL", raising=False)
+    monkeypatch.setenv("RS_SKIP_GIT_CHECKS", "true")
+    assert run_checks("dev", "v1.0.0", checks={"env"}) == 0
+    assert run_checks("production", "v1.0.0", checks={"env"}) == 1
@@ -9,3 +9,26 @@ def test_process_check_ok_for_running_process():
 def test_process_check_crit_for_fake_process():
     res = check_process("definitely_not_a_real_process_123")
     assert res.status == CRIT
+
+def test_process_index_answers_many_queries(tmp_path):
+    from release_sentinel.checks.system import ProcessIndex, check_processes
+
+    for pid, comm, cmd in [
+        (1, "systemd", b"/sbin/init\0splash\0"),
+        (42, "python3", b"python3\0-m\0gunicorn\0app:wsgi\0"),
+        (77, "kube-controller", b"/usr/bin/kube-controller-manager\0--v=2\0"),
+    ]:
+        (tmp_path / str(pid)).mkdir()
+        (tmp_path / str(pid) / "comm").write_text(comm + "\n")
+        (tmp_path / str(pid) / "cmdline").write_bytes(cmd)
+    (tmp_path / "self").mkdir()
+
+    index = ProcessIndex.build(str(tmp_path))
+    assert sorted(index.names) == [1, 42, 77]
+
+    res = check_processes(
+        ["py", "=python", "=systemd", "~gunicorn", "kube-controller-manager", "nginx"],
+        index,
+    )
+    assert [r.status for r in res] == [OK, CRIT, OK, OK, OK, CRIT]
+    assert "python3" in res[3].message
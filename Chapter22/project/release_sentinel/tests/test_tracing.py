@@ -0,0 +1,51 @@
+import json
+from release_sentinel import tracing
+from release_sentinel.tracing import span
+from release_sentinel.checks.executor import run_parallel
+from release_sentinel.checks.result import CheckResult, OK
+
+
+def test_span_is_shared_noop_when_disabled():
+    tracing.disable()
+    assert span("a") is span("b")
+
+
+def test_spans_nest_across_worker_threads(tmp_path):
+    tracer = tracing.enable()
+    try:
+        def check():
+            with span("check:disk"):
+                return CheckResult(OK, "ok")
+
+        with span("stage:checks"):
+            run_parallel([("disk", check)])
+
+        chrome = tmp_path / "trace.json"
+        otlp = tmp_path / "trace.otlp.json"
+        tracing.write_chrome_trace(chrome)
+        tracing.write_otlp_json(otlp)
+    finally:
+        tracing.disable()
+
+    by_name = {s["name"]: s for s in tracer.spans}
+    assert by_name["check:disk"]["parent_id"] == by_name["stage:checks"]["span_id"]
+
+    events = json.loads(chrome.read_text())["traceEvents"]
+    assert [e["name"] for e in events] == ["stage:checks", "check:disk"]
+    assert all(e["ph"] == "X" and e["dur"] >= 0 for e in events)
+
+    spans = json.loads(otlp.read_text())["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert {s["traceId"] for s in spans} == {tracer.trace_id}
+
+
+def test_errors_are_recorded():
+    tracer = tracing.enable()
+    try:
+        try:
+            with span("boom"):
+                raise RuntimeError("bad")
+        except RuntimeError:
+            pass
+    finally:
+        tracing.disable()
+    assert tracer.spans[0]["attrs"]["error"] == "RuntimeError: bad"